@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from ultralytics import YOLO
 from transformers import pipeline
@@ -7,11 +8,33 @@ import re
 YOLO_MODEL_PATH = 'answer_recognition/preprocessing/yolov10_model/best.pt'
 YOLO_CLASS_QN = 0
 YOLO_CLASS_ANS = 1
+MNIST_MODEL_NAME = "farleyknight/mnist-digit-classification-2022-09-04"
+
+# --- Inference Backend ---
+# "torch": transformers pipeline + ultralytics(best.pt) (기존 경로)
+# "onnx" : export_onnx.py로 내보낸 ONNX 모델을 onnxruntime(CPU)으로 실행
+INFERENCE_BACKEND = 'torch'
+ONNX_MODEL_DIR = 'answer_recognition/onnx_models'
+ONNX_QUANTIZED = False  # "onnx" 백엔드에서 int8 동적 양자화 모델(*.int8.onnx) 사용 여부
+YOLO_IMGSZ = 640        # YOLO 추론 입력 크기 (ONNX export 시에도 같은 값을 사용)
+YOLO_BATCH_SIZE = 8     # 한 번의 YOLO 호출로 검출할 답안지 수 (yolo_predict_and_extract_areas_batch, worker의 chunk 크기)
+# True면 YOLO 검출용 이미지는 축소 디코딩(JPEG DCT 스케일링, 긴 변 YOLO_DECODE_MIN_SIDE 이상 유지)하고,
+# 전체 해상도는 흑백으로만 디코딩해 qn/ans 영역을 자르는 데 사용합니다. (NUMPY_REGION_PIPELINE 필요)
+YOLO_REDUCED_DECODE = True
+YOLO_DECODE_MIN_SIDE = 1280
 
 # --- Global Model Loaders ---
 yolo_model = None
 try:
-    if Path(YOLO_MODEL_PATH).exists():
+    if INFERENCE_BACKEND == 'onnx':
+        from .onnx_backend import onnx_model_paths, load_onnx_yolo
+        yolo_onnx_path, _ = onnx_model_paths(ONNX_MODEL_DIR, ONNX_QUANTIZED)
+        if Path(yolo_onnx_path).exists():
+            yolo_model = load_onnx_yolo(yolo_onnx_path)
+            print(f"YOLO ONNX model loaded successfully from {yolo_onnx_path}")
+        else:
+            print(f"YOLO ONNX model file not found at {yolo_onnx_path}. Run: python -m answer_recognition.export_onnx export")
+    elif Path(YOLO_MODEL_PATH).exists():
         yolo_model = YOLO(YOLO_MODEL_PATH)
         print(f"YOLO model loaded successfully from {YOLO_MODEL_PATH}")
     else:
@@ -22,13 +45,116 @@ except Exception as e:
 
 mnist_recognition_pipeline = None
 try:
-    mnist_recognition_pipeline = pipeline("image-classification", model="farleyknight/mnist-digit-classification-2022-09-04", device=-1) # cpu
-    print("MNIST digit recognition model loaded successfully.")
+    if INFERENCE_BACKEND == 'onnx':
+        from .onnx_backend import onnx_model_paths, OnnxImageClassifier
+        _, mnist_onnx_path = onnx_model_paths(ONNX_MODEL_DIR, ONNX_QUANTIZED)
+        if Path(mnist_onnx_path).exists():
+            mnist_recognition_pipeline = OnnxImageClassifier(mnist_onnx_path, MNIST_MODEL_NAME) # pipeline과 같은 호출 방식
+            print(f"MNIST digit recognition ONNX model loaded successfully from {mnist_onnx_path}")
+        else:
+            print(f"MNIST ONNX model file not found at {mnist_onnx_path}. Run: python -m answer_recognition.export_onnx export")
+    else:
+        mnist_recognition_pipeline = pipeline("image-classification", model=MNIST_MODEL_NAME, device=-1) # cpu
+        print("MNIST digit recognition model loaded successfully.")
 except Exception as e:
     print(f"Error loading MNIST digit recognition model: {e}")
     mnist_recognition_pipeline = None
 
+# 한 번의 파이프라인 호출에 넣을 숫자 이미지 최대 개수 (답안지 한 장의 숫자들을 몇 번의 배치 호출로 인식)
+MNIST_BATCH_SIZE = 64
+
+# True면 digit crop의 이진 마스크를 numpy/cv2로 한 번에 MNIST 방식 정규화(무게중심, 패딩, 리사이즈)하여
+# 쌓은 텐서를 모델에 바로 넣습니다. (PIL 변환과 HF image processor의 이미지별 호출 생략)
+# 모델이 보는 입력이 달라지므로(20px 맞춤, 패딩, 무게중심 이동, 이진 마스크) 기본값은 기존 경로입니다.
+# 켜기 전에 digit_preprocess_benchmark.py로 실제 crop에서 두 경로의 label 일치율을 확인하세요.
+DIGIT_PREPROCESS_FAST_PATH = False
+
+# True면 답안지를 한 번만 디코딩(cv2, 흑백 uint8)하고 영역/라인/텍스트 crop을 numpy 배열 view로 다룹니다.
+# PIL 변환은 숫자 crop과 실패 썸네일처럼 PIL이 필요한 곳에서만 합니다. (preprocessing/sheet_image.py)
+NUMPY_REGION_PIPELINE = True
+
+# --- Line Detection (preprocessing/image_utils.py의 find_horizontal_lines) ---
+# "contour"   : CLAHE + 블러 + Otsu + 수평 모폴로지 오프닝 + findContours (기존)
+# "projection": Otsu 이진화 후 행별 잉크 픽셀 수와 최장 가로 런 길이(numpy)로 수평선 검출
+# 두 방식 모두 (x, y, w, h) 리스트를 반환합니다. 일치율/속도 비교는 line_benchmark.py
+LINE_DETECTOR = 'contour'
+
+# --- Text Segmentation (preprocessing/image_utils.py의 find_text_crops_in_line) ---
+# "contour"   : findContours + 컨투어별 필터/병합 (preprocess_line_image_for_text_contours + merge_contours_and_crop_text_pil)
+# "components": connectedComponentsWithStats + 적분 영상 잉크 밀도로 한 번에 필터 후 병합 (segment_text_in_line)
+# 겹치거나 닿은 획, 안쪽에 들어간 획에서 결과가 다를 수 있어 기본값은 contour입니다. 일치율/속도 비교는 text_segment_benchmark.py
+# (SHARED_BINARY_MASK를 켜면 이 설정과 관계없이 components 방식을 사용)
+TEXT_SEGMENTER = 'contour'
+
+# --- Shared Binary Mask (preprocessing/image_utils.py의 binarize_region) ---
+# True면 답변 영역 전체를 한 번만 적응형 이진화하고, 라인 검출/텍스트 분할/숫자 추출은 그 마스크의 slice를 사용합니다.
+# (단계마다 흑백 변환 + Otsu + 컨투어를 반복하지 않음. 텍스트 분할은 components 방식, 숫자는 텍스트 분할의 연결 요소를 재사용)
+SHARED_BINARY_MASK = False
+BINARY_MASK_BLOCK_SIZE = 31  # 적응형 이진화 이웃 크기(px, 홀수)
+BINARY_MASK_C = 15           # 이웃 평균보다 이 값 이상 어두우면 잉크
+
+# --- Digit Classifier Cascade (recognition/digit_cascade.py) ---
+# True면 HOG + 선형 tiny 모델이 모든 digit을 먼저 채점하고, 신뢰도가 DIGIT_CASCADE_THRESHOLD 미만인 것만
+# transformer 분류기로 보냅니다. tiny 모델 입력은 main.py가 항상 넘기는 이진 마스크이므로 DIGIT_PREPROCESS_FAST_PATH와 관계없이 동작합니다.
+# 기본값 False: 포함된 tiny 모델은 mlxtend MNIST 일부(5,000장)로 학습했고 실제 답안지 crop에서 transformer와 비교하지 않았음.
+# 전체 MNIST로 다시 학습하고(train_tiny_digit_model.py --data openml) digit_cascade_benchmark.py로 일치율을 확인한 뒤 켜세요.
+# (tiny 모델이 받은 label은 예측 캐시/체크포인트에 저장되어 다음 실행에도 재사용됨)
+DIGIT_CASCADE_ENABLED = False
+DIGIT_CASCADE_THRESHOLD = 0.97
+# 저장소에 포함된 학습 결과 (train_tiny_digit_model.py). 실행 위치와 관계없도록 이 파일 기준 경로
+TINY_DIGIT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recognition', 'tiny_digit_model.npz')
+
+# --- Digit Prediction Cache (recognition/prediction_cache.py) ---
+# 정규화/축소한 이진 digit 비트맵의 해시를 키로 하는 LRU 캐시. 같은 모양의 crop은 모델 추론을 건너뜁니다.
+DIGIT_PREDICTION_CACHE_ENABLED = True
+DIGIT_PREDICTION_CACHE_MAX_ENTRIES = 100000  # 캐시(과목)당 최대 항목 수
+DIGIT_PREDICTION_CACHE_MAX_SUBJECTS = 4      # 프로세스(worker마다 따로)가 메모리에 두는 과목 캐시 수. 넘으면 가장 오래 쓰지 않은 과목부터 버림
+DIGIT_PREDICTION_CACHE_KEY_SIZE = 14         # 키 비트맵 크기 (28의 약수)
+DIGIT_PREDICTION_CACHE_PERSIST = True        # 과목 폴더에 캐시 파일을 저장/재사용 (app.py)
+DIGIT_PREDICTION_CACHE_FILENAME = 'digit_prediction_cache.json'
+
+# --- Digit Inference Service (recognition/inference_service.py) ---
+# True면 동시에 실행 중인 모든 인식 작업의 digit crop을 하나의 큐로 모아 공유 배치로 추론합니다.
+# 같은 프로세스 안의 작업에만 적용되며, worker 풀(ANSWER_RECOGNITION_WORKERS > 1)의 worker에서는 꺼집니다.
+DIGIT_INFERENCE_SERVICE_ENABLED = True
+DIGIT_INFERENCE_MAX_WAIT_MS = 10      # 첫 요청 이후 배치를 채우기 위해 기다리는 최대 시간(ms)
+DIGIT_INFERENCE_AUTOTUNE = True       # 서비스를 만들 때(프로세스의 첫 숫자 인식 요청) 배치 크기별 지연 시간을 측정해 max batch size 조정. 첫 요청이 그만큼 늦어짐
+
+# --- Region Template (preprocessing/region_template.py) ---
+# True면 과목마다 기준 답안지 몇 장에서만 YOLO를 돌려 qn/ans 영역 템플릿을 만들고(과목 폴더에 저장),
+# 나머지 답안지는 위상 상관으로 평행 이동만 맞춰 영역을 옮깁니다. 정렬 점수가 낮은 답안지만 YOLO로 다시 검출합니다.
+REGION_TEMPLATE_ENABLED = True
+REGION_TEMPLATE_REFERENCE_SHEETS = 3       # 템플릿 생성 시 YOLO를 돌릴 기준 답안지 수
+REGION_TEMPLATE_ALIGN_WIDTH = 512          # 정렬용 축소 이미지 너비(px)
+REGION_TEMPLATE_MIN_SCORE = 0.25           # 위상 상관 응답값이 이보다 낮으면 YOLO로 재검출
+REGION_TEMPLATE_MAX_SHIFT_RATIO = 0.1      # 이미지 크기 대비 허용 이동량
+REGION_TEMPLATE_FILENAME = 'region_template.json'
+
+# --- Sheet Process Pool (sheet_worker.py) ---
+# 답안지 단위 병렬 처리에 사용할 worker 프로세스 수. 각 worker는 YOLO/숫자 분류기를 한 번만 로드합니다.
+# 모델은 worker마다 따로 올라가므로 worker 하나당 메모리가 대략 0.7~1GB(ViT-base 숫자 분류기 가중치 약 350MB + YOLO 가중치
+# + torch/transformers/PaddleOCR 런타임) 더 필요합니다. 기본값 4개면 부모 프로세스 외에 약 3~4GB입니다.
+# worker 안에서는 공유 추론 서비스(DIGIT_INFERENCE_SERVICE_ENABLED)를 쓰지 않습니다.
+# 1이면 기존처럼 작업 스레드에서 한 장씩 순차 처리합니다.
+ANSWER_RECOGNITION_WORKERS = min(4, os.cpu_count() or 1)
+# 작업(과목) 하나가 풀에 동시에 넣어 둘 수 있는 chunk 수. 나머지는 chunk가 끝날 때마다 하나씩 넣으므로
+# 동시에 도는 다른 작업의 chunk가 큰 작업 전체 뒤에서 기다리지 않고 번갈아 처리됩니다.
+SHEET_CHUNKS_IN_FLIGHT_PER_JOB = ANSWER_RECOGNITION_WORKERS
+
+# --- Sheet Checkpoints (sheet_checkpoint.py) ---
+# True면 답안지별 인식 결과를 과목 폴더의 체크포인트 파일에 바로 기록하고(<이미지>_answers.json 대신),
+# 다시 실행할 때 내용 해시/파일명/정답 키 해시/파이프라인 태그가 같은 답안지는 인식을 건너뛰고 저장된 결과를 다시 내보냅니다.
+SHEET_CHECKPOINT_ENABLED = True
+SHEET_CHECKPOINT_FILENAME = 'answer_checkpoints.jsonl'
+PIPELINE_VERSION = 1  # 인식 결과가 달라지는 코드 변경 시 올려서 이전 체크포인트를 무효화
+
+# --- Archive Sheet Source (preprocessing/sheet_source.py) ---
+# 아카이브 모드(app.py의 OCR_ARCHIVE_SHEET_SOURCE)에서 답안지를 업로드한 ZIP에서 바로 읽을 때 사용합니다.
+ARCHIVE_READ_WORKERS = 4  # 항목을 동시에 읽는 스레드 수 (체크포인트 내용 해시 계산)
+ARCHIVE_EXTRACT_DIRNAME = '.archive_sheets'  # 검토자가 연 답안지만 풀어 두는 과목 폴더 아래 폴더
+
 # --- Regex for Key Parsing ---
+# 전처리 -> 인식 경로는 AnswerCrop(data_structures.py)의 필드를 그대로 사용하며, 이 정규식은 외부로 내보낸 예전 형식 키 해석용입니다.
 # 키 형식: "{과목명}_{학번}_{ansAreaID}_L{LineID}_x{xVAL}_qn{QN_STR_WITH_HYPHEN}_ac{ACVAL}(_dupN)?"
 # 예: "Math_12345678_ansArea0_L0_x75_qn1-1_ac2"
 # 예: "Science_87654321_ansArea1_L2_x100_qn10_ac1_dup1"
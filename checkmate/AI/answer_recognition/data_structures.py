@@ -1,4 +1,6 @@
-from typing import Tuple, TypedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple, TypedDict, Union
+import numpy as np
 from PIL import Image
 
 # --- Data Structures ---
@@ -6,5 +8,31 @@ class DetectedArea(TypedDict):
     bbox: Tuple[int, int, int, int]  # (x1, y1, x2, y2) - 원본 이미지 기준 좌표
     class_id: int
     area_type: str                   # "question_number" 또는 "answer"
-    image_obj: Image.Image           # Crop된 PIL Image 객체
-    original_image_ref: str          # 어떤 원본 이미지에서 왔는지 식별자 (예: 파일명) 
\ No newline at end of file
+    image_obj: Union[Image.Image, np.ndarray]  # Crop된 PIL Image 객체 (NUMPY_REGION_PIPELINE이면 흑백 배열 view)
+    original_image_ref: str          # 어떤 원본 이미지에서 왔는지 식별자 (예: 파일명)
+
+
+@dataclass
+class AnswerCrop:
+    """
+    preprocess_answer_sheet -> recognize_answer_sheet_data로 넘기는 답변 텍스트 조각 하나.
+    좌표/문제 번호/답 개수를 필드로 들고 다니므로 인식 단계에서 문자열 키를 다시 파싱하지 않습니다.
+    문자열 키(key)는 디버그 파일 등 외부 출력에서만 만듭니다.
+    """
+    __slots__ = ('sheet_id', 'line_id', 'x', 'y', 'question', 'answer_count', 'image', 'mask', 'digit_boxes')
+
+    sheet_id: str                         # "과목명_학번" (이미지 파일명 stem)
+    line_id: int                          # 답변 영역 내 라인 번호
+    x: int                                # 라인 내 x 좌표
+    y: int                                # 원본 답안지 기준 y 좌표 (텍스트 조각 상단)
+    question: str                         # 매칭된 문제 번호 ("2", "2-1"), 매칭 실패 시 "unknownQN"
+    answer_count: int                     # 답안 키의 answer_count (매칭 실패 시 0)
+    image: Union[Image.Image, np.ndarray] # 텍스트 조각 이미지 (NUMPY_REGION_PIPELINE이면 흑백 배열)
+    mask: Optional[np.ndarray]            # SHARED_BINARY_MASK: image와 같은 캔버스의 이진 마스크 (아니면 None)
+    digit_boxes: Optional[np.ndarray]     # SHARED_BINARY_MASK: 캔버스 기준 연결 요소 박스 (N, 4) = (x, y, w, h)
+
+    @property
+    def key(self) -> str:
+        # 기존 문자열 키 형식: "{과목명}_{학번}_L{라인}_x{x}_y{y}_qn{문제번호}_ac{답개수}"
+        key_base = f"{self.sheet_id}_L{self.line_id}_x{self.x}_y{self.y}_qn{self.question}_ac{self.answer_count}"
+        return key_base.replace(" ", "")
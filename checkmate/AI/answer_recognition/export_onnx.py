@@ -0,0 +1,200 @@
+'''
+숫자 분류기(transformers)와 YOLO 검출기(ultralytics)를 ONNX로 내보내고,
+torch 경로와 ONNX 경로의 결과가 같은지 샘플 답안지로 확인하는 오프라인 도구입니다.
+
+checkmate/AI 디렉토리에서 실행합니다. (config.py의 상대 경로 기준)
+    python -m answer_recognition.export_onnx export --imgsz 640 --quantize
+    python -m answer_recognition.export_onnx parity --samples 신호및시스템-50/신호및시스템-50 --quantized
+
+export 후 config.py에서 INFERENCE_BACKEND = "onnx" (필요시 ONNX_QUANTIZED = True)로 바꾸면 적용됩니다.
+'''
+import argparse
+import glob
+import os
+import shutil
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .config import (
+    YOLO_MODEL_PATH, YOLO_IMGSZ, MNIST_MODEL_NAME, ONNX_MODEL_DIR
+)
+from .onnx_backend import onnx_model_paths, OnnxImageClassifier, load_onnx_yolo
+from .recognition.digit_recognizer import pil_find_digit_contours_in_text_crop
+
+
+# --- Export ---
+def export_mnist_classifier(output_path: str, opset: int = 17) -> str:
+    import torch
+    from transformers import AutoModelForImageClassification, AutoImageProcessor
+
+    model = AutoModelForImageClassification.from_pretrained(MNIST_MODEL_NAME).eval()
+    processor = AutoImageProcessor.from_pretrained(MNIST_MODEL_NAME)
+    dummy = processor([Image.new('RGB', (28, 28), (255, 255, 255))], return_tensors='pt')['pixel_values']
+
+    class _LogitsOnly(torch.nn.Module):
+        # ModelOutput 대신 logits 텐서만 반환하도록 감싸서 ONNX 그래프 출력을 단순화
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, pixel_values):
+            return self.inner(pixel_values=pixel_values).logits
+
+    torch.onnx.export(
+        _LogitsOnly(model), (dummy,), output_path,
+        input_names=['pixel_values'], output_names=['logits'],
+        dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset
+    )
+    print(f"MNIST classifier exported: {output_path}")
+    return output_path
+
+
+def export_yolo(output_path: str, imgsz: int = YOLO_IMGSZ) -> str:
+    from ultralytics import YOLO
+    exported = YOLO(YOLO_MODEL_PATH).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    shutil.move(str(exported), output_path)
+    print(f"YOLO exported (imgsz={imgsz}): {output_path}")
+    return output_path
+
+
+def quantize_int8(fp32_path: str, int8_path: str) -> str:
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Dynamic int8 quantization: {fp32_path} -> {int8_path}")
+    return int8_path
+
+
+def export_all(model_dir: str, imgsz: int, quantize: bool) -> None:
+    os.makedirs(model_dir, exist_ok=True)
+    yolo_path, mnist_path = onnx_model_paths(model_dir, quantized=False)
+    export_mnist_classifier(mnist_path)
+    export_yolo(yolo_path, imgsz=imgsz)
+    if quantize:
+        yolo_int8_path, mnist_int8_path = onnx_model_paths(model_dir, quantized=True)
+        quantize_int8(mnist_path, mnist_int8_path)
+        quantize_int8(yolo_path, yolo_int8_path)
+
+
+# --- Parity Check ---
+def _box_iou(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
+    ix1, iy1, ix2, iy2 = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _best_boxes_by_class(model, image: Image.Image, imgsz: int) -> Dict[int, Tuple[float, ...]]:
+    # yolo_predict_and_extract_areas_pil과 같이 클래스별 첫 번째 박스만 사용
+    boxes: Dict[int, Tuple[float, ...]] = {}
+    for result in model(image, imgsz=imgsz, verbose=False):
+        for box in result.boxes:
+            class_id = int(box.cls)
+            if class_id not in boxes:
+                boxes[class_id] = tuple(box.xyxy[0].tolist())
+    return boxes
+
+
+def _sample_digit_crops(image: Image.Image, boxes: Dict[int, Tuple[float, ...]], limit: int) -> List[Image.Image]:
+    crops: List[Image.Image] = []
+    for bbox in boxes.values():
+        area = image.crop(tuple(int(v) for v in bbox)).convert('L')
+        for (x, y, w, h) in pil_find_digit_contours_in_text_crop(area):
+            if w >= 5 and h >= 5:
+                crops.append(area.crop((x, y, x + w, y + h)))
+            if len(crops) >= limit:
+                return crops
+    return crops
+
+
+def _timed(timings: Dict[str, float], name: str, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[name] += time.perf_counter() - started
+    return result
+
+
+def parity_check(sample_dir: str, model_dir: str, quantized: bool, imgsz: int, digits_per_sheet: int = 40) -> Dict[str, float]:
+    from ultralytics import YOLO
+    from transformers import pipeline
+
+    image_paths = sorted(p for ext in ('*.jpg', '*.jpeg', '*.png') for p in glob.glob(os.path.join(sample_dir, ext)))
+    if not image_paths:
+        raise FileNotFoundError(f"No sample sheets found in {sample_dir}")
+
+    yolo_path, mnist_path = onnx_model_paths(model_dir, quantized=quantized)
+    torch_yolo, onnx_yolo = YOLO(YOLO_MODEL_PATH), load_onnx_yolo(yolo_path)
+    torch_clf = pipeline("image-classification", model=MNIST_MODEL_NAME, device=-1)
+    onnx_clf = OnnxImageClassifier(mnist_path, MNIST_MODEL_NAME)
+
+    ious: List[float] = []
+    class_mismatches = 0
+    label_matches = digit_total = 0
+    score_diffs: List[float] = []
+    timings = {"torch_yolo": 0.0, "onnx_yolo": 0.0, "torch_clf": 0.0, "onnx_clf": 0.0}
+
+    for image_path in image_paths:
+        image = Image.open(image_path).convert('RGB')
+
+        torch_boxes = _timed(timings, "torch_yolo", _best_boxes_by_class, torch_yolo, image, imgsz)
+        onnx_boxes = _timed(timings, "onnx_yolo", _best_boxes_by_class, onnx_yolo, image, imgsz)
+
+        if set(torch_boxes) != set(onnx_boxes):
+            class_mismatches += 1
+            print(f"  [class mismatch] {os.path.basename(image_path)}: torch={sorted(torch_boxes)} onnx={sorted(onnx_boxes)}")
+        for class_id in set(torch_boxes) & set(onnx_boxes):
+            ious.append(_box_iou(torch_boxes[class_id], onnx_boxes[class_id]))
+
+        crops = _sample_digit_crops(image, torch_boxes, digits_per_sheet)
+        if not crops:
+            continue
+        torch_preds = _timed(timings, "torch_clf", torch_clf, crops, batch_size=len(crops))
+        onnx_preds = _timed(timings, "onnx_clf", onnx_clf, crops, batch_size=len(crops))
+        for t_pred, o_pred in zip(torch_preds, onnx_preds):
+            digit_total += 1
+            label_matches += int(t_pred[0]['label'] == o_pred[0]['label'])
+            score_diffs.append(abs(float(t_pred[0]['score']) - float(o_pred[0]['score'])))
+
+    report = {
+        "sheets": len(image_paths),
+        "class_mismatch_sheets": class_mismatches,
+        "box_iou_mean": float(np.mean(ious)) if ious else 0.0,
+        "box_iou_min": float(np.min(ious)) if ious else 0.0,
+        "digits": digit_total,
+        "label_agreement": label_matches / digit_total if digit_total else 0.0,
+        "score_abs_diff_max": float(np.max(score_diffs)) if score_diffs else 0.0,
+        **{f"{name}_seconds": value for name, value in timings.items()}
+    }
+    print("=== Parity report (torch vs onnx{}) ===".format(" int8" if quantized else ""))
+    for name, value in report.items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export YOLO / MNIST models to ONNX and check parity with the torch path.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = sub.add_parser('export', help="Export both models to ONNX")
+    export_parser.add_argument('--model-dir', default=ONNX_MODEL_DIR)
+    export_parser.add_argument('--imgsz', type=int, default=YOLO_IMGSZ)
+    export_parser.add_argument('--quantize', action='store_true', help="Also write int8 dynamically quantized models")
+
+    parity_parser = sub.add_parser('parity', help="Compare labels and boxes of torch vs ONNX on sample sheets")
+    parity_parser.add_argument('--samples', required=True, help="Directory with sample answer sheet images")
+    parity_parser.add_argument('--model-dir', default=ONNX_MODEL_DIR)
+    parity_parser.add_argument('--imgsz', type=int, default=YOLO_IMGSZ)
+    parity_parser.add_argument('--quantized', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_all(args.model_dir, args.imgsz, args.quantize)
+    else:
+        parity_check(args.samples, args.model_dir, args.quantized, args.imgsz)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,12 @@ import numpy as np
 # from ultralytics import YOLO # 삭제
 import os
 import json
+import logging
 from pathlib import Path
 import shutil
 from typing import Dict, List, Any, Tuple, Optional, TypedDict
 # from transformers import pipeline # 삭제
-import re # 삭제
+import re
 from io import BytesIO
 import base64
 from paddleocr import PaddleOCR
@@ -16,40 +17,49 @@ from paddleocr import PaddleOCR
 # config.py로부터 import
 from .config import (
     YOLO_MODEL_PATH, YOLO_CLASS_QN, YOLO_CLASS_ANS, 
-    yolo_model, mnist_recognition_pipeline, KEY_PARSING_REGEX
+    yolo_model, mnist_recognition_pipeline, NUMPY_REGION_PIPELINE,
+    YOLO_REDUCED_DECODE, YOLO_DECODE_MIN_SIDE, SHARED_BINARY_MASK
 )
 
 # data_structures.py로부터 import
-from .data_structures import DetectedArea
+from .data_structures import DetectedArea, AnswerCrop
 
 # preprocessing/yolo_detector.py로부터 import
-from .preprocessing.yolo_detector import yolo_predict_and_extract_areas_pil
+from .preprocessing.yolo_detector import yolo_predict_and_extract_areas_pil, yolo_predict_and_extract_areas_array
+from .preprocessing.sheet_image import (
+    SheetImage, load_sheet_image, read_sheet_bytes, decode_reduced_color, decode_gray, to_gray_array, to_pil_image, open_sheet_pil
+)
+from .preprocessing.sheet_source import sheet_exists, sheet_file_name, sheet_group_name
 
 # preprocessing/image_utils.py로부터 import
 from .preprocessing.image_utils import (
-    enhance_and_find_contours_for_lines,
+    binarize_region,
+    find_horizontal_lines,
     crop_between_lines,
-    preprocess_line_image_for_text_contours,
-    merge_contours_and_crop_text_pil
+    find_text_crops_in_line
 )
 
 # recognition/digit_recognizer.py로부터 import
 from .recognition.digit_recognizer import (
     pil_find_digit_contours_in_text_crop,
     pil_recognize_digits_from_bboxes,
+    recognize_digit_images_batch,
     group_and_combine_digits
 )
 
 # utils/key_utils.py로부터 import
 from .utils.key_utils import (
     create_question_info_dict,
-    generate_final_key_for_ans_crop
+    answer_counts_by_question,
+    build_answer_crop
 )
 
 # INTER_LINEAR이 없으면 대체값 직접 설정 (보통 1)
 if not hasattr(cv2, 'INTER_LINEAR'):
     cv2.INTER_LINEAR = 1
 
+logger = logging.getLogger(__name__)
+
 # --- Helper Functions ---
 
 
@@ -57,36 +67,66 @@ if not hasattr(cv2, 'INTER_LINEAR'):
 def preprocess_answer_sheet(
     original_image_path: str,
     answer_key_data: Dict[str, Any],
-) -> Dict[str, Image.Image]:
-    final_ans_text_crop_dict: Dict[str, Image.Image] = {}
-    if not Path(original_image_path).exists():
+    detected_areas: Optional[Tuple[Optional[DetectedArea], Optional[DetectedArea]]] = None # yolo_predict_and_extract_areas_batch로 미리 검출한 (qn_area, ans_area)
+) -> List[AnswerCrop]:
+    # NUMPY_REGION_PIPELINE이면 AnswerCrop.image는 PIL Image 대신 흑백 numpy 배열 (recognize_answer_sheet_data는 둘 다 처리)
+    final_ans_text_crops: List[AnswerCrop] = []
+    if not sheet_exists(original_image_path): # 파일 경로 또는 archive ref
         print(f"Error: Missing original image: {original_image_path}")
-        return {}
+        return []
     
     if not answer_key_data:
         print(f"Error: Empty answer key data")
-        return {}
+        return []
 
-    try:
-        original_pil_image = Image.open(original_image_path).convert("RGB")
-    except Exception as e:
-        print(f"Error opening image file for preprocessing: {e}")
-        return {}
-        
-    subject_name = Path(original_image_path).parent.name # 과목명 (상위 디렉토리명)
-    subject_student_id_base = Path(original_image_path).stem
+    subject_name = sheet_group_name(original_image_path) # 과목명 (상위 디렉토리명)
+    subject_student_id_base = os.path.splitext(sheet_file_name(original_image_path))[0]
     
     print(f"Preprocessing: {subject_student_id_base} (from {original_image_path})")
 
-    print("  단계 1: YOLO detection...")
-    qn_detected_area, ans_detected_area = yolo_predict_and_extract_areas_pil(original_pil_image, subject_student_id_base)
+    if detected_areas is not None:
+        print("  단계 1: YOLO detection (배치 검출 결과 사용)")
+        qn_detected_area, ans_detected_area = detected_areas
+    elif NUMPY_REGION_PIPELINE and YOLO_REDUCED_DECODE:
+        # 검출은 축소 디코딩한 BGR로, 영역은 전체 해상도 흑백 디코딩에서 복사 (전체 해상도 컬러는 디코딩하지 않음)
+        sheet_buffer = read_sheet_bytes(original_image_path)
+        sheet_bgr = decode_reduced_color(sheet_buffer, YOLO_DECODE_MIN_SIDE) if sheet_buffer is not None else None
+        sheet_gray = decode_gray(sheet_buffer) if sheet_bgr is not None else None
+        if sheet_gray is None:
+            print(f"Error decoding image file for preprocessing: {original_image_path}")
+            return []
+
+        print("  단계 1: YOLO detection...")
+        qn_detected_area, ans_detected_area = yolo_predict_and_extract_areas_array(
+            sheet_bgr, sheet_gray, subject_student_id_base, copy_regions=True
+        )
+        del sheet_buffer, sheet_bgr, sheet_gray
+    elif NUMPY_REGION_PIPELINE:
+        # 한 번만 디코딩: BGR은 YOLO 입력, 이후 영역/라인/텍스트 crop은 모두 흑백 배열의 view
+        loaded_sheet = load_sheet_image(original_image_path)
+        if loaded_sheet is None:
+            return []
+        sheet_bgr, sheet_gray = loaded_sheet
+
+        print("  단계 1: YOLO detection...")
+        qn_detected_area, ans_detected_area = yolo_predict_and_extract_areas_array(sheet_bgr, sheet_gray, subject_student_id_base)
+        del sheet_bgr
+    else:
+        try:
+            original_pil_image = open_sheet_pil(original_image_path)
+        except Exception as e:
+            print(f"Error opening image file for preprocessing: {e}")
+            return []
+
+        print("  단계 1: YOLO detection...")
+        qn_detected_area, ans_detected_area = yolo_predict_and_extract_areas_pil(original_pil_image, subject_student_id_base)
 
     if ans_detected_area is None:
         print(f"  답변 영역이 YOLO에서 발견되지 않음 {subject_student_id_base}.")
-        return {}
+        return []
     if qn_detected_area is None:
         print(f"  질문 영역이 YOLO에서 발견되지 않음 {subject_student_id_base}.")
-        return {}
+        return []
     
     print("  단계 2&3 (질문 정보 딕셔너리 생성)...")
     question_info_dict = create_question_info_dict([qn_detected_area], answer_key_data)
@@ -107,7 +147,7 @@ def preprocess_answer_sheet(
 
     if not question_info_dict: 
         print(f"  질문 정보 딕셔너리 생성 실패 {subject_student_id_base}. 질문 발견 및 답변 키 일치 확인 필요.")
-        return {}
+        return []
 
 
     # 여기가 문제!!!!!!!!! 텍스트 크롭이 너무 구림!!
@@ -115,13 +155,16 @@ def preprocess_answer_sheet(
     ans_area_idx = 0  # 단일 객체이므로 인덱스를 0으로 고정
     
     # ans_area_data 대신 ans_detected_area (단일 객체)를 직접 사용
-    ans_area_pil = ans_detected_area['image_obj'] # ans 영역의 PIL 이미지 객체
+    ans_area_pil = ans_detected_area['image_obj'] # ans 영역의 PIL 이미지 객체 (NUMPY_REGION_PIPELINE이면 흑백 배열 view)
     ans_area_y_offset_orig = ans_detected_area['bbox'][1] # 원본 답안지 이미지 기준으로 답변 영역의 y 시작 오프셋.
     current_ans_area_id = f"ansArea{ans_area_idx}" # 항상 "ansArea0"
+    answer_counts = answer_counts_by_question(answer_key_data) # 문제 번호 -> answer_count (텍스트 조각마다 답안 키를 다시 훑지 않음)
 
     # 답변 영역 내에서 수평선 윤곽 찾기 및 라인 분리
-    line_contours = enhance_and_find_contours_for_lines(ans_area_pil) # 이 함수의 반환 값 (감지된 수평선들의 경계 상자 리스트)이 line_contours에 할당됩니다.
-    line_cropped_ans_list = crop_between_lines(ans_area_pil, line_contours)
+    # SHARED_BINARY_MASK: 답변 영역을 한 번만 이진화하고 이후 단계는 마스크 slice를 사용
+    ans_area_mask = binarize_region(ans_area_pil) if SHARED_BINARY_MASK else None
+    line_contours = find_horizontal_lines(ans_area_pil, ans_area_mask) # 이 함수의 반환 값 (감지된 수평선들의 경계 상자 리스트)이 line_contours에 할당됩니다.
+    line_cropped_ans_list = crop_between_lines(ans_area_pil, line_contours, ans_area_mask)
         # ans_area_pil (답변 영역 이미지)과 line_contours (찾아낸 수평선 정보)가 crop_between_lines 함수의 인자로 전달됩니다.
         # 이 함수의 반환 값 (잘린 각 라인 이미지와 해당 라인의 y좌표 정보를 담은 딕셔너리들의 리스트)이 line_cropped_ans_list에 할당됩니다.
         # line_cropped_ans_list: [{'image_obj': Image, 'y_top_in_area': int, 'y_bottom_in_area': int}]
@@ -161,12 +204,9 @@ def preprocess_answer_sheet(
         line_ans_pil = line_crop_data['image_obj']
 
         line_y_top_in_ans_area = line_crop_data['y_top_in_area']
-        current_line_id = f"{line_idx}" # 실제 current_line_id는 여기서 할당됨 (키 생성 등에 사용)
 
-        # 라인 내 텍스트 컨투어(윤곽선) 검출
-        text_contours_cv = preprocess_line_image_for_text_contours(line_ans_pil)
-        # 텍스트 컨투어 병합 및 개별 텍스트 이미지 추출
-        final_ans_text_crops_in_line = merge_contours_and_crop_text_pil(line_ans_pil, text_contours_cv) # horizontally_crop_image -> text_crop images
+        # 라인 내 텍스트 검출, 병합 및 개별 텍스트 이미지 추출 (config.TEXT_SEGMENTER)
+        final_ans_text_crops_in_line = find_text_crops_in_line(line_ans_pil, line_crop_data.get('mask_obj')) # horizontally_crop_image -> text_crop images
 
 
 
@@ -197,28 +237,21 @@ def preprocess_answer_sheet(
                 'line_y_top_relative_to_ans_area': line_y_top_in_ans_area, # 전체 답변 영역(ans_area_pil) 내에서 현재 라인의 시작 y 좌표
                 'ans_area_y_offset_orig': ans_area_y_offset_orig, # 원본 답안지 이미지에서 전체 답변 영역(ans_area_pil)의 시작 y 오프셋
                 # 'ans_area_id': current_ans_area_id, # 제거됨 (이전에 사용되었던 전체 답변 영역의 ID)
-                'line_id_in_ans_area': current_line_id # 현재 라인의 ID (예: "L0", "L1")
+                'line_id_in_ans_area': line_idx, # 현재 라인의 번호 (키에서는 "L0", "L1")
+                'mask_obj': text_crop_data_in_line.get('mask_obj'), # SHARED_BINARY_MASK: 같은 캔버스의 이진 마스크
+                'digit_boxes': text_crop_data_in_line.get('digit_boxes') # SHARED_BINARY_MASK: 캔버스 기준 연결 요소 박스
             }
             
-            final_key_base = generate_final_key_for_ans_crop(
+            final_ans_text_crops.append(build_answer_crop(
                 subject_student_id_base, # 과목명_학번 전달
                 ans_text_crop_full_info,
                 question_info_dict,
-                answer_key_data
-            )
-            # (여기)
-            temp_key = final_key_base
-            key_suffix = 0
-            while temp_key in final_ans_text_crop_dict:
-                key_suffix += 1
-                temp_key = f"{final_key_base}_dup{key_suffix}"
-            final_key = temp_key
-            final_ans_text_crop_dict[final_key] = ans_text_crop_pil
+                answer_counts
+            ))
 
     
-    print(f"  전처리 완료: {subject_student_id_base}. 총 {len(final_ans_text_crop_dict)}개의 잘린 답변 텍스트 이미지 생성됨.") # DEBUG KOR
-    print("final_ans_text_crop_dict:", final_ans_text_crop_dict)
-    return final_ans_text_crop_dict
+    print(f"  전처리 완료: {subject_student_id_base}. 총 {len(final_ans_text_crops)}개의 잘린 답변 텍스트 이미지 생성됨.") # DEBUG KOR
+    return final_ans_text_crops
 
 
 
@@ -226,9 +259,10 @@ def preprocess_answer_sheet(
 
 
 def recognize_answer_sheet_data(
-    processed_ans_crops: Dict[str, Image.Image], # preprocess_answer_sheet 함수의 반환 값
+    processed_ans_crops: List[AnswerCrop], # preprocess_answer_sheet 함수의 반환 값 (image는 PIL Image 또는 흑백 배열)
     answer_key_data: Dict[str, Any],
-    tail_question_counts: Dict[str, int]
+    tail_question_counts: Dict[str, int],
+    cache_namespace: Optional[str] = None # 숫자 예측 캐시 구분자 (보통 과목명)
 ) -> Dict[str, Any]:
     """
     전처리된 답안 텍스트 조각 이미지들로부터 숫자를 인식하여
@@ -237,7 +271,6 @@ def recognize_answer_sheet_data(
     Returns:
         Dict[str, Any]: answer_json과 failure_json을 포함하는 딕셔너리.
     """
-    import re
     from collections import defaultdict
     
     # --- 0단계: 초기 유효성 검증 및 기본 정보 파싱 ---
@@ -247,16 +280,16 @@ def recognize_answer_sheet_data(
             "failure_json": {}
         }
 
-    # 첫 번째 키 하나를 샘플로 추출하여 subject와 student_id 파싱
-    sample_key = next(iter(processed_ans_crops))
+    # 첫 번째 조각의 sheet_id("과목명_학번")에서 subject와 student_id 파싱
+    sample_sheet_id = processed_ans_crops[0].sheet_id
     try:
-        # 예시 키: test_answer_32174515_LL1_x60_qn1_ac0
-        student_id_match = re.search(r"\d{8}", sample_key)
+        # 예시: test_answer_32174515
+        student_id_match = re.search(r"\d{8}", sample_sheet_id)
         if not student_id_match:
-            raise ValueError("학번(8자리 숫자)을 key에서 찾을 수 없습니다.")
+            raise ValueError("학번(8자리 숫자)을 sheet_id에서 찾을 수 없습니다.")
         
         student_id = student_id_match.group()
-        subject_with_id = sample_key[:sample_key.find(student_id) + len(student_id)]
+        subject_with_id = sample_sheet_id[:sample_sheet_id.find(student_id) + len(student_id)]
         subject = subject_with_id.rsplit("_", 1)[0]
 
     except Exception as e:
@@ -272,30 +305,16 @@ def recognize_answer_sheet_data(
 
 
 
-    # --- 1단계: 이미지 그룹핑 및 좌표 파싱 ---
+    # --- 1단계: 이미지 그룹핑 (좌표/문제 번호는 AnswerCrop 필드) ---
     from sklearn.cluster import KMeans
     import numpy as np
 
     
     grouped_answers_by_qn = {}
 
-    for key, img in processed_ans_crops.items():
-        # 1. 문제 번호 파싱 (qn)
-        qn_match = re.search(r'_qn([a-zA-Z0-9\-]+)', key)
-        qn = qn_match.group(1) if qn_match else "unknownQN"
-
-        # 좌표 파싱
-        x_match = re.search(r'_x(\d+)', key)
-        y_match = re.search(r'_y(\d+)', key)
-        x = int(x_match.group(1)) if x_match else -1
-        y = int(y_match.group(1)) if y_match else -1
-
-        entry = {
-            "key": key,
-            "img": img,
-            "x": x,
-            "y": y
-        }
+    for entry in processed_ans_crops:
+        # 1. 문제 번호
+        qn = entry.question
         
         # unknownQN인 경우 경고 메시지 출력하고 건너뛰기
         if qn == "unknownQN":
@@ -315,7 +334,7 @@ def recognize_answer_sheet_data(
     if all(value == 1 for value in tail_question_counts.values()):
         for qn, entries in grouped_answers_by_qn.items():
             # 꼬리문제가 없는 경우: qn만 사용하여 x 기준 정렬
-            for idx, entry in enumerate(sorted(entries, key=lambda e: e["x"])):
+            for idx, entry in enumerate(sorted(entries, key=lambda e: e.x)):
                 full_qn = qn  # sub_qn 없음
 
                 if full_qn not in grouped_answers_by_qn_and_subqn:
@@ -327,7 +346,7 @@ def recognize_answer_sheet_data(
     elif any('-' in key for key in grouped_answers_by_qn.keys()):
         for qn, entries in grouped_answers_by_qn.items():
             # 꼬리문제가 없는 경우: qn만 사용하여 x 기준 정렬
-            for idx, entry in enumerate(sorted(entries, key=lambda e: e["x"])):
+            for idx, entry in enumerate(sorted(entries, key=lambda e: e.x)):
                 full_qn = qn  # sub_qn 없음
 
                 if full_qn not in grouped_answers_by_qn_and_subqn:
@@ -338,13 +357,13 @@ def recognize_answer_sheet_data(
     # 3-3. 시험지 유형3: 꼬리문제가 있고 qn에 포함되지 않는 경우 - 인공지능 시험지 유형
     else:
         for qn, entries in grouped_answers_by_qn.items():
-            entries_sorted = sorted(entries, key=lambda e: e["y"])
+            entries_sorted = sorted(entries, key=lambda e: e.y)
 
             if qn in tail_question_counts and tail_question_counts[qn] > 1:
                 # 어떤 주 문제의 꼬리문제가 여러 개인 경우: y 기준 KMeans 클러스터링 사용
 
                 k = tail_question_counts[qn]
-                y_values = np.array([e["y"] for e in entries_sorted]).reshape(-1, 1)
+                y_values = np.array([e.y for e in entries_sorted]).reshape(-1, 1)
 
                 try:
                     kmeans = KMeans(n_clusters=k, random_state=0, n_init="auto")
@@ -369,7 +388,7 @@ def recognize_answer_sheet_data(
                     grouped_answers_by_qn_and_subqn[full_qn].append(entry)
 
             else:
-                for idx, entry in enumerate(sorted(entries_sorted, key=lambda e: e["x"])):
+                for idx, entry in enumerate(sorted(entries_sorted, key=lambda e: e.x)):
                     full_qn = qn
                     if full_qn not in grouped_answers_by_qn_and_subqn:
                         grouped_answers_by_qn_and_subqn[full_qn] = []
@@ -387,14 +406,10 @@ def recognize_answer_sheet_data(
         sorted(grouped_answers_by_qn_and_subqn.items(), key=lambda x: qn_sort_key(x[0]))
     )
 
-    # grouped_answers_by_qn_and_subqn 형식 확인하기
-    debug_filename = os.path.join(os.getcwd(), "grouped_answers_by_qn_and_subqn_debug.txt")
-    with open(debug_filename, 'w', encoding='utf-8') as debug_file:
+    # grouped_answers_by_qn_and_subqn 형식 확인하기 (DEBUG 레벨일 때만. worker 여러 개가 동시에 실행하므로 파일로 쓰지 않음)
+    if logger.isEnabledFor(logging.DEBUG):
         for full_qn, entries in grouped_answers_by_qn_and_subqn.items():
-            debug_file.write(f"Question: {full_qn}\n")
-            for entry in entries:
-                debug_file.write(f"  Entry: {entry}\n")
-            debug_file.write("\n")
+            logger.debug("Question %s (%s): %s", full_qn, sample_sheet_id, [{'key': entry.key, 'x': entry.x, 'y': entry.y} for entry in entries])
 
 
 
@@ -440,11 +455,14 @@ def recognize_answer_sheet_data(
 
     '''
 
-    # 각 full_qn에 대해 처리
+    # 2-1. 수집 단계: 모든 full_qn의 digit crop을 먼저 모은다. (숫자 인식은 아직 하지 않음)
+    question_digit_jobs = []  # full_qn별 그룹핑/분할 정보
+    all_digit_images = []     # 답안지 전체의 digit crop 이미지 (배치 인식 입력)
+    all_digit_masks = []      # 같은 순서의 이진 마스크 슬라이스 (fast path 입력)
     total_digit_crops_count = 0
     for idx, (full_qn, entries) in enumerate(grouped_answers_by_qn_and_subqn.items()):
         # 한 문제에 대해 텍스트 크롭 이미지가 왼쪽부터 오른쪽으로 정렬되어 entries_sorted 리스트에 들어가있다.
-        entries_sorted = sorted(entries, key=lambda e: e["x"])
+        entries_sorted = sorted(entries, key=lambda e: e.x)
 
         # 2. 한 문제에 대한 qn, sub_qn, ac 파싱(몇 번 문제인지, 답 개수는 몇 개인지 확인)
         if '-' in full_qn:
@@ -453,8 +471,7 @@ def recognize_answer_sheet_data(
             qn = int(full_qn)
             sub_qn = 0
 
-        ac_match = re.search(r'_ac(\d+)', entries_sorted[0]['key'])
-        ac = int(ac_match.group(1)) if ac_match else 1
+        ac = entries_sorted[0].answer_count
 
         digit_crops = [] 
         # 우선 한 개의 텍스트 크롭 이미지에 대해 컨투어를 인식한다.
@@ -462,15 +479,19 @@ def recognize_answer_sheet_data(
 
         # 3. 이미지로부터 숫자 컨투어 추출 및 중심 좌표 계산
         for entry_idx, entry in enumerate(entries_sorted):
-            pil_img = entry['img'].convert('L')
-            np_img = np.array(pil_img)
-            _, thresh = cv2.threshold(np_img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            np_img = to_gray_array(entry.image) # 흑백 배열 입력은 복사 없이 그대로 사용
+            if entry.mask is not None and entry.digit_boxes is not None:
+                # SHARED_BINARY_MASK: 텍스트 분할에서 구한 마스크와 연결 요소 박스를 그대로 사용 (다시 이진화/컨투어 검출하지 않음)
+                thresh = entry.mask
+                digit_bboxes = entry.digit_boxes.tolist()
+            else:
+                _, thresh = cv2.threshold(np_img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+                contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                digit_bboxes = [cv2.boundingRect(cnt) for cnt in contours]
 
             # 먼저 모든 contour의 높이를 확인해서 최대 높이를 구함
             max_height = 0
-            for cnt in contours:
-                x, y, w, h = cv2.boundingRect(cnt)
+            for x, y, w, h in digit_bboxes:
                 if h >= 5 and w >= 5:  # 기본 크기 조건을 만족하는 것만 고려
                     max_height = max(max_height, h)
             
@@ -478,16 +499,15 @@ def recognize_answer_sheet_data(
             height_threshold = max_height * 0.6
 
             entry_digit_count = 0
-            for cnt in contours:
-                x, y, w, h = cv2.boundingRect(cnt)
+            for x, y, w, h in digit_bboxes:
                 if h < 5 or w < 5:
                     continue
                 # 높이가 최대 높이의 60% 미만이면 제외
                 if h < height_threshold:
                     continue
-                crop = pil_img.crop((x, y, x + w, y + h))
+                crop = Image.fromarray(np_img[y:y + h, x:x + w]) # transformer 입력용 PIL은 digit crop 단위로만 생성
                 xc, yc = x + w // 2, y + h // 2
-                digit_crops.append((crop, (xc, yc)))
+                digit_crops.append((crop, (xc, yc), thresh[y:y + h, x:x + w])) # 이진 마스크 슬라이스는 fast path 입력
                 entry_digit_count += 1
 
         total_digit_crops_count += len(digit_crops)
@@ -506,34 +526,41 @@ def recognize_answer_sheet_data(
         else:
             split_indices = []
 
+        # x 기준으로 정렬된 digit crop을 전체 배치 리스트에 이어붙이고, 이 문제의 구간(start, count)을 기록
+        question_digit_jobs.append({
+            "qn": qn,
+            "sub_qn": sub_qn,
+            "entries_sorted": entries_sorted,
+            "split_indices": split_indices,
+            "digit_start": len(all_digit_images),
+            "digit_count": len(digit_crops)
+        })
+        for img, coord, mask in sorted(digit_crops, key=lambda t: t[1][0]):
+            all_digit_images.append(img)
+            all_digit_masks.append(mask)
+
+    # 2-2. 배치 인식 단계: 답안지 한 장의 모든 digit crop을 몇 번의 배치 호출로 인식
+    all_digit_predictions = recognize_digit_images_batch(all_digit_images, all_digit_masks, cache_namespace=cache_namespace)
+
+    # 2-3. 분배 단계: 인식 결과를 full_qn별로 다시 나누어 그룹핑/문자열 생성
+    for job in question_digit_jobs:
+        qn, sub_qn = job["qn"], job["sub_qn"]
+        entries_sorted = job["entries_sorted"]
+        split_indices = job["split_indices"]
+
         # 5. split index 기준으로 숫자 그룹핑 - 이미지 대신 인식 결과를 그룹핑
         digits_grouped = []
         temp_group = []
         
-        # MNIST 모델 파이프라인 가져오기
-        pipe = mnist_recognition_pipeline
-        
-        # 각 digit crop을 먼저 인식하여 숫자로 변환
+        # 이 문제에 해당하는 구간의 인식 결과를 숫자로 변환
         recognized_digits = []
         digit_confidences = []
-        for i, (img, coord) in enumerate(sorted(digit_crops, key=lambda t: t[1][0])):
-            try:
-                # 개별 digit 이미지 인식
-                pred = pipe(img.convert('L'))
-                if pred and len(pred) > 0:
-                    predicted_digit = pred[0]['label']
-                    confidence = pred[0].get('score', 0.0)
-                    digit_confidences.append(confidence)
-                    # 신뢰도가 낮으면 '?'로 표시
-                    if confidence < 0.85:  # 개별 digit의 낮은 임계값
-                        predicted_digit = '?'
-                    recognized_digits.append(predicted_digit)
-                else:
-                    recognized_digits.append('?')
-                    digit_confidences.append(0.0)
-            except Exception as e:
-                recognized_digits.append('?')
-                digit_confidences.append(0.0)
+        for predicted_digit, confidence in all_digit_predictions[job["digit_start"]:job["digit_start"] + job["digit_count"]]:
+            digit_confidences.append(confidence)
+            # 신뢰도가 낮으면 '?'로 표시
+            if confidence < 0.85:  # 개별 digit의 낮은 임계값
+                predicted_digit = '?'
+            recognized_digits.append(predicted_digit)
         
         # 인식된 숫자들을 split_indices 기준으로 그룹핑
         for i, digit in enumerate(recognized_digits):
@@ -549,17 +576,8 @@ def recognize_answer_sheet_data(
         result_string = ""
         confidence_threshold = 0.85  # 전체 신뢰도 임계값
 
-        # digits_grouped의 예시
-        # digits_grouped를 txt로 저장
-        with open(os.path.join(os.getcwd(), "digits_grouped_output.txt"), "a") as f:
-            for group in digits_grouped:
-                # 사용자가 원하는 형태로 출력: group: ['숫자', '?', ...]
-                print(f"group: {group}")
-                # 각 그룹의 숫자들을 텍스트로 변환하여 저장
-                group_text = ", ".join([str(digit) for digit in group])
-                f.write(group_text + "\n")
-
-            print("--------------------------------")
+        # digits_grouped의 예시: [['1', '2'], ['?']]
+        logger.debug("digits_grouped (%s): %s", sample_sheet_id, digits_grouped)
 
         # 그룹별로 숫자 문자열 생성
         for group_idx, group in enumerate(digits_grouped):
@@ -581,13 +599,14 @@ def recognize_answer_sheet_data(
         # 7. 결과 저장: 실패 시 base64 이미지 저장, 성공 시 answer 기록
         if fail_flag or not result_string:
             # 원본 이미지들을 수평으로 연결
-            width = sum([e['img'].width for e in entries_sorted])
-            height = max([e['img'].height for e in entries_sorted])
+            entry_images = [to_pil_image(e.image) for e in entries_sorted] # 썸네일은 PIL로 변환
+            width = sum([img.width for img in entry_images])
+            height = max([img.height for img in entry_images])
             concat_img = Image.new("RGB", (width, height), color=(255, 255, 255))
             current_x = 0
-            for e in entries_sorted:
-                concat_img.paste(e['img'], (current_x, 0))
-                current_x += e['img'].width
+            for img in entry_images:
+                concat_img.paste(img, (current_x, 0))
+                current_x += img.width
             
             try:
                 buffered = BytesIO()
@@ -645,10 +664,10 @@ if __name__ == "__main__":
     with open(test_answer_key_json_path, 'r', encoding='utf-8') as f:
         answer_key_data = json.load(f)
 
-    final_ans_text_crop_dict = preprocess_answer_sheet(test_original_image_path, answer_key_data)
+    final_ans_text_crops = preprocess_answer_sheet(test_original_image_path, answer_key_data)
     
     # 인식 단계 추가 - group별 결과를 보기 위해
-    if final_ans_text_crop_dict:
+    if final_ans_text_crops:
         # tail_question_counts 계산
         tail_question_counts = {}
         for q_entry in answer_key_data.get('questions', []):
@@ -659,5 +678,5 @@ if __name__ == "__main__":
                 tail_question_counts[qn] += 1
         
         # 인식 수행
-        recognition_results = recognize_answer_sheet_data(final_ans_text_crop_dict, answer_key_data, tail_question_counts)
+        recognition_results = recognize_answer_sheet_data(final_ans_text_crops, answer_key_data, tail_question_counts)
         print(f"\n인식 완료: {len(recognition_results.get('answer_json', {}).get('answers', []))}개 답변 처리")
@@ -0,0 +1,89 @@
+'''
+ONNX Runtime(CPU) 추론 백엔드.
+
+config.py에서 INFERENCE_BACKEND = "onnx"일 때 사용됩니다.
+모델 파일은 export_onnx.py로 미리 내보내야 합니다.
+    python -m answer_recognition.export_onnx export [--quantize] [--imgsz 640]
+'''
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+YOLO_ONNX_FILENAME = 'yolo.onnx'
+MNIST_ONNX_FILENAME = 'mnist_digit.onnx'
+
+
+def onnx_model_paths(model_dir: str, quantized: bool = False) -> Tuple[str, str]:
+    """(YOLO ONNX 경로, 숫자 분류기 ONNX 경로). quantized=True면 int8 동적 양자화 파일(*.int8.onnx)."""
+    def _path(filename: str) -> str:
+        if quantized:
+            filename = filename.replace('.onnx', '.int8.onnx')
+        return os.path.join(model_dir, filename)
+    return _path(YOLO_ONNX_FILENAME), _path(MNIST_ONNX_FILENAME)
+
+
+def create_cpu_session(model_path: str, intra_op_num_threads: int = 0):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_num_threads > 0:
+        options.intra_op_num_threads = intra_op_num_threads
+    return ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+class OnnxImageClassifier:
+    """
+    transformers의 image-classification pipeline과 같은 방식으로 호출할 수 있는 ONNX 분류기.
+
+    - classifier(image)            -> [{'label': '3', 'score': 0.99}, ...]
+    - classifier([img1, img2], ...) -> [[...], [...]]
+    전처리(리사이즈/정규화)는 원본 모델의 image processor 설정을 그대로 사용하므로 torch 경로와 입력이 같습니다.
+    """
+
+    def __init__(self, model_path: str, model_name: str, top_k: int = 5):
+        from transformers import AutoConfig, AutoImageProcessor
+        self.session = create_cpu_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+        self.image_processor = AutoImageProcessor.from_pretrained(model_name)
+        model_config = AutoConfig.from_pretrained(model_name)
+        self.id2label: Dict[int, str] = {int(k): str(v) for k, v in model_config.id2label.items()}
+        self.top_k = top_k
+
+    def predict_logits(self, pixel_values: np.ndarray) -> np.ndarray:
+        """이미 전처리된 (N, C, H, W) float32 배열을 그대로 모델에 넣어 logits를 반환합니다."""
+        return self.session.run(None, {self.input_name: pixel_values.astype(np.float32, copy=False)})[0]
+
+    def _postprocess(self, logits: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(shifted)
+        probs /= probs.sum(axis=1, keepdims=True)
+        order = np.argsort(-probs, axis=1)[:, :top_k]
+        return [
+            [{'label': self.id2label.get(int(idx), str(int(idx))), 'score': float(row_probs[idx])} for idx in row_order]
+            for row_probs, row_order in zip(probs, order)
+        ]
+
+    def __call__(
+        self,
+        images: Union[Image.Image, Sequence[Image.Image]],
+        batch_size: Optional[int] = None,
+        top_k: Optional[int] = None
+    ):
+        single = isinstance(images, Image.Image)
+        image_list = [images] if single else list(images)
+        top_k = top_k or self.top_k
+        batch_size = batch_size or len(image_list) or 1
+        outputs: List[List[Dict[str, Any]]] = []
+        for start in range(0, len(image_list), batch_size):
+            chunk = [img.convert('RGB') for img in image_list[start:start + batch_size]]
+            pixel_values = self.image_processor(chunk, return_tensors='np')['pixel_values']
+            outputs.extend(self._postprocess(self.predict_logits(pixel_values), top_k))
+        return outputs[0] if single else outputs
+
+
+def load_onnx_yolo(model_path: str):
+    # ultralytics는 .onnx 가중치를 onnxruntime으로 실행하며, 호출 방식/결과 형식은 .pt 모델과 같습니다.
+    from ultralytics import YOLO
+    return YOLO(model_path, task='detect')
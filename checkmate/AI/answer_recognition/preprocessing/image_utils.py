@@ -6,13 +6,28 @@ if not hasattr(cv2, 'INTER_LINEAR'):
     cv2.INTER_LINEAR = 1
 
 import numpy as np
-from typing import List, Tuple, Dict, Any
+from typing import Iterable, List, Optional, Tuple, Dict, Any
 
-# 이 파일의 함수들은 PIL Image와 OpenCV 객체를 주로 다루며, 
-# 다른 프로젝트 모듈에 대한 직접적인 의존성은 현재 없어 보입니다.
+from ..config import LINE_DETECTOR, TEXT_SEGMENTER, BINARY_MASK_BLOCK_SIZE, BINARY_MASK_C
+from .sheet_image import SheetImage, image_size, crop_region, to_gray_array
+
+# 이 파일의 함수들은 PIL Image 또는 흑백 numpy 배열(SheetImage)과 OpenCV 객체를 다룹니다.
+# 흑백 배열을 넣으면 중간 변환 없이 그대로 사용하고, 잘라낸 라인/텍스트도 배열(view)로 반환합니다.
 # 만약 DetectedArea 같은 타입을 여기서도 사용한다면 from ..data_structures import DetectedArea 추가 필요.
 
-def enhance_and_find_contours_for_lines(pil_image: Image.Image) -> List[Tuple[int, int, int, int]]:
+def binarize_region(pil_image: SheetImage) -> np.ndarray:
+    """
+    답변 영역 전체를 한 번만 이진화한 마스크 (잉크=255, uint8). SHARED_BINARY_MASK에서 라인/텍스트/숫자 단계가 이 마스크의 slice를 공유합니다.
+    조명/스캔 농도 차이에 강하도록 지역 평균 기준 적응형 이진화(BINARY_MASK_BLOCK_SIZE, BINARY_MASK_C)를 사용합니다.
+    """
+    gray = to_gray_array(pil_image)
+    block_size = max(3, BINARY_MASK_BLOCK_SIZE | 1) # 홀수
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, block_size, BINARY_MASK_C)
+
+def enhance_and_find_contours_for_lines(
+    pil_image: SheetImage,
+    binary: Optional[np.ndarray] = None
+) -> List[Tuple[int, int, int, int]]:
     """
     이미지에서 수평선을 검출하여 바운딩 박스를 반환하는 함수
     
@@ -20,14 +35,15 @@ def enhance_and_find_contours_for_lines(pil_image: Image.Image) -> List[Tuple[in
     CLAHE 대비 개선, 모폴로지 연산을 통한 수평선 강화, 컨투어 검출을 순차적으로 수행합니다.
     
     Args:
-        pil_image (Image.Image): 입력 PIL 이미지 객체
+        pil_image (SheetImage): 입력 PIL 이미지 객체 또는 흑백 numpy 배열
+        binary (np.ndarray, optional): 미리 계산한 이진 마스크 (binarize_region의 slice). 주면 1~5단계를 건너뜁니다.
         
     Returns:
         List[Tuple[int, int, int, int]]: 검출된 수평선들의 바운딩 박스 리스트
                                         각 튜플은 (x, y, width, height) 형식
     
     Processing Steps:
-        1. RGB 형식으로 변환 및 OpenCV 배열 변환
+        1. RGB 형식으로 변환 및 OpenCV 배열 변환 (흑백 배열 입력은 생략)
         2. 그레이스케일 변환
         3. CLAHE를 사용한 대비 개선 (clipLimit=2.0, tileGridSize=(8,8))
         4. 가우시안 블러로 노이즈 제거 (kernel_size=(5,5))
@@ -40,34 +56,31 @@ def enhance_and_find_contours_for_lines(pil_image: Image.Image) -> List[Tuple[in
         - 최대 높이: 20픽셀 이하
         - 수평 커널 크기: max(15, 이미지너비/3)
     """
-    # 1. 이미지 형식 정규화: RGB로 변환하여 일관된 처리 보장
-    if pil_image.mode != 'RGB':
-        pil_image = pil_image.convert('RGB')
-    cv_image = np.array(pil_image)
-    
-    # 2. 그레이스케일 변환: 색상 정보 제거하여 구조적 특징에 집중
-    gray = cv2.cvtColor(cv_image, cv2.COLOR_RGB2GRAY)
-    
-    # 3. CLAHE (Contrast Limited Adaptive Histogram Equalization) 적용
-    # - 지역적 대비 개선으로 수평선 시각적 강화
-    # - clipLimit=2.0: 과도한 대비 증가 방지
-    # - tileGridSize=(8,8): 8x8 타일 단위로 적응적 히스토그램 평활화
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(gray)
-    
-    # 4. 가우시안 블러: 노이즈 제거 및 이미지 평활화
-    # - kernel_size=(5,5): 중간 정도의 블러링으로 세부 노이즈 제거
-    blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
-    
-    # 5. 이진화: OTSU 방법으로 자동 임계값 결정
-    # - THRESH_BINARY_INV: 전경(수평선)을 흰색(255)으로, 배경을 검은색(0)으로
-    # - OTSU: 이미지 히스토그램을 분석하여 최적 임계값 자동 결정
-    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if binary is None:
+        # 1~2. 그레이스케일 변환: 색상 정보 제거하여 구조적 특징에 집중 (흑백 배열은 복사 없이 그대로 사용)
+        gray = to_gray_array(pil_image)
+    
+        # 3. CLAHE (Contrast Limited Adaptive Histogram Equalization) 적용
+        # - 지역적 대비 개선으로 수평선 시각적 강화
+        # - clipLimit=2.0: 과도한 대비 증가 방지
+        # - tileGridSize=(8,8): 8x8 타일 단위로 적응적 히스토그램 평활화
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        enhanced = clahe.apply(gray)
+    
+        # 4. 가우시안 블러: 노이즈 제거 및 이미지 평활화
+        # - kernel_size=(5,5): 중간 정도의 블러링으로 세부 노이즈 제거
+        blurred = cv2.GaussianBlur(enhanced, (5, 5), 0)
+    
+        # 5. 이진화: OTSU 방법으로 자동 임계값 결정
+        # - THRESH_BINARY_INV: 전경(수평선)을 흰색(255)으로, 배경을 검은색(0)으로
+        # - OTSU: 이미지 히스토그램을 분석하여 최적 임계값 자동 결정
+        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    img_width = binary.shape[1]
     
     # 6. 수평선 검출을 위한 모폴로지 연산
     # - 수평 커널 크기: 이미지 너비에 비례하되 최소 15픽셀 보장
     # - 가로로 긴 직사각형 커널로 수평 구조 강화
-    horizontal_size = max(15, cv_image.shape[1] // 3)
+    horizontal_size = max(15, img_width // 3)
     horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (horizontal_size, 1))
     
     # - 모폴로지 오프닝: 침식 후 팽창으로 수평선만 남기고 다른 구조 제거
@@ -81,7 +94,7 @@ def enhance_and_find_contours_for_lines(pil_image: Image.Image) -> List[Tuple[in
     
     # 8. 검출된 컨투어 필터링 및 바운딩 박스 추출
     detected_lines_bboxes = []
-    min_line_width = cv_image.shape[1] // 6  # 최소 너비: 이미지 너비의 1/6
+    min_line_width = img_width // 6  # 최소 너비: 이미지 너비의 1/6
     
     for contour in contours:
         x, y, w, h = cv2.boundingRect(contour)
@@ -94,6 +107,86 @@ def enhance_and_find_contours_for_lines(pil_image: Image.Image) -> List[Tuple[in
              
     return detected_lines_bboxes
 
+def find_horizontal_lines_by_projection(
+    pil_image: SheetImage,
+    binary: Optional[np.ndarray] = None
+) -> List[Tuple[int, int, int, int]]:
+    """
+    행 투영(projection profile)으로 수평선을 검출하는 함수
+    
+    enhance_and_find_contours_for_lines와 같은 기준(커널 길이, 최소 너비, 최대 높이)을 행 단위 numpy 연산으로 계산합니다.
+    모폴로지 오프닝은 "가로 런 길이 >= 커널 길이"인 픽셀만 남기는 것과 같으므로, 행마다 최장 런을 구해 대신합니다.
+    
+    Args:
+        pil_image (SheetImage): 입력 PIL 이미지 객체 또는 흑백 numpy 배열
+        binary (np.ndarray, optional): 미리 계산한 이진 마스크. 주면 1단계를 건너뜁니다.
+        
+    Returns:
+        List[Tuple[int, int, int, int]]: 검출된 수평선들의 바운딩 박스 리스트 (x, y, width, height), y 오름차순
+    
+    Processing Steps:
+        1. 그레이스케일 변환 후 OTSU 이진화 (CLAHE/블러 생략)
+        2. 행별 잉크 픽셀 수로 후보 행 선택 (잉크 수가 커널 길이 미만이면 런도 커널 길이 미만)
+        3. 후보 행에서만 가로 런(시작/끝)을 구해 커널 길이 이상인 런이 있는 행 표시
+        4. 연속된 표시 행을 하나의 선으로 묶어 (x, y, w, h) 계산 후 크기 필터링
+    """
+    # 1. 이진화 (전경=True)
+    if binary is None:
+        gray = to_gray_array(pil_image)
+        if gray.size == 0:
+            return []
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    img_height, img_width = binary.shape
+    if img_height == 0 or img_width == 0:
+        return []
+    ink = binary > 0
+    
+    # 2. 후보 행: 잉크 픽셀 수가 커널 길이 이상인 행 (contour 방식과 같은 커널 길이)
+    horizontal_size = max(15, img_width // 3)
+    candidate_rows = np.flatnonzero(np.count_nonzero(ink, axis=1) >= horizontal_size)
+    if candidate_rows.size == 0:
+        return []
+    
+    # 3. 후보 행의 가로 런: 좌우에 0을 덧대 diff가 +1이면 런 시작, -1이면 런 끝 (행 우선 순서라 시작/끝이 짝지어짐)
+    rows = ink[candidate_rows].astype(np.int8)
+    edges = np.diff(np.pad(rows, ((0, 0), (1, 1))), axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    long_runs = (end_cols - start_cols) >= horizontal_size
+    if not np.any(long_runs):
+        return []
+    run_rows = candidate_rows[start_rows[long_runs]]
+    run_starts = start_cols[long_runs]
+    run_ends = end_cols[long_runs]
+    
+    # 4. 연속된 행끼리 묶기 (오프닝 결과의 컨투어 하나에 해당)
+    line_rows = np.unique(run_rows)
+    group_starts = np.flatnonzero(np.diff(line_rows, prepend=line_rows[0] - 2) > 1)
+    group_bounds = np.append(group_starts, line_rows.size)
+    
+    detected_lines_bboxes = []
+    min_line_width = img_width // 6  # 최소 너비: 이미지 너비의 1/6 (contour 방식과 동일)
+    for i in range(len(group_starts)):
+        y_top = line_rows[group_bounds[i]]
+        y_bottom = line_rows[group_bounds[i + 1] - 1]
+        in_group = (run_rows >= y_top) & (run_rows <= y_bottom)
+        x = int(run_starts[in_group].min())
+        w = int(run_ends[in_group].max()) - x
+        h = int(y_bottom - y_top) + 1
+        if w >= min_line_width and h <= 20:
+            detected_lines_bboxes.append((x, int(y_top), w, h))
+    
+    return detected_lines_bboxes
+
+def find_horizontal_lines(
+    pil_image: SheetImage,
+    binary: Optional[np.ndarray] = None
+) -> List[Tuple[int, int, int, int]]:
+    """config.LINE_DETECTOR에 따라 수평선 검출 방식을 선택합니다. 반환 형식은 (x, y, width, height) 리스트로 동일"""
+    if LINE_DETECTOR == 'projection':
+        return find_horizontal_lines_by_projection(pil_image, binary)
+    return enhance_and_find_contours_for_lines(pil_image, binary)
+
 def enhance_and_find_contours_for_lines_v2(
     pil_image: Image.Image,
     kernel_size_ratio: float = 0.5,
@@ -240,13 +333,15 @@ def enhance_and_find_contours_for_lines_v2(
     return final_lines
 
 def crop_between_lines(
-    pil_image: Image.Image, 
-    detected_lines_bboxes: List[Tuple[int,int,int,int]]
-) -> List[Dict[str, Any]]: # [{'image_obj': Image, 'y_top_in_area': int, 'y_bottom_in_area': int}]
+    pil_image: SheetImage, 
+    detected_lines_bboxes: List[Tuple[int,int,int,int]],
+    binary: Optional[np.ndarray] = None # 주면 같은 위치의 마스크 slice를 'mask_obj'로 함께 반환
+) -> List[Dict[str, Any]]: # [{'image_obj': Image 또는 배열 view, 'y_top_in_area': int, 'y_bottom_in_area': int(, 'mask_obj': 배열 view)}]
+    img_width, img_height = image_size(pil_image)
     line_y_coords = [0]
     for _, y_line, _, h_line in detected_lines_bboxes:
         line_y_coords.extend([y_line, y_line + h_line])
-    line_y_coords.append(pil_image.height)
+    line_y_coords.append(img_height)
     line_y_coords = sorted(list(set(line_y_coords)))
 
     merged_y = []
@@ -270,41 +365,41 @@ def crop_between_lines(
         
         # 위아래로 3픽셀씩 여유 공간 추가 (이미지 경계 체크)
         y_start_shrink = max(0, y_start + 3)
-        y_end_shrink = min(pil_image.height, y_end - 3)
+        y_end_shrink = min(img_height, y_end - 3)
         
-        cropped_pil = pil_image.crop((5, y_start_shrink, pil_image.width-15, y_end_shrink)) # 상하좌우 일부 픽셀을 잘라내서 표의 선이 잡히지 않도록 함 0610 다훈
-        line_cropped_outputs.append({
+        line_bbox = (5, y_start_shrink, img_width-15, y_end_shrink)
+        cropped_pil = crop_region(pil_image, line_bbox) # 상하좌우 일부 픽셀을 잘라내서 표의 선이 잡히지 않도록 함 0610 다훈
+        line_crop = {
             'image_obj': cropped_pil, 
             'y_top_in_area': y_start,  # 원래 y 좌표는 그대로 유지
             'y_bottom_in_area': y_end  # 원래 y 좌표는 그대로 유지
-        })
+        }
+        if binary is not None:
+            line_crop['mask_obj'] = crop_region(binary, line_bbox)
+        line_cropped_outputs.append(line_crop)
     return line_cropped_outputs
 
-def preprocess_line_image_for_text_contours(line_pil_image: Image.Image) -> List[np.ndarray]:
-    if line_pil_image.mode != 'RGB':
-        line_pil_image = line_pil_image.convert('RGB')
-    cv_image = np.array(line_pil_image)
-    if cv_image.shape[0] < 5 or cv_image.shape[1] < 5: return []
+def preprocess_line_image_for_text_contours(line_pil_image: SheetImage) -> List[np.ndarray]:
+    gray = to_gray_array(line_pil_image)
+    if gray.shape[0] < 5 or gray.shape[1] < 5: return []
 
     # split_and_recognize_single_digits.py와 동일한 단순하고 효과적인 방법 사용
-    gray = cv2.cvtColor(cv_image, cv2.COLOR_RGB2GRAY)
     _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
     contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
     return contours
 
 def merge_contours_and_crop_text_pil(
-    line_pil_image: Image.Image, 
+    line_pil_image: SheetImage, 
     contours: List[np.ndarray],
     merge_distance_threshold: int = 100,
     padding: int = 5
-) -> List[Dict[str, Any]]: # [{'image_obj': Image, 'x_in_line': int, 'y_in_line': int}]
+) -> List[Dict[str, Any]]: # [{'image_obj': Image 또는 흑백 배열, 'x_in_line': int, 'y_in_line': int}]
     bounding_boxes_initial: List[Dict[str, Any]] = []
-    img_width = line_pil_image.width
-    img_height = line_pil_image.height
+    img_width, img_height = image_size(line_pil_image)
     
     # 빈 박스 필터링을 위한 그레이스케일 배열
-    line_np_array = np.array(line_pil_image.convert('L'))
+    line_np_array = to_gray_array(line_pil_image)
     
     for contour in contours:
         x, y, w, h = cv2.boundingRect(contour)
@@ -380,41 +475,167 @@ def merge_contours_and_crop_text_pil(
     if current_merged_box:
         merged_boxes_final.append(current_merged_box)
 
+    return _crop_text_boxes(
+        line_pil_image, line_np_array,
+        [(b['x'], b['y'], b['w'], b['h']) for b in merged_boxes_final],
+        padding
+    )
+
+def _crop_text_boxes(
+    line_pil_image: SheetImage,
+    line_np_array: np.ndarray,
+    boxes: Iterable[Tuple[int, int, int, int]],
+    padding: int,
+    line_mask: Optional[np.ndarray] = None,
+    component_boxes: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    # 병합된 (x, y, w, h) 박스를 padding만큼 넓혀 흰 정사각형 캔버스 가운데에 붙인 텍스트 crop 리스트 (x 오름차순)
+    # line_mask가 있으면 같은 캔버스 좌표의 마스크('mask_obj')와, 중심이 crop 안에 있는 연결 요소 박스('digit_boxes', 캔버스 기준 (x, y, w, h))를 함께 담습니다.
+    img_width, img_height = image_size(line_pil_image)
     final_text_crop_outputs: List[Dict[str, Any]] = []
-    for box_data in merged_boxes_final:
-        x, y, w, h = box_data['x'], box_data['y'], box_data['w'], box_data['h']
+    for x, y, w, h in boxes:
+        x, y, w, h = int(x), int(y), int(w), int(h)
         original_w = w
         original_h = h
         
         x_p = max(0, x - padding)
         y_p = max(0, y - padding)
-        r_p = min(line_pil_image.width, x + w + padding)
-        b_p = min(line_pil_image.height, y + h + padding)
+        r_p = min(img_width, x + w + padding)
+        b_p = min(img_height, y + h + padding)
 
         if r_p <= x_p or b_p <= y_p: continue
 
-        text_crop_pil = line_pil_image.crop((x_p, y_p, r_p, b_p))
-        
-        target_w, target_h = text_crop_pil.width, text_crop_pil.height
+        target_w, target_h = r_p - x_p, b_p - y_p
         
         square_size = max(target_w, target_h)
-        
-        square_canvas_pil = Image.new('RGB', (square_size, square_size), (255, 255, 255))
         paste_x = (square_size - target_w) // 2
         paste_y = (square_size - target_h) // 2
-        square_canvas_pil.paste(text_crop_pil, (paste_x, paste_y))
         
-        final_text_crop_outputs.append({
+        if isinstance(line_pil_image, np.ndarray):
+            # 흑백 배열 경로: 흰 정사각형 캔버스에 바로 복사
+            square_canvas_pil = np.full((square_size, square_size), 255, dtype=np.uint8)
+            square_canvas_pil[paste_y:paste_y + target_h, paste_x:paste_x + target_w] = line_np_array[y_p:b_p, x_p:r_p]
+        else:
+            text_crop_pil = line_pil_image.crop((x_p, y_p, r_p, b_p))
+            square_canvas_pil = Image.new('RGB', (square_size, square_size), (255, 255, 255))
+            square_canvas_pil.paste(text_crop_pil, (paste_x, paste_y))
+        
+        text_crop = {
             'image_obj': square_canvas_pil, 
             'x_in_line': x,
             'y_in_line': y,
             'original_w': original_w,
             'original_h': original_h
-        })
+        }
+        if line_mask is not None:
+            mask_canvas = np.zeros((square_size, square_size), dtype=np.uint8)
+            mask_canvas[paste_y:paste_y + target_h, paste_x:paste_x + target_w] = line_mask[y_p:b_p, x_p:r_p]
+            text_crop['mask_obj'] = mask_canvas
+            if component_boxes is not None:
+                text_crop['digit_boxes'] = _component_boxes_in_crop(component_boxes, (x_p, y_p, r_p, b_p), (paste_x, paste_y))
+        final_text_crop_outputs.append(text_crop)
         
     final_text_crop_outputs.sort(key=lambda item: item['x_in_line'])
     return final_text_crop_outputs 
 
+def _component_boxes_in_crop(
+    component_boxes: np.ndarray,
+    crop_bbox: Tuple[int, int, int, int],
+    paste_offset: Tuple[int, int]
+) -> np.ndarray:
+    # 중심이 crop_bbox (x1, y1, x2, y2) 안에 있는 연결 요소 박스를 crop 경계로 자르고 캔버스 좌표 (x, y, w, h)로 옮김
+    x1, y1, x2, y2 = crop_bbox
+    bx, by, bw, bh = component_boxes.T
+    xc, yc = bx + bw // 2, by + bh // 2
+    inside = (xc >= x1) & (xc < x2) & (yc >= y1) & (yc < y2)
+    left, top = np.maximum(bx[inside], x1), np.maximum(by[inside], y1)
+    right, bottom = np.minimum(bx[inside] + bw[inside], x2), np.minimum(by[inside] + bh[inside], y2)
+    return np.stack([left - x1 + paste_offset[0], top - y1 + paste_offset[1], right - left, bottom - top], axis=1)
+
+# 텍스트 박스 (x, y, w, h) 구조화 배열
+TEXT_BOX_DTYPE = np.dtype([('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32)])
+
+def segment_text_in_line(
+    line_pil_image: SheetImage,
+    merge_distance_threshold: int = 100,
+    padding: int = 5,
+    binary: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]: # [{'image_obj': Image 또는 흑백 배열, 'x_in_line': int, 'y_in_line': int}]
+    """
+    connectedComponentsWithStats 기반 텍스트 분할 (preprocess_line_image_for_text_contours + merge_contours_and_crop_text_pil 대체)
+    
+    같은 이진화와 필터/병합 기준을 쓰되, 컨투어마다 Python 루프를 도는 대신
+    연결 요소 통계(stats)와 적분 영상(summed-area table)으로 모든 박스의 크기/비율/잉크 밀도 필터를 한 번에 계산합니다.
+    병합은 필터를 통과한 박스(구조화 배열)에 대해서만 기존과 같은 x 순서 순차 병합을 합니다.
+    
+    binary(공유 마스크의 라인 slice)를 주면 이진화 없이 그 마스크로 연결 요소와 잉크 밀도를 계산하고,
+    텍스트 crop마다 마스크 캔버스('mask_obj')와 연결 요소 박스('digit_boxes')를 함께 반환해 숫자 단계가 다시 이진화하지 않게 합니다.
+    
+    Returns:
+        merge_contours_and_crop_text_pil과 같은 형식의 텍스트 crop 리스트 (x_in_line 오름차순)
+    """
+    gray = to_gray_array(line_pil_image)
+    img_height, img_width = gray.shape
+    if img_height < 5 or img_width < 5: return []
+
+    # 1. 이진화 후 연결 요소 (배경 label 0 제외). 8-연결이라 외곽 컨투어의 바운딩 박스와 같은 박스가 나옴
+    line_mask = binary
+    if binary is None:
+        _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    stats = stats[1:]
+    x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+
+    # 2. 크기/가로세로 비율 필터 (merge_contours_and_crop_text_pil과 같은 기준)
+    keep = (w <= 0.95 * img_width) & (w >= 2) & (h >= 10) & (w <= 1.8 * h)
+
+    # 3. 잉크 밀도 필터: 어두운 픽셀(< 150, 공유 마스크면 마스크의 잉크) 적분 영상으로 박스별 합계를 한 번에 계산
+    dark = (line_mask > 0) if line_mask is not None else (gray < 150)
+    dark_integral = cv2.integral(dark.astype(np.uint8))
+    x2, y2 = x + w, y + h
+    dark_pixels = dark_integral[y2, x2] - dark_integral[y, x2] - dark_integral[y2, x] + dark_integral[y, x]
+    keep &= dark_pixels >= 0.04 * w * h
+    if not np.any(keep):
+        return []
+
+    boxes = np.empty(int(np.count_nonzero(keep)), dtype=TEXT_BOX_DTYPE)
+    boxes['x'], boxes['y'], boxes['w'], boxes['h'] = x[keep], y[keep], w[keep], h[keep]
+    boxes = boxes[np.argsort(boxes['x'], kind='stable')]
+
+    # 4. x 순서 순차 병합: x 중심 거리가 임계값 미만이고 y 구간이 겹치면 현재 박스에 합침
+    merged = np.empty_like(boxes)
+    merged_count = 0
+    left, top, right, bottom = int(boxes['x'][0]), int(boxes['y'][0]), int(boxes['x'][0] + boxes['w'][0]), int(boxes['y'][0] + boxes['h'][0])
+    for bx, by, bw, bh in boxes[1:].tolist():
+        y_overlap = max(top, by) < min(bottom, by + bh)
+        if abs((bx + bw / 2) - (left + right) / 2) < merge_distance_threshold and y_overlap:
+            left, top, right, bottom = min(left, bx), min(top, by), max(right, bx + bw), max(bottom, by + bh)
+        else:
+            merged[merged_count] = (left, top, right - left, bottom - top)
+            merged_count += 1
+            left, top, right, bottom = bx, by, bx + bw, by + bh
+    merged[merged_count] = (left, top, right - left, bottom - top)
+    merged = merged[:merged_count + 1]
+
+    return _crop_text_boxes(
+        line_pil_image, gray,
+        zip(merged['x'].tolist(), merged['y'].tolist(), merged['w'].tolist(), merged['h'].tolist()),
+        padding,
+        line_mask,
+        np.stack([x, y, w, h], axis=1) if line_mask is not None else None
+    )
+
+def find_text_crops_in_line(line_pil_image: SheetImage, binary: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    config.TEXT_SEGMENTER에 따라 라인 이미지의 텍스트 분할 방식을 선택합니다. 반환 형식은 동일
+    공유 마스크(binary)가 있으면 연결 요소를 숫자 단계에 넘길 수 있는 components 방식을 사용합니다.
+    """
+    if binary is not None or TEXT_SEGMENTER == 'components':
+        return segment_text_in_line(line_pil_image, binary=binary)
+    text_contours = preprocess_line_image_for_text_contours(line_pil_image)
+    return merge_contours_and_crop_text_pil(line_pil_image, text_contours)
+
 def visualize_line_detection_comparison(
     pil_image: Image.Image, 
     save_path: str = None,
@@ -0,0 +1,213 @@
+import json
+import os
+from typing import Any, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ..config import (
+    YOLO_CLASS_QN, YOLO_CLASS_ANS, NUMPY_REGION_PIPELINE,
+    REGION_TEMPLATE_ALIGN_WIDTH, REGION_TEMPLATE_MIN_SCORE, REGION_TEMPLATE_MAX_SHIFT_RATIO
+)
+from ..data_structures import DetectedArea
+from .yolo_detector import yolo_predict_and_extract_areas_batch
+from .sheet_image import SheetImage, load_sheet_gray, image_size, crop_region, to_gray_array, open_sheet_pil
+from .sheet_source import sheet_file_name
+
+# 과목(시험)별 영역 템플릿.
+# 같은 양식의 답안지이므로 기준 답안지 몇 장에서만 YOLO로 qn/ans 영역을 정하고,
+# 나머지 답안지는 축소 흑백 이미지의 위상 상관(phase correlation)으로 기준 답안지와의 평행 이동만 구해 영역을 옮깁니다.
+# 정렬 점수가 낮거나 이동량이 너무 크면(회전/다른 양식 등) 그 답안지만 YOLO로 다시 검출합니다.
+
+Bbox = Tuple[int, int, int, int]
+
+
+def _align_thumbnail(image: SheetImage, size: Tuple[int, int]) -> np.ndarray:
+    """정렬용 축소 흑백 이미지 (float32, 0~1). size=(width, height)"""
+    small = cv2.resize(to_gray_array(image), size, interpolation=cv2.INTER_AREA)
+    return small.astype(np.float32) / 255.0
+
+
+def _scale_bbox(bbox: Bbox, sx: float, sy: float, dx: float, dy: float, image_size: Tuple[int, int]) -> Bbox:
+    width, height = image_size
+    x1 = int(round(bbox[0] * sx + dx))
+    y1 = int(round(bbox[1] * sy + dy))
+    x2 = int(round(bbox[2] * sx + dx))
+    y2 = int(round(bbox[3] * sy + dy))
+    return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+
+def _make_area(image: SheetImage, bbox: Bbox, class_id: int, identifier: str) -> DetectedArea:
+    return DetectedArea(
+        bbox=bbox,
+        class_id=class_id,
+        area_type="question_number" if class_id == YOLO_CLASS_QN else "answer",
+        image_obj=crop_region(image, bbox),
+        original_image_ref=identifier
+    )
+
+
+class RegionTemplate:
+    """
+    Args:
+        image_size: 기준 답안지의 (width, height)
+        qn_bbox, ans_bbox: 기준 답안지에서 YOLO로 검출한 영역 (x1, y1, x2, y2)
+        reference_thumbnail: 기준 답안지의 정렬용 축소 흑백 이미지
+    """
+
+    def __init__(self, image_size: Tuple[int, int], qn_bbox: Bbox, ans_bbox: Bbox, reference_thumbnail: np.ndarray):
+        self.image_size = tuple(image_size)
+        self.qn_bbox = tuple(qn_bbox)
+        self.ans_bbox = tuple(ans_bbox)
+        self.reference_thumbnail = reference_thumbnail.astype(np.float32)
+        height, width = self.reference_thumbnail.shape
+        self._window = cv2.createHanningWindow((width, height), cv2.CV_32F)
+
+    @property
+    def thumbnail_size(self) -> Tuple[int, int]:
+        height, width = self.reference_thumbnail.shape
+        return width, height
+
+    # --- 정렬 ---
+    def align(self, image: SheetImage) -> Tuple[float, float, float]:
+        """
+        기준 답안지 대비 image의 평행 이동량(원본 해상도 px)과 정렬 점수를 반환합니다.
+        Returns:
+            (dx, dy, score): score는 위상 상관 peak 응답값 (0~1, 클수록 확실)
+        """
+        width, height = image_size(image)
+        thumbnail = _align_thumbnail(image, self.thumbnail_size)
+        (shift_x, shift_y), score = cv2.phaseCorrelate(self.reference_thumbnail, thumbnail, self._window)
+        return shift_x * width / self.thumbnail_size[0], shift_y * height / self.thumbnail_size[1], float(score)
+
+    def detect_areas(
+        self,
+        image: SheetImage,
+        identifier: str
+    ) -> Tuple[Optional[DetectedArea], Optional[DetectedArea], float]:
+        """
+        템플릿을 옮겨 (qn_area, ans_area, score)를 반환합니다.
+        정렬 점수가 REGION_TEMPLATE_MIN_SCORE 미만이거나 이동량이 REGION_TEMPLATE_MAX_SHIFT_RATIO를 넘으면 영역은 None입니다.
+        """
+        width, height = image_size(image)
+        dx, dy, score = self.align(image)
+        if score < REGION_TEMPLATE_MIN_SCORE:
+            return None, None, score
+        if abs(dx) > width * REGION_TEMPLATE_MAX_SHIFT_RATIO or abs(dy) > height * REGION_TEMPLATE_MAX_SHIFT_RATIO:
+            return None, None, score
+
+        # 해상도가 다른 스캔은 크기 비율로 맞춘 뒤 이동
+        sx, sy = width / self.image_size[0], height / self.image_size[1]
+        qn_bbox = _scale_bbox(self.qn_bbox, sx, sy, dx, dy, (width, height))
+        ans_bbox = _scale_bbox(self.ans_bbox, sx, sy, dx, dy, (width, height))
+        if qn_bbox[2] <= qn_bbox[0] or qn_bbox[3] <= qn_bbox[1] or ans_bbox[2] <= ans_bbox[0] or ans_bbox[3] <= ans_bbox[1]:
+            return None, None, score
+        return (
+            _make_area(image, qn_bbox, YOLO_CLASS_QN, identifier),
+            _make_area(image, ans_bbox, YOLO_CLASS_ANS, identifier),
+            score
+        )
+
+    # --- 저장/불러오기 (과목 폴더) ---
+    def save(self, path: str) -> None:
+        thumbnail_path = f"{os.path.splitext(path)[0]}.png"
+        cv2.imwrite(thumbnail_path, np.clip(self.reference_thumbnail * 255.0, 0, 255).astype(np.uint8))
+        payload = {
+            "image_size": list(self.image_size),
+            "qn_bbox": list(self.qn_bbox),
+            "ans_bbox": list(self.ans_bbox),
+            "thumbnail": os.path.basename(thumbnail_path)
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RegionTemplate"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            thumbnail = cv2.imread(os.path.join(os.path.dirname(path), payload["thumbnail"]), cv2.IMREAD_GRAYSCALE)
+            if thumbnail is None:
+                print(f"Region template thumbnail missing for {path}")
+                return None
+            return cls(payload["image_size"], payload["qn_bbox"], payload["ans_bbox"], thumbnail.astype(np.float32) / 255.0)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading region template {path}: {e}")
+            return None
+
+    # --- 생성 ---
+    @classmethod
+    def build(cls, reference_image_paths: Sequence[str]) -> Optional["RegionTemplate"]:
+        """
+        기준 답안지들을 YOLO로 검출해, 두 영역이 모두 검출된 답안지 중 영역 위치가 중앙값에 가장 가까운 한 장을 기준으로 삼습니다.
+        """
+        detections = yolo_predict_and_extract_areas_batch(list(reference_image_paths))
+        candidates: List[Tuple[str, Bbox, Bbox]] = [
+            (path, qn_area['bbox'], ans_area['bbox'])
+            for path, (qn_area, ans_area) in zip(reference_image_paths, detections)
+            if qn_area is not None and ans_area is not None
+        ]
+        if not candidates:
+            return None
+
+        coords = np.array([list(qn) + list(ans) for _, qn, ans in candidates], dtype=np.float32)
+        median = np.median(coords, axis=0)
+        best = int(np.argmin(np.abs(coords - median).sum(axis=1)))
+        path, qn_bbox, ans_bbox = candidates[best]
+
+        reference = _open_sheet(path)
+        if reference is None:
+            return None
+        width, height = image_size(reference)
+        align_height = max(1, int(round(height * REGION_TEMPLATE_ALIGN_WIDTH / width)))
+        thumbnail = _align_thumbnail(reference, (REGION_TEMPLATE_ALIGN_WIDTH, align_height))
+        print(f"Region template built from {sheet_file_name(path)} ({len(candidates)}/{len(reference_image_paths)} reference sheets detected)")
+        return cls((width, height), qn_bbox, ans_bbox, thumbnail)
+
+
+def _open_sheet(image_path: str) -> Optional[SheetImage]:
+    # NUMPY_REGION_PIPELINE이면 흑백으로만 디코딩한 배열 (영역은 그 view), 아니면 기존처럼 RGB PIL Image
+    if NUMPY_REGION_PIPELINE:
+        return load_sheet_gray(image_path)
+    try:
+        return open_sheet_pil(image_path)
+    except Exception as e:
+        print(f"Error opening image file for template alignment ({image_path}): {e}")
+        return None
+
+
+def detect_areas_with_template(
+    template: RegionTemplate,
+    image_paths: Sequence[str]
+) -> Tuple[List[Tuple[Optional[DetectedArea], Optional[DetectedArea]]], List[str]]:
+    """
+    답안지마다 템플릿을 정렬해 (qn_area, ans_area)를 구하고, 정렬에 실패한 답안지만 모아 YOLO 배치 검출합니다.
+    Returns:
+        (입력 순서대로의 영역 리스트, 답안지별 검출 방법 "template"/"yolo")
+    """
+    areas: List[Any] = [None] * len(image_paths)
+    methods = ["template"] * len(image_paths)
+    fallback_indices: List[int] = []
+    for idx, image_path in enumerate(image_paths):
+        image = _open_sheet(image_path)
+        if image is None:
+            areas[idx] = (None, None)
+            continue
+        qn_area, ans_area, score = template.detect_areas(image, os.path.splitext(sheet_file_name(image_path))[0])
+        if qn_area is None:
+            print(f"  Template alignment failed for {sheet_file_name(image_path)} (score {score:.3f}), falling back to YOLO")
+            fallback_indices.append(idx)
+        else:
+            areas[idx] = (qn_area, ans_area)
+
+    if fallback_indices:
+        fallback_areas = yolo_predict_and_extract_areas_batch([image_paths[i] for i in fallback_indices])
+        for idx, detected in zip(fallback_indices, fallback_areas):
+            areas[idx] = detected
+            methods[idx] = "yolo"
+    return areas, methods
@@ -0,0 +1,128 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+from typing import Optional, Tuple, Union
+
+from .sheet_source import parse_archive_ref, read_sheet_source_bytes, sheet_disk_path
+
+# 전처리 단계에서 주고받는 이미지 타입.
+# NUMPY_REGION_PIPELINE에서는 답안지를 한 번만 디코딩하고(흑백 uint8), 영역/라인/텍스트 crop은 그 배열의 view로 다룹니다.
+# PIL Image는 기존 호출 경로 및 실패 썸네일처럼 PIL이 필요한 곳에서만 만듭니다.
+SheetImage = Union[Image.Image, np.ndarray]
+
+
+# imdecode는 기본으로 EXIF Orientation에 따라 이미지를 회전하지만, 기존 PIL 경로(Image.open(...).convert("RGB"))는 회전하지 않았습니다.
+# 휴대폰 스캔의 YOLO 영역/crop 좌표가 기존과 같도록 모든 imdecode 플래그에 IMREAD_IGNORE_ORIENTATION을 붙입니다.
+KEEP_ORIENTATION = cv2.IMREAD_IGNORE_ORIENTATION
+
+# 축소 디코딩 배율 -> imdecode 플래그 (JPEG은 DCT 단계에서 축소되어 전체 해상도 디코딩보다 훨씬 빠름)
+REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR | KEEP_ORIENTATION,
+    2: cv2.IMREAD_REDUCED_COLOR_2 | KEEP_ORIENTATION,
+    4: cv2.IMREAD_REDUCED_COLOR_4 | KEEP_ORIENTATION,
+    8: cv2.IMREAD_REDUCED_COLOR_8 | KEEP_ORIENTATION,
+}
+
+
+def read_sheet_bytes(image_path: str) -> Optional[np.ndarray]:
+    """
+    인코딩된 파일 내용. 한글 경로에서도 동작하도록 cv2.imread 대신 버퍼로 읽어 imdecode에 넘깁니다.
+    archive ref(sheet_source.py)면 ZIP 항목을 메모리에서 읽고, named ref면 가리키는 파일을 읽습니다.
+    """
+    if parse_archive_ref(image_path):
+        return read_sheet_source_bytes(image_path)
+    try:
+        return np.fromfile(sheet_disk_path(image_path), dtype=np.uint8)
+    except OSError as e:
+        print(f"Error reading image file {image_path}: {e}")
+        return None
+
+
+def decode_reduced_color(buffer: np.ndarray, min_side: int) -> Optional[np.ndarray]:
+    """
+    긴 변이 min_side 이상으로 남는 가장 큰 배율(1/2/4/8)로 축소 디코딩한 BGR 배열을 반환합니다. 실패 시 None.
+    배율은 헤더만 읽어 구한 원본 크기로 정합니다. (영역 좌표는 전체 해상도 배열과의 크기 비율로 되돌림)
+    """
+    try:
+        full_width, full_height = Image.open(io.BytesIO(buffer)).size
+    except Exception:
+        full_width = full_height = 0
+    factor = 1
+    while factor < 8 and max(full_width, full_height) / (factor * 2) >= min_side:
+        factor *= 2
+    return cv2.imdecode(buffer, REDUCED_COLOR_FLAGS[factor])
+
+
+def decode_gray(buffer: np.ndarray) -> Optional[np.ndarray]:
+    """
+    전체 해상도 흑백 디코딩 (JPEG은 Y 채널만 디코딩하므로 컬러 디코딩 + 변환보다 가볍습니다).
+    libjpeg의 Y 채널은 컬러로 디코딩한 뒤 cvtColor(RGB2GRAY)로 구한 값과 픽셀마다 1~2 정도 다를 수 있습니다.
+    """
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE | KEEP_ORIENTATION)
+
+
+def load_sheet_image(image_path: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    답안지를 한 번 디코딩해 (BGR, 흑백) 배열을 반환합니다. 실패 시 None.
+    BGR은 YOLO 입력(ultralytics의 numpy 입력 규약)으로, 흑백은 이후 모든 crop의 원본으로 사용합니다.
+    """
+    buffer = read_sheet_bytes(image_path)
+    if buffer is None:
+        return None
+    bgr = cv2.imdecode(buffer, cv2.IMREAD_COLOR | KEEP_ORIENTATION)
+    if bgr is None:
+        print(f"Error decoding image file {image_path}")
+        return None
+    return bgr, cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+
+
+def load_sheet_gray(image_path: str) -> Optional[np.ndarray]:
+    buffer = read_sheet_bytes(image_path)
+    gray = decode_gray(buffer) if buffer is not None else None
+    if gray is None:
+        print(f"Error decoding image file {image_path}")
+    return gray
+
+
+def open_sheet_pil(image_path: str) -> Image.Image:
+    """PIL 경로(NUMPY_REGION_PIPELINE=False)용 RGB 이미지. archive ref면 메모리 버퍼에서 엽니다."""
+    if parse_archive_ref(image_path):
+        buffer = read_sheet_source_bytes(image_path)
+        if buffer is None:
+            raise OSError(f"Cannot read archive member: {image_path}")
+        return Image.open(io.BytesIO(buffer.tobytes())).convert("RGB")
+    return Image.open(sheet_disk_path(image_path)).convert("RGB")
+
+
+def image_size(image: SheetImage) -> Tuple[int, int]:
+    """(width, height)"""
+    if isinstance(image, np.ndarray):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+
+def crop_region(image: SheetImage, bbox: Tuple[int, int, int, int]) -> SheetImage:
+    """(x1, y1, x2, y2) 영역. 배열이면 복사 없이 view를 반환합니다."""
+    x1, y1, x2, y2 = bbox
+    if isinstance(image, np.ndarray):
+        return image[y1:y2, x1:x2]
+    return image.crop((x1, y1, x2, y2))
+
+
+def to_gray_array(image: SheetImage) -> np.ndarray:
+    """흑백 uint8 배열. 흑백 배열은 그대로 반환하고, PIL은 기존과 같이 RGB -> GRAY로 변환합니다."""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+
+
+def to_pil_image(image: SheetImage) -> Image.Image:
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    return image
@@ -0,0 +1,273 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 업로드한 ZIP에서 답안지 이미지를 바로 읽는 이미지 소스.
+# 답안지는 "<ZIP 경로>::<항목 이름>[::<답안지 이름>]" 형식의 문자열(archive ref)로 가리키며, 기존 파일 경로 자리에 그대로 넘깁니다.
+# (chunk/worker 프로세스/템플릿 등 경로 문자열을 주고받는 코드는 바뀌지 않고, 디코딩 직전에 read_sheet_bytes가 구분해 읽음)
+# 답안지 이름을 주면 파일명 대신 그 이름을 학번 파싱/결과 파일명에 사용합니다. (압축 해제 후 파일명을 바꾸는 대신)
+# 비압축(stored) 항목은 ZIP 파일의 mmap view를 복사 없이 반환하고, 압축 항목은 메모리에서 풀어 반환합니다.
+# 디스크 파일도 "<파일 경로>::<답안지 이름>"(named ref)으로 이름만 바꿔 넘길 수 있습니다. (학번 매핑 manifest, 파일은 rename하지 않음)
+
+ARCHIVE_REF_SEPARATOR = "::"
+ARCHIVE_SUFFIXES = ('.zip',)
+_LOCAL_HEADER_FORMAT = "<4sHHHHHIIIHH"
+_LOCAL_HEADER_SIZE = struct.calcsize(_LOCAL_HEADER_FORMAT)
+
+
+# --- archive ref ---
+def make_archive_ref(archive_path: str, member: str, sheet_name: Optional[str] = None) -> str:
+    ref = f"{archive_path}{ARCHIVE_REF_SEPARATOR}{member}"
+    return f"{ref}{ARCHIVE_REF_SEPARATOR}{sheet_name}" if sheet_name else ref
+
+
+def parse_archive_ref(path: str) -> Optional[Tuple[str, str, str]]:
+    """archive ref -> (ZIP 경로, 항목 이름, 답안지 이름). 일반 파일 경로면 None"""
+    parts = path.split(ARCHIVE_REF_SEPARATOR)
+    if len(parts) not in (2, 3) or not parts[0].lower().endswith(ARCHIVE_SUFFIXES):
+        return None
+    member = parts[1]
+    sheet_name = parts[2] if len(parts) == 3 else os.path.basename(member)
+    return parts[0], member, sheet_name
+
+
+# --- named ref (디스크 파일 + 답안지 이름) ---
+def make_sheet_ref(file_path: str, sheet_name: str) -> str:
+    """디스크 파일을 다른 답안지 이름으로 가리키는 ref. 이름이 파일명과 같으면 경로 그대로"""
+    if os.path.basename(file_path) == sheet_name:
+        return file_path
+    return f"{file_path}{ARCHIVE_REF_SEPARATOR}{sheet_name}"
+
+
+def parse_named_ref(path: str) -> Optional[Tuple[str, str]]:
+    """named ref -> (파일 경로, 답안지 이름). named ref가 아니면 None"""
+    parts = path.split(ARCHIVE_REF_SEPARATOR)
+    if len(parts) != 2 or parts[0].lower().endswith(ARCHIVE_SUFFIXES):
+        return None
+    return parts[0], parts[1]
+
+
+def sheet_disk_path(path: str) -> str:
+    """디스크에서 읽을 파일 경로 (named ref면 파일 경로, 아니면 그대로)"""
+    named = parse_named_ref(path)
+    return named[0] if named else path
+
+
+def sheet_file_name(path: str) -> str:
+    """답안지 파일명 (archive ref/named ref면 답안지 이름)"""
+    parsed = parse_archive_ref(path) or parse_named_ref(path)
+    return parsed[-1] if parsed else os.path.basename(path)
+
+
+def sheet_group_name(path: str) -> str:
+    """답안지가 들어 있는 폴더 이름 (archive ref면 ZIP 이름 = 압축 해제 폴더 이름)"""
+    parsed = parse_archive_ref(path)
+    return Path(parsed[0]).stem if parsed else Path(sheet_disk_path(path)).parent.name
+
+
+def sheet_exists(path: str) -> bool:
+    parsed = parse_archive_ref(path)
+    if parsed is None:
+        return os.path.exists(sheet_disk_path(path))
+    with open_archive_source(parsed[0]) as source:
+        return source is not None and source.has(parsed[1])
+
+
+def find_sheet_archive(dir_path: str) -> Optional[str]:
+    """폴더(과목 폴더)에 있는 답안지 ZIP (여러 개면 가장 최근 것). 없으면 None"""
+    try:
+        archives = [os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith(ARCHIVE_SUFFIXES)]
+    except OSError:
+        return None
+    archives = [path for path in archives if os.path.isfile(path)]
+    return max(archives, key=os.path.getmtime) if archives else None
+
+
+def read_sheet_source_bytes(path: str) -> Optional[np.ndarray]:
+    """archive ref의 인코딩된 이미지 바이트. 읽을 수 없으면 None (일반 파일 경로는 sheet_image.read_sheet_bytes)"""
+    parsed = parse_archive_ref(path)
+    if parsed is None:
+        return None
+    with open_archive_source(parsed[0]) as source:
+        if source is None:
+            return None
+        try:
+            return source.read(parsed[1])
+        except (KeyError, OSError, zipfile.BadZipFile) as e:
+            print(f"Error reading archive member {path}: {e}")
+            return None
+
+
+def sheet_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """답안지 내용 해시 (blake2b 128bit). 파일이든 ZIP 항목이든 같은 이미지면 같은 값"""
+    digest = hashlib.blake2b(digest_size=16)
+    if parse_archive_ref(path):
+        buffer = read_sheet_source_bytes(path)
+        if buffer is None:
+            raise OSError(f"Cannot read archive member: {path}")
+        digest.update(memoryview(buffer))
+        return digest.hexdigest()
+    with open(sheet_disk_path(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sheet_content_hashes(paths: Sequence[str], workers: int = 4) -> List[str]:
+    """여러 답안지의 내용 해시 (입력 순서). 모두 같은 ZIP의 항목이면 read_many로 동시에 읽고, 아니면 스레드로 나눠 계산"""
+    parsed = [parse_archive_ref(path) for path in paths]
+    archive_paths = {item[0] for item in parsed if item is not None}
+    if parsed and all(parsed) and len(archive_paths) == 1:
+        with open_archive_source(archive_paths.pop()) as source:
+            if source is not None:
+                hashes = []
+                for _, buffer in source.read_many([item[1] for item in parsed], workers):
+                    hashes.append(hashlib.blake2b(memoryview(buffer), digest_size=16).hexdigest())
+                return hashes
+    if workers <= 1 or len(paths) <= 1:
+        return [sheet_content_hash(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="SheetHasher") as executor:
+        return list(executor.map(sheet_content_hash, paths))
+
+
+class ArchiveSheetSource:
+    """
+    Args:
+        archive_path: ZIP 파일 경로. central directory만 읽어 두고, 항목은 read() 때 읽습니다.
+
+    open_archive_source()로만 얻어 씁니다. ZIP이 바뀌어 교체된 source는 쓰는 곳(open_archive_source 블록)이 없고
+    read()가 돌려준 mmap view도 모두 사라졌을 때 닫힙니다.
+    """
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self._zip = zipfile.ZipFile(archive_path)
+        self._file = open(archive_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._members: Dict[str, zipfile.ZipInfo] = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        self._refs = 0 # open_archive_source 블록 안에서 쓰는 중인 수 (_archive_sources_lock으로 보호)
+        self.closed = False
+
+    def names(self, extensions: Optional[Iterable[str]] = None) -> List[str]:
+        """항목 이름 (ZIP 안의 순서 = 순차 읽기 순서). extensions를 주면 그 확장자만, 숨김/__MACOSX 항목 제외"""
+        suffixes = tuple(ext.lower() for ext in extensions) if extensions else None
+        names = []
+        for info in sorted(self._members.values(), key=lambda item: item.header_offset):
+            basename = os.path.basename(info.filename)
+            if not basename or basename.startswith('.') or '__MACOSX' in info.filename:
+                continue
+            if suffixes and not basename.lower().endswith(suffixes):
+                continue
+            names.append(info.filename)
+        return names
+
+    def has(self, member: str) -> bool:
+        return member in self._members
+
+    def size(self, member: str) -> int:
+        return self._members[member].file_size
+
+    def read(self, member: str) -> np.ndarray:
+        """인코딩된 이미지 바이트 (uint8). 비압축 항목은 mmap view (복사 없음, 읽기 전용)"""
+        info = self._members[member]
+        if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+            return np.frombuffer(self._mmap, dtype=np.uint8, count=info.file_size, offset=self._data_offset(info))
+        return np.frombuffer(self._zip.read(member), dtype=np.uint8) # ZipFile은 스레드 간 읽기를 내부 lock으로 보호
+
+    def read_many(self, members: Sequence[str], workers: int = 4) -> Iterator[Tuple[str, np.ndarray]]:
+        """여러 항목을 스레드로 동시에 읽어 (항목 이름, 바이트)를 입력 순서대로 반환합니다. (zlib 압축 해제는 GIL을 놓음)"""
+        if workers <= 1 or len(members) <= 1:
+            for member in members:
+                yield member, self.read(member)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ArchiveReader") as executor:
+            yield from zip(members, executor.map(self.read, members))
+
+    def extract(self, member: str, dest_path: str) -> str:
+        """항목 하나를 dest_path에 씁니다. (검토자가 원본 이미지를 열 때만 사용)"""
+        os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+        tmp_path = f"{dest_path}.{os.getpid()}-{threading.get_ident()}.part" # 같은 답안지를 동시에 여는 요청끼리 겹치지 않도록
+        with open(tmp_path, 'wb') as f:
+            f.write(self.read(member).tobytes())
+        os.replace(tmp_path, dest_path)
+        return dest_path
+
+    def close(self) -> bool:
+        """ZIP/mmap을 닫습니다. read()가 돌려준 mmap view가 아직 남아 있으면 닫지 않고 False"""
+        if self.closed:
+            return True
+        try:
+            self._mmap.close()
+        except BufferError: # view가 남아 있음 (디코딩 전 버퍼 등)
+            return False
+        self._zip.close()
+        self._file.close()
+        self.closed = True
+        return True
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        # local file header의 이름/extra 길이는 central directory와 다를 수 있으므로 헤더에서 직접 읽음
+        header = struct.unpack_from(_LOCAL_HEADER_FORMAT, self._mmap, info.header_offset)
+        if header[0] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad local file header: {info.filename}")
+        return info.header_offset + _LOCAL_HEADER_SIZE + header[9] + header[10]
+
+
+# --- 프로세스별 캐시 (worker 프로세스도 ZIP마다 한 번만 열고 mmap을 재사용) ---
+_archive_sources: Dict[str, Tuple[float, ArchiveSheetSource]] = {}
+_retired_sources: List[ArchiveSheetSource] = [] # ZIP이 바뀌어 교체됐지만 아직 쓰는 곳이 있어 닫지 못한 source
+_archive_sources_lock = threading.Lock()
+
+
+def _close_retired_locked() -> None:
+    _retired_sources[:] = [source for source in _retired_sources if source._refs > 0 or not source.close()]
+
+
+def _acquire_archive_source(archive_path: str) -> Optional[ArchiveSheetSource]:
+    try:
+        mtime = os.path.getmtime(archive_path)
+    except OSError:
+        return None
+    with _archive_sources_lock:
+        _close_retired_locked()
+        cached = _archive_sources.get(archive_path)
+        if cached is not None and cached[0] == mtime:
+            cached[1]._refs += 1
+            return cached[1]
+        try:
+            source = ArchiveSheetSource(archive_path)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Error opening sheet archive {archive_path}: {e}")
+            return None
+        if cached is not None:
+            _retired_sources.append(cached[1])
+            _close_retired_locked()
+        _archive_sources[archive_path] = (mtime, source)
+        source._refs += 1
+        return source
+
+
+@contextmanager
+def open_archive_source(archive_path: str) -> Iterator[Optional[ArchiveSheetSource]]:
+    """
+    ZIP 경로의 ArchiveSheetSource (열 수 없으면 None). 파일이 바뀌면(mtime) 다시 엽니다.
+    블록 안에서는 ZIP이 교체되어도 이 source가 닫히지 않고, 교체된 source는 블록이 끝난 뒤 (mmap view가 없으면) 닫습니다.
+    """
+    source = _acquire_archive_source(archive_path)
+    try:
+        yield source
+    finally:
+        if source is not None:
+            with _archive_sources_lock:
+                source._refs -= 1
+                if source._refs == 0 and source in _retired_sources:
+                    _close_retired_locked()
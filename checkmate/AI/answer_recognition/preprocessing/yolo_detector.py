@@ -1,10 +1,19 @@
+import os
+import numpy as np
 from PIL import Image
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Optional, Union
 
 # config와 data_structures는 상위 디렉토리 또는 answer_recognition 패키지 레벨에서 가져와야 함
 # 현재 yolo_detector.py는 answer_recognition/preprocessing/ 안에 위치
-from ..config import yolo_model, YOLO_CLASS_QN, YOLO_CLASS_ANS
+from ..config import (
+    yolo_model, YOLO_CLASS_QN, YOLO_CLASS_ANS, YOLO_IMGSZ, YOLO_BATCH_SIZE,
+    NUMPY_REGION_PIPELINE, YOLO_REDUCED_DECODE, YOLO_DECODE_MIN_SIDE
+)
 from ..data_structures import DetectedArea
+from .sheet_image import (
+    SheetImage, load_sheet_image, read_sheet_bytes, decode_reduced_color, decode_gray, crop_region, image_size, open_sheet_pil
+)
+from .sheet_source import sheet_file_name
 
 def yolo_predict_and_extract_areas_pil(
     original_pil_image: Image.Image,
@@ -19,19 +28,57 @@ def yolo_predict_and_extract_areas_pil(
         print("YOLO model is not loaded. Cannot perform detection.")
         return None, None
 
+    results = yolo_model(original_pil_image, imgsz=YOLO_IMGSZ, verbose=False)
+    return _extract_areas_from_results(results, original_pil_image, original_image_identifier)
+
+
+def yolo_predict_and_extract_areas_array(
+    sheet_bgr: np.ndarray,
+    sheet_gray: np.ndarray,
+    original_image_identifier: str,
+    copy_regions: bool = False
+) -> Tuple[Optional[DetectedArea], Optional[DetectedArea]]:
+    """
+    배열 입력용. BGR 배열로 검출하고, 영역(image_obj)은 흑백 배열에서 잘라 반환합니다. (기본은 view)
+    sheet_bgr는 축소 디코딩된 배열이어도 되며, 박스는 sheet_gray와의 크기 비율로 전체 해상도 좌표로 되돌립니다.
+    copy_regions=True면 영역을 복사해 sheet_gray 전체를 일찍 해제할 수 있게 합니다.
+    """
+    if not yolo_model:
+        print("YOLO model is not loaded. Cannot perform detection.")
+        return None, None
+
+    results = yolo_model(sheet_bgr, imgsz=YOLO_IMGSZ, verbose=False)
+    return _extract_areas_from_results(results, sheet_gray, original_image_identifier, image_size(sheet_bgr), copy_regions)
+
+
+def _extract_areas_from_results(
+    results: Iterable[Any],
+    original_pil_image: SheetImage,
+    original_image_identifier: str,
+    detect_size: Optional[Tuple[int, int]] = None,
+    copy_regions: bool = False
+) -> Tuple[Optional[DetectedArea], Optional[DetectedArea]]:
+    """
+    YOLO 결과에서 클래스별 첫 번째 박스를 잘라 (qn_area, ans_area)로 반환합니다. (배열이면 view)
+    detect_size(검출 입력의 (width, height))가 crop 원본과 다르면 박스를 crop 원본 좌표로 비율 변환합니다.
+    """
     qn_area: Optional[DetectedArea] = None
     ans_area: Optional[DetectedArea] = None
-
-    results = yolo_model(original_pil_image, verbose=False)
+    crop_width, crop_height = image_size(original_pil_image)
+    sx = crop_width / detect_size[0] if detect_size else 1.0
+    sy = crop_height / detect_size[1] if detect_size else 1.0
 
     for result in results:
         boxes = result.boxes
         for box in boxes:
             class_id = int(box.cls)
             xyxy = box.xyxy[0].tolist()
-            x1, y1, x2, y2 = int(xyxy[0]), int(xyxy[1]), int(xyxy[2]), int(xyxy[3])
+            x1, y1, x2, y2 = int(xyxy[0] * sx), int(xyxy[1] * sy), int(xyxy[2] * sx), int(xyxy[3] * sy)
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(crop_width, x2), min(crop_height, y2)
             
-            cropped_pil_image = original_pil_image.crop((x1, y1, x2, y2))
+            cropped_pil_image = crop_region(original_pil_image, (x1, y1, x2, y2))
+            if copy_regions and isinstance(cropped_pil_image, np.ndarray):
+                cropped_pil_image = cropped_pil_image.copy()
             area_type_str = ""
 
             if class_id == YOLO_CLASS_QN and qn_area is None:
@@ -58,4 +105,82 @@ def yolo_predict_and_extract_areas_pil(
         if qn_area is not None and ans_area is not None:
             break
     
-    return qn_area, ans_area 
\ No newline at end of file
+    return qn_area, ans_area 
+
+def _load_for_batch(image_path: str) -> Tuple[Any, Optional[Callable[[], Optional[SheetImage]]]]:
+    """경로 -> (YOLO 입력, crop 원본을 돌려주는 함수). 열 수 없으면 (None, None)"""
+    if not NUMPY_REGION_PIPELINE:
+        try:
+            pil_image = open_sheet_pil(image_path)
+            return pil_image, lambda: pil_image
+        except Exception as e:
+            print(f"Error opening image file for YOLO detection ({image_path}): {e}")
+            return None, None
+    if YOLO_REDUCED_DECODE:
+        # 검출은 축소 디코딩으로, 전체 해상도 흑백은 영역을 자를 때 한 장씩 디코딩
+        buffer = read_sheet_bytes(image_path)
+        reduced_bgr = decode_reduced_color(buffer, YOLO_DECODE_MIN_SIDE) if buffer is not None else None
+        if reduced_bgr is None:
+            print(f"Error decoding image file for YOLO detection ({image_path})")
+            return None, None
+        return reduced_bgr, lambda: decode_gray(buffer)
+    loaded = load_sheet_image(image_path)
+    if loaded is None:
+        return None, None
+    return loaded[0], lambda: loaded[1]
+
+
+def _iter_batches(
+    images_or_paths: Iterable[Union[Image.Image, str]],
+    batch_size: int
+) -> Iterator[List[Tuple[str, Any, Optional[Callable[[], Optional[SheetImage]]]]]]:
+    # 경로는 배치에 들어갈 때 열어서, 제너레이터를 넘겨도 한 번에 batch_size장만 메모리에 올라가도록 함
+    # 각 항목은 (식별자, YOLO 입력, crop 원본을 돌려주는 함수). 열 수 없으면 함수가 None
+    batch: List[Tuple[str, Any, Optional[Callable[[], Optional[SheetImage]]]]] = []
+    for idx, item in enumerate(images_or_paths):
+        if isinstance(item, Image.Image):
+            batch.append((f"image{idx}", item, lambda image=item: image))
+        else:
+            detect_input, load_crop_source = _load_for_batch(item)
+            batch.append((os.path.splitext(sheet_file_name(item))[0], detect_input, load_crop_source))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def yolo_predict_and_extract_areas_batch(
+    images_or_paths: Iterable[Union[Image.Image, str]],
+    batch_size: int = YOLO_BATCH_SIZE
+) -> List[Tuple[Optional[DetectedArea], Optional[DetectedArea]]]:
+    """
+    여러 답안지(PIL Image 또는 이미지 경로, 제너레이터 가능)를 batch_size장씩 한 번의 YOLO 호출로 검출합니다.
+    입력 순서대로 답안지마다 (qn_area, ans_area)를 반환하며, 열 수 없는 이미지나 검출되지 않은 영역은 None입니다.
+    NUMPY_REGION_PIPELINE이면 경로 입력의 영역은 흑백 배열로 반환하고,
+    YOLO_REDUCED_DECODE이면 검출은 축소 디코딩으로 하고 전체 해상도는 영역을 자를 때만 디코딩합니다.
+    """
+    if not yolo_model:
+        print("YOLO model is not loaded. Cannot perform detection.")
+        return [(None, None) for _ in images_or_paths]
+
+    areas: List[Tuple[Optional[DetectedArea], Optional[DetectedArea]]] = []
+    for batch in _iter_batches(images_or_paths, batch_size):
+        valid = [detect_input for _, detect_input, load_crop_source in batch if load_crop_source is not None]
+        results = yolo_model(valid, imgsz=YOLO_IMGSZ, verbose=False) if valid else []
+        result_iter = iter(results)
+        for identifier, detect_input, load_crop_source in batch:
+            if load_crop_source is None:
+                areas.append((None, None))
+                continue
+            result = next(result_iter)
+            crop_source = load_crop_source()
+            if crop_source is None:
+                areas.append((None, None))
+                continue
+            # 축소 디코딩이면 전체 해상도 흑백은 이 답안지의 영역만 복사해 두고 바로 해제
+            copy_regions = isinstance(crop_source, np.ndarray) and image_size(crop_source) != image_size(detect_input)
+            areas.append(_extract_areas_from_results(
+                [result], crop_source, identifier, image_size(detect_input), copy_regions
+            ))
+    return areas
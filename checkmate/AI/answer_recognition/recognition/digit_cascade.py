@@ -0,0 +1,174 @@
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .digit_preprocess import normalize_digit_masks
+
+# 2단계 숫자 분류 cascade.
+#   1단계: HOG + 선형(softmax) 모델 (numpy만 사용, CPU에서 수 ms 이내로 배치 처리)
+#   2단계: 기존 transformer 분류기 (1단계 신뢰도가 임계값 미만인 crop만)
+
+HOG_CELL = 7     # 28x28 캔버스 -> 4x4 셀
+HOG_BINS = 9     # 무방향 기울기 0~180도를 9개 구간으로
+
+_scope = threading.local() # cascade_stats_scope()로 모으는 스레드별 카운터
+
+
+def empty_cascade_stats() -> Dict[str, float]:
+    return {"tier1_items": 0, "tier1_accepted": 0, "tier1_seconds": 0.0, "tier2_items": 0, "tier2_seconds": 0.0}
+
+
+def merge_cascade_stats(total: Dict[str, float], counts: Dict[str, float]) -> Dict[str, float]:
+    """counts를 total에 더합니다. (worker chunk별 카운터를 작업 단위로 합칠 때)"""
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def summarize_cascade_stats(stats: Dict[str, float]) -> Dict[str, Any]:
+    """카운터에 1단계 통과 비율과 단계별 crop당 지연 시간(ms)을 더한 보고용 dict"""
+    summary: Dict[str, Any] = dict(stats)
+    summary["tier1_accept_ratio"] = stats["tier1_accepted"] / stats["tier1_items"] if stats["tier1_items"] else 0.0
+    summary["tier1_ms_per_item"] = stats["tier1_seconds"] * 1000 / stats["tier1_items"] if stats["tier1_items"] else 0.0
+    summary["tier2_ms_per_item"] = stats["tier2_seconds"] * 1000 / stats["tier2_items"] if stats["tier2_items"] else 0.0
+    return summary
+
+
+@contextmanager
+def cascade_stats_scope() -> Iterator[Dict[str, float]]:
+    """
+    with 블록 안에서 이 스레드가 실행한 cascade 처리 개수/지연 시간만 모은 카운터를 돌려줍니다.
+    프로세스 누적 통계(DigitClassifierCascade.stats)와 달리 chunk/작업 단위로 집계할 때 사용합니다.
+    """
+    counters = empty_cascade_stats()
+    previous = getattr(_scope, "counters", None)
+    _scope.counters = counters
+    try:
+        yield counters
+    finally:
+        _scope.counters = previous
+
+
+def hog_features(normalized: np.ndarray) -> np.ndarray:
+    """
+    (N, 28, 28) 정규화 숫자 배치 -> (N, F) 특징.
+    셀별 기울기 방향 히스토그램(HOG)과 14x14로 줄인 픽셀값을 이어 붙입니다. 배치 전체를 한 번에 계산합니다.
+    """
+    n, size, _ = normalized.shape
+    gy, gx = np.gradient(normalized, axis=(1, 2))
+    magnitude = np.hypot(gx, gy)
+    angle = np.mod(np.arctan2(gy, gx), np.pi)
+    bins = np.minimum((angle / np.pi * HOG_BINS).astype(np.int64), HOG_BINS - 1)
+
+    cells_per_side = size // HOG_CELL
+    cell_rows = (np.arange(size) // HOG_CELL)[:, None]
+    cell_cols = (np.arange(size) // HOG_CELL)[None, :]
+    cell_index = (cell_rows * cells_per_side + cell_cols)[None, :, :]
+    n_features = cells_per_side * cells_per_side * HOG_BINS
+    flat_index = np.arange(n)[:, None, None] * n_features + cell_index * HOG_BINS + bins
+    hog = np.bincount(flat_index.ravel(), weights=magnitude.ravel(), minlength=n * n_features).reshape(n, n_features)
+    hog /= np.linalg.norm(hog, axis=1, keepdims=True) + 1e-6
+
+    pooled = normalized.reshape(n, size // 2, 2, size // 2, 2).mean(axis=(2, 4)).reshape(n, -1)
+    return np.concatenate([hog, pooled], axis=1).astype(np.float32)
+
+
+class TinyDigitClassifier:
+    """train_tiny_digit_model.py가 저장한 .npz(weights, bias, mean, std, labels)를 불러오는 HOG + softmax 분류기."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, mean: np.ndarray, std: np.ndarray, labels: Sequence[str]):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.mean = mean.astype(np.float32)
+        self.std = std.astype(np.float32)
+        self.labels = [str(label) for label in labels]
+
+    @classmethod
+    def load(cls, model_path: str) -> "TinyDigitClassifier":
+        data = np.load(model_path, allow_pickle=False)
+        return cls(data['weights'], data['bias'], data['mean'], data['std'], data['labels'].tolist())
+
+    def save(self, model_path: str) -> None:
+        np.savez_compressed(model_path, weights=self.weights, bias=self.bias, mean=self.mean, std=self.std, labels=np.array(self.labels))
+
+    def predict_normalized(self, normalized: np.ndarray) -> List[Tuple[str, float]]:
+        if normalized.shape[0] == 0:
+            return []
+        features = (hog_features(normalized) - self.mean) / self.std
+        logits = features @ self.weights + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        top_idx = probs.argmax(axis=1)
+        return [(self.labels[idx], float(probs[row, idx])) for row, idx in enumerate(top_idx)]
+
+    def predict_masks(self, masks: Sequence[np.ndarray]) -> List[Tuple[str, float]]:
+        return self.predict_normalized(normalize_digit_masks(masks))
+
+
+class DigitClassifierCascade:
+    """
+    1단계(tiny) 모델이 모든 crop을 먼저 채점하고, 신뢰도가 threshold 미만인 crop만 2단계(fallback_fn)로 보냅니다.
+    stats에 단계별 처리 개수와 누적 지연 시간이 기록됩니다.
+    """
+
+    def __init__(self, tiny_model: TinyDigitClassifier, threshold: float = 0.97):
+        self.tiny_model = tiny_model
+        self.threshold = threshold
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, float] = empty_cascade_stats()
+
+    def predict(
+        self,
+        masks: Sequence[np.ndarray],
+        fallback_fn: Callable[[List[int]], List[Tuple[str, float]]]
+    ) -> List[Tuple[str, float]]:
+        """
+        Args:
+            masks: 숫자 crop 이진 마스크 (잉크=255)
+            fallback_fn: 2단계로 보낼 crop의 인덱스 리스트를 받아 같은 순서의 (label, score)를 반환하는 함수
+        """
+        started = time.perf_counter()
+        results = self.tiny_model.predict_masks(masks)
+        tier1_seconds = time.perf_counter() - started
+
+        doubtful = [i for i, (_, score) in enumerate(results) if score < self.threshold]
+        tier2_seconds = 0.0
+        if doubtful:
+            started = time.perf_counter()
+            for i, prediction in zip(doubtful, fallback_fn(doubtful)):
+                results[i] = prediction
+            tier2_seconds = time.perf_counter() - started
+
+        counts = {
+            "tier1_items": len(results), "tier1_accepted": len(results) - len(doubtful), "tier1_seconds": tier1_seconds,
+            "tier2_items": len(doubtful), "tier2_seconds": tier2_seconds
+        }
+        with self._stats_lock:
+            merge_cascade_stats(self.stats, counts)
+        scope_counters = getattr(_scope, "counters", None)
+        if scope_counters is not None:
+            merge_cascade_stats(scope_counters, counts)
+        return results
+
+    def report(self) -> Dict[str, Any]:
+        """이 프로세스의 누적 통계"""
+        with self._stats_lock:
+            return summarize_cascade_stats(dict(self.stats))
+
+
+def load_digit_cascade(model_path: str, threshold: float) -> Optional[DigitClassifierCascade]:
+    if not Path(model_path).exists():
+        print(f"Tiny digit model not found at {model_path}. Cascade disabled. (python -m answer_recognition.train_tiny_digit_model)")
+        return None
+    try:
+        cascade = DigitClassifierCascade(TinyDigitClassifier.load(model_path), threshold=threshold)
+        print(f"Tiny digit model loaded successfully from {model_path} (cascade threshold={threshold})")
+        return cascade
+    except Exception as e:
+        print(f"Error loading tiny digit model: {e}")
+        return None
@@ -0,0 +1,122 @@
+import cv2
+
+# INTER_LINEAR이 없으면 대체값 직접 설정 (보통 1)
+if not hasattr(cv2, 'INTER_LINEAR'):
+    cv2.INTER_LINEAR = 1
+
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+
+# 숫자 crop의 이진 마스크(잉크=255)를 PIL/HF image processor를 거치지 않고
+# 한 번에 모델 입력 텐서(N, 3, H, W)로 만드는 전처리 fast path.
+
+MNIST_CANVAS_SIZE = 28   # MNIST 캔버스 크기
+MNIST_DIGIT_BOX = 20     # 캔버스 안에서 숫자가 차지하는 최대 크기 (비율 유지)
+CV_MAX_CHANNELS = 512    # cv2.resize가 한 번에 처리할 수 있는 최대 채널 수
+
+
+def normalize_digit_masks(masks: Sequence[np.ndarray], canvas: int = MNIST_CANVAS_SIZE, box: int = MNIST_DIGIT_BOX) -> np.ndarray:
+    """
+    MNIST 방식 정규화: 비율을 유지해 box x box 안에 맞추고, canvas x canvas 중앙에 놓은 뒤
+    잉크의 무게중심이 캔버스 중앙에 오도록 이동합니다.
+
+    Args:
+        masks: 숫자 crop의 이진 마스크 리스트 (uint8, 잉크 > 0)
+    Returns:
+        np.ndarray: (N, canvas, canvas) float32, 잉크=1.0 / 배경=0.0
+    """
+    batch = np.zeros((len(masks), canvas, canvas), dtype=np.float32)
+    for i, mask in enumerate(masks):
+        h, w = mask.shape[:2]
+        if h == 0 or w == 0:
+            continue
+        scale = box / max(h, w)
+        new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        resized = cv2.resize((mask > 0).astype(np.float32), (new_w, new_h), interpolation=cv2.INTER_AREA)
+        top, left = (canvas - new_h) // 2, (canvas - new_w) // 2
+        batch[i, top:top + new_h, left:left + new_w] = resized
+
+    # 무게중심 이동 (배치 전체를 한 번에 gather)
+    coords = np.arange(canvas, dtype=np.float32)
+    mass = batch.sum(axis=(1, 2))
+    safe_mass = np.where(mass > 0, mass, 1.0)
+    cy = (batch.sum(axis=2) * coords).sum(axis=1) / safe_mass
+    cx = (batch.sum(axis=1) * coords).sum(axis=1) / safe_mass
+    center = (canvas - 1) / 2.0
+    dy = np.where(mass > 0, np.round(center - cy), 0).astype(np.int64)
+    dx = np.where(mass > 0, np.round(center - cx), 0).astype(np.int64)
+
+    src_y = np.arange(canvas)[None, :, None] - dy[:, None, None]
+    src_x = np.arange(canvas)[None, None, :] - dx[:, None, None]
+    valid = (src_y >= 0) & (src_y < canvas) & (src_x >= 0) & (src_x < canvas)
+    shifted = batch[np.arange(len(masks))[:, None, None], np.clip(src_y, 0, canvas - 1), np.clip(src_x, 0, canvas - 1)]
+    return np.where(valid, shifted, 0.0).astype(np.float32)
+
+
+def processor_settings(image_processor: Any) -> Dict[str, Any]:
+    """HF image processor 설정에서 입력 크기와 정규화 값을 꺼냅니다. (없으면 ViT 기본값)"""
+    size = getattr(image_processor, 'size', None) or {}
+    if isinstance(size, dict):
+        height = size.get('height') or size.get('shortest_edge') or 224
+        width = size.get('width') or size.get('shortest_edge') or height
+    else:
+        height = width = int(size)
+    mean = getattr(image_processor, 'image_mean', None) or [0.5, 0.5, 0.5]
+    std = getattr(image_processor, 'image_std', None) or [0.5, 0.5, 0.5]
+    do_normalize = getattr(image_processor, 'do_normalize', True)
+    return {"height": int(height), "width": int(width), "mean": mean, "std": std, "do_normalize": do_normalize}
+
+
+def masks_to_pixel_values(masks: Sequence[np.ndarray], settings: Dict[str, Any], ink_on_white: bool = True) -> np.ndarray:
+    """
+    이진 마스크 리스트 -> 모델 입력 (N, 3, H, W) float32.
+    ink_on_white=True면 기존 경로(흰 종이에 검은 글씨 crop을 그대로 입력)와 같은 극성으로 만듭니다.
+    """
+    if not len(masks):
+        return np.zeros((0, 3, settings["height"], settings["width"]), dtype=np.float32)
+    normalized = normalize_digit_masks(masks)
+    if ink_on_white:
+        normalized = 1.0 - normalized
+
+    # (N, 28, 28) -> (28, 28, N)으로 놓고 채널 단위로 한 번에 리사이즈
+    resized_chunks = []
+    for start in range(0, normalized.shape[0], CV_MAX_CHANNELS):
+        chunk = np.ascontiguousarray(normalized[start:start + CV_MAX_CHANNELS].transpose(1, 2, 0))
+        resized = cv2.resize(chunk, (settings["width"], settings["height"]), interpolation=cv2.INTER_LINEAR)
+        if resized.ndim == 2:
+            resized = resized[:, :, None]
+        resized_chunks.append(resized.transpose(2, 0, 1))
+    pixels = np.concatenate(resized_chunks, axis=0)[:, None, :, :].repeat(3, axis=1)
+
+    if settings["do_normalize"]:
+        mean = np.asarray(settings["mean"], dtype=np.float32).reshape(1, 3, 1, 1)
+        std = np.asarray(settings["std"], dtype=np.float32).reshape(1, 3, 1, 1)
+        pixels = (pixels - mean) / std
+    return pixels.astype(np.float32, copy=False)
+
+
+def logits_to_top1(logits: np.ndarray, id2label: Dict[int, str]) -> List[Tuple[str, float]]:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(shifted)
+    probs /= probs.sum(axis=1, keepdims=True)
+    top_idx = probs.argmax(axis=1)
+    return [(str(id2label.get(int(idx), int(idx))), float(probs[row, idx])) for row, idx in enumerate(top_idx)]
+
+
+def classify_digit_masks(classifier: Any, masks: Sequence[np.ndarray]) -> List[Tuple[str, float]]:
+    """
+    마스크 배치를 전처리한 뒤 쌓은 텐서를 모델에 바로 넣어 (label, score) 리스트를 반환합니다.
+    classifier는 transformers pipeline(torch) 또는 onnx_backend.OnnxImageClassifier입니다.
+    """
+    if not len(masks):
+        return []
+    pixel_values = masks_to_pixel_values(masks, processor_settings(classifier.image_processor))
+    if hasattr(classifier, 'predict_logits'): # ONNX 백엔드
+        return logits_to_top1(classifier.predict_logits(pixel_values), classifier.id2label)
+
+    import torch
+    model = classifier.model
+    with torch.no_grad():
+        logits = model(pixel_values=torch.from_numpy(pixel_values).to(model.device)).logits
+    id2label = {int(k): v for k, v in model.config.id2label.items()}
+    return logits_to_top1(logits.float().cpu().numpy(), id2label)
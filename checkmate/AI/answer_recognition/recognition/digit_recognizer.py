@@ -5,12 +5,27 @@ import cv2
 if not hasattr(cv2, 'INTER_LINEAR'):
     cv2.INTER_LINEAR = 1
 
+import hashlib
 import numpy as np
+import threading
+from collections import OrderedDict
 from typing import List, Tuple, Dict, Any, Optional
 
 # config는 상위 디렉토리 또는 answer_recognition 패키지 레벨에서 가져와야 함
 # 현재 digit_recognizer.py는 answer_recognition/recognition/ 안에 위치
-from ..config import mnist_recognition_pipeline
+from ..config import (
+    mnist_recognition_pipeline, MNIST_BATCH_SIZE,
+    DIGIT_INFERENCE_SERVICE_ENABLED, DIGIT_INFERENCE_MAX_WAIT_MS, DIGIT_INFERENCE_AUTOTUNE,
+    DIGIT_PREPROCESS_FAST_PATH,
+    DIGIT_CASCADE_ENABLED, DIGIT_CASCADE_THRESHOLD, TINY_DIGIT_MODEL_PATH,
+    DIGIT_PREDICTION_CACHE_ENABLED, DIGIT_PREDICTION_CACHE_MAX_ENTRIES, DIGIT_PREDICTION_CACHE_KEY_SIZE,
+    DIGIT_PREDICTION_CACHE_MAX_SUBJECTS,
+    INFERENCE_BACKEND, ONNX_QUANTIZED
+)
+from .prediction_cache import DigitPredictionCache
+from .inference_service import DigitInferenceService
+from .digit_cascade import DigitClassifierCascade, load_digit_cascade
+from .digit_preprocess import classify_digit_masks
 
 # 이 파일의 함수들은 mnist_recognition_pipeline을 사용합니다.
 
@@ -35,27 +50,218 @@ def pil_find_digit_contours_in_text_crop(text_crop_pil: Image.Image, min_contour
     digit_bboxes.sort(key=lambda bbox: bbox[0])
     return digit_bboxes
 
+def binarize_digit_image(digit_image_pil: Image.Image) -> np.ndarray:
+    # Otsu 반전 이진화 (잉크=255). fast path의 입력 마스크를 만들 때 사용
+    _, thresh = cv2.threshold(np.array(digit_image_pil.convert('L')), 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return thresh
+
 def pil_recognize_single_digit(digit_image_pil: Image.Image) -> Optional[Dict[str, Any]]: # mnist_pipe 인자 제거, 내부에서 import된 pipeline 사용
     if not mnist_recognition_pipeline: return None
-    try:
-        if digit_image_pil.width == 0 or digit_image_pil.height == 0: return None
-        predictions = mnist_recognition_pipeline(digit_image_pil)
-        if predictions and isinstance(predictions, list) and predictions[0]:
-            top_prediction = predictions[0]
-            if 'label' in top_prediction and 'score' in top_prediction and isinstance(top_prediction['label'], str) and top_prediction['label'].isdigit() and isinstance(top_prediction['score'], float):
-                return {'text': top_prediction['label'], 'confidence': float(top_prediction['score'])}
-    except Exception as e: print(f"Error during single digit recognition: {e}, image size: {digit_image_pil.size}")
+    if digit_image_pil.width == 0 or digit_image_pil.height == 0: return None
+    label, score = recognize_digit_images_batch([digit_image_pil], [binarize_digit_image(digit_image_pil)])[0]
+    if label.isdigit():
+        return {'text': label, 'confidence': score}
     return None
 
+def _top_prediction_to_result(predictions: Any) -> Tuple[str, float]:
+    # 파이프라인 출력([{'label', 'score'}, ...])에서 1순위 결과만 (label, score)로 변환
+    if predictions and isinstance(predictions, list) and predictions[0]:
+        top_prediction = predictions[0]
+        return str(top_prediction.get('label', '?')), float(top_prediction.get('score', 0.0))
+    return '?', 0.0
+
+def _predict_digit_images_direct(digit_images: List[Image.Image], batch_size: int = MNIST_BATCH_SIZE) -> List[Tuple[str, float]]:
+    # 파이프라인을 호출 스레드에서 직접 batch_size 단위로 호출 (서비스 워커의 predict_fn으로도 사용)
+    results: List[Tuple[str, float]] = [('?', 0.0)] * len(digit_images)
+    if not mnist_recognition_pipeline or not digit_images: return results
+    batch_size = max(1, batch_size)
+    for start in range(0, len(digit_images), batch_size):
+        chunk = [img.convert('L') for img in digit_images[start:start + batch_size]]
+        try:
+            chunk_predictions = mnist_recognition_pipeline(chunk, batch_size=len(chunk))
+            for offset, predictions in enumerate(chunk_predictions):
+                results[start + offset] = _top_prediction_to_result(predictions)
+        except Exception as e:
+            print(f"Error during batched digit recognition ({len(chunk)} images): {e}. Falling back to per-image calls.")
+            for offset, img in enumerate(chunk):
+                try: results[start + offset] = _top_prediction_to_result(mnist_recognition_pipeline(img))
+                except Exception: results[start + offset] = ('?', 0.0)
+    return results
+
+def _predict_digit_masks_direct(digit_masks: List[np.ndarray], batch_size: int = MNIST_BATCH_SIZE) -> List[Tuple[str, float]]:
+    # fast path: 이진 마스크를 numpy로 한 번에 정규화해 모델에 텐서로 바로 입력 (PIL/HF processor 생략)
+    results: List[Tuple[str, float]] = [('?', 0.0)] * len(digit_masks)
+    if not mnist_recognition_pipeline or not digit_masks: return results
+    batch_size = max(1, batch_size)
+    for start in range(0, len(digit_masks), batch_size):
+        chunk = digit_masks[start:start + batch_size]
+        try:
+            results[start:start + len(chunk)] = classify_digit_masks(mnist_recognition_pipeline, chunk)
+        except Exception as e:
+            print(f"Error during fast-path digit recognition ({len(chunk)} masks): {e}")
+    return results
+
+def _predict_digit_items_direct(items: List[Any]) -> List[Tuple[str, float]]:
+    # 서비스 워커의 predict_fn: 마스크(np.ndarray)는 fast path, PIL 이미지는 파이프라인 경로
+    # 여러 요청이 한 배치로 합쳐지므로 두 종류가 섞일 수 있음 -> 종류별로 나눠 추론한 뒤 원래 순서로 되돌림
+    mask_indices = [i for i, item in enumerate(items) if isinstance(item, np.ndarray)]
+    image_indices = [i for i, item in enumerate(items) if not isinstance(item, np.ndarray)]
+    results: List[Tuple[str, float]] = [('?', 0.0)] * len(items)
+    if mask_indices:
+        predictions = _predict_digit_masks_direct([items[i] for i in mask_indices], batch_size=len(mask_indices))
+        for i, prediction in zip(mask_indices, predictions): results[i] = prediction
+    if image_indices:
+        predictions = _predict_digit_images_direct([items[i] for i in image_indices], batch_size=len(image_indices))
+        for i, prediction in zip(image_indices, predictions): results[i] = prediction
+    return results
+
+_digit_inference_service: Optional[DigitInferenceService] = None
+_digit_inference_service_lock = threading.Lock()
+_digit_inference_service_disabled = False
+
+def disable_digit_inference_service() -> None:
+    """
+    이 프로세스에서는 공유 추론 서비스 없이 호출 스레드에서 바로 추론합니다.
+    sheet_worker의 worker 프로세스는 한 번에 chunk 하나만 처리하므로 다른 작업과 배치가 합쳐지지 않고 대기 시간만 늘어납니다.
+    """
+    global _digit_inference_service_disabled
+    _digit_inference_service_disabled = True
+
+def get_digit_inference_service() -> Optional[DigitInferenceService]:
+    """프로세스 전역 DigitInferenceService를 처음 호출될 때(첫 숫자 인식 요청) 생성(및 autotune)하여 반환합니다."""
+    global _digit_inference_service
+    if not DIGIT_INFERENCE_SERVICE_ENABLED or _digit_inference_service_disabled or not mnist_recognition_pipeline: return None
+    with _digit_inference_service_lock:
+        if _digit_inference_service is None:
+            service = DigitInferenceService(
+                predict_fn=_predict_digit_items_direct,
+                max_batch_size=MNIST_BATCH_SIZE,
+                max_wait_ms=DIGIT_INFERENCE_MAX_WAIT_MS
+            )
+            if DIGIT_INFERENCE_AUTOTUNE:
+                sample = np.full((20, 14), 255, dtype=np.uint8) if DIGIT_PREPROCESS_FAST_PATH else None
+                service.autotune_batch_size(sample_image=sample)
+            _digit_inference_service = service.start()
+    return _digit_inference_service
+
+_digit_cascade: Optional[DigitClassifierCascade] = None
+_digit_cascade_loaded = False
+_digit_cascade_lock = threading.Lock()
+
+def get_digit_cascade() -> Optional[DigitClassifierCascade]:
+    """tiny 모델 cascade를 처음 호출될 때 불러옵니다. 비활성화되었거나 모델 파일이 없으면 None."""
+    global _digit_cascade, _digit_cascade_loaded
+    if not DIGIT_CASCADE_ENABLED: return None
+    with _digit_cascade_lock:
+        if not _digit_cascade_loaded:
+            _digit_cascade = load_digit_cascade(TINY_DIGIT_MODEL_PATH, DIGIT_CASCADE_THRESHOLD)
+            _digit_cascade_loaded = True
+    return _digit_cascade
+
+def _recognize_with_transformer(digit_images: List[Any], items: List[Any], batch_size: int) -> List[Tuple[str, float]]:
+    # 공유 추론 서비스 또는 직접 호출로 transformer 분류기를 실행
+    service = get_digit_inference_service()
+    if service is not None:
+        return service.predict(items)
+    if items is digit_images:
+        return _predict_digit_images_direct(digit_images, batch_size=batch_size)
+    return _predict_digit_masks_direct(items, batch_size=batch_size)
+
+_prediction_caches: "OrderedDict[str, DigitPredictionCache]" = OrderedDict() # 앞쪽이 오래 쓰지 않은 과목
+_prediction_caches_lock = threading.Lock()
+GLOBAL_CACHE_NAMESPACE = '__global__'
+
+def _tiny_model_digest() -> str:
+    try:
+        with open(TINY_DIGIT_MODEL_PATH, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=4).hexdigest()
+    except OSError:
+        return "missing"
+
+def prediction_model_tag() -> str:
+    # 숫자 예측 결과에 영향을 주는 설정 조합. 디스크 캐시의 호환성 확인에 사용
+    # sheet_checkpoint.pipeline_tag도 이 태그를 포함하므로, 숫자 분류 설정은 여기에만 추가하면 됨
+    # cascade는 tiny 모델 파일 해시도 포함 (다시 학습하면 이전 모델의 label을 재사용하지 않도록)
+    cascade_part = f"cascade{DIGIT_CASCADE_THRESHOLD}-{_tiny_model_digest()}" if DIGIT_CASCADE_ENABLED else "nocascade"
+    return f"{INFERENCE_BACKEND}-int8{int(ONNX_QUANTIZED)}-fast{int(DIGIT_PREPROCESS_FAST_PATH)}-{cascade_part}"
+
+def get_prediction_cache(namespace: Optional[str] = None) -> Optional[DigitPredictionCache]:
+    """
+    과목(namespace)별 예측 캐시. namespace가 없으면 전역 캐시를 사용합니다. 비활성화 시 None.
+    메모리에는 최근에 쓴 DIGIT_PREDICTION_CACHE_MAX_SUBJECTS개 과목의 캐시만 두고, 나머지는 버립니다. (과목 폴더의 캐시 파일은 유지)
+    """
+    if not DIGIT_PREDICTION_CACHE_ENABLED: return None
+    namespace = namespace or GLOBAL_CACHE_NAMESPACE
+    with _prediction_caches_lock:
+        cache = _prediction_caches.get(namespace)
+        if cache is None:
+            cache = DigitPredictionCache(DIGIT_PREDICTION_CACHE_MAX_ENTRIES, DIGIT_PREDICTION_CACHE_KEY_SIZE, prediction_model_tag())
+            _prediction_caches[namespace] = cache
+        _prediction_caches.move_to_end(namespace)
+        while len(_prediction_caches) > max(1, DIGIT_PREDICTION_CACHE_MAX_SUBJECTS):
+            _prediction_caches.popitem(last=False)
+    return cache
+
+def _recognize_uncached(
+    digit_images: List[Image.Image],
+    digit_masks: Optional[List[np.ndarray]],
+    batch_size: int
+) -> List[Tuple[str, float]]:
+    items = list(digit_masks) if DIGIT_PREPROCESS_FAST_PATH and digit_masks is not None else digit_images
+
+    cascade = get_digit_cascade() if digit_masks is not None else None
+    if cascade is not None:
+        def fallback(indices: List[int]) -> List[Tuple[str, float]]:
+            sub_images = [digit_images[i] for i in indices]
+            sub_items = sub_images if items is digit_images else [items[i] for i in indices]
+            return _recognize_with_transformer(sub_images, sub_items, batch_size)
+        return cascade.predict(list(digit_masks), fallback)
+    return _recognize_with_transformer(digit_images, items, batch_size)
+
+def recognize_digit_images_batch(
+    digit_images: List[Image.Image],
+    digit_masks: Optional[List[np.ndarray]] = None,
+    batch_size: int = MNIST_BATCH_SIZE,
+    cache_namespace: Optional[str] = None
+) -> List[Tuple[str, float]]:
+    """
+    단일 숫자 이미지 여러 장을 배치 호출로 한꺼번에 인식합니다.
+    반환 리스트는 입력과 같은 순서의 (label, score) 튜플이며, 인식할 수 없으면 ('?', 0.0)입니다.
+
+    digit_masks(이진 마스크, 잉크=255)가 주어지면:
+    - DIGIT_PREDICTION_CACHE_ENABLED: cache_namespace(과목)의 예측 캐시에 있는 crop은 추론하지 않습니다.
+    - DIGIT_CASCADE_ENABLED: tiny 모델이 먼저 채점하고, 확신하지 못한 crop만 transformer로 보냅니다.
+    - DIGIT_PREPROCESS_FAST_PATH: transformer 입력을 마스크에서 바로 만듭니다.
+    DIGIT_INFERENCE_SERVICE_ENABLED이면 transformer 호출은 공유 추론 서비스를 거쳐 다른 작업의 요청과 함께 배치됩니다.
+    """
+    if not digit_images: return []
+    cache = get_prediction_cache(cache_namespace) if digit_masks is not None else None
+    if cache is None:
+        return _recognize_uncached(digit_images, digit_masks, batch_size)
+
+    keys = cache.make_keys(digit_masks)
+    results = cache.get_many(keys)
+    miss_indices = [i for i, cached in enumerate(results) if cached is None]
+    if miss_indices:
+        miss_predictions = _recognize_uncached(
+            [digit_images[i] for i in miss_indices], [digit_masks[i] for i in miss_indices], batch_size
+        )
+        cache.put_many([keys[i] for i in miss_indices], miss_predictions)
+        for i, prediction in zip(miss_indices, miss_predictions):
+            results[i] = prediction
+    return results
+
 def pil_recognize_digits_from_bboxes(original_text_crop_pil: Image.Image, digit_bboxes: List[Tuple[int, int, int, int]]) -> List[Dict[str, Any]]: # mnist_pipe 인자 제거
     recognized_digits_list = []
     if not mnist_recognition_pipeline: return [] # mnist_pipe 대신 import된 pipeline 사용
-    for i, (x, y, w, h) in enumerate(digit_bboxes):
-        if w == 0 or h == 0: continue
-        digit_pil_crop = original_text_crop_pil.crop((x, y, x + w, y + h))
-        recognition_result = pil_recognize_single_digit(digit_pil_crop) # mnist_pipe 인자 없이 호출
-        if recognition_result:
-            recognized_digits_list.append({'bbox_in_text_crop': (x, y, w, h), 'text': recognition_result['text'], 'confidence': recognition_result['confidence'], 'center_x_in_text_crop': x + w / 2.0, 'center_y_in_text_crop': y + h / 2.0})
+    valid_bboxes = [(x, y, w, h) for (x, y, w, h) in digit_bboxes if w > 0 and h > 0]
+    digit_pil_crops = [original_text_crop_pil.crop((x, y, x + w, y + h)) for (x, y, w, h) in valid_bboxes]
+    text_crop_mask = binarize_digit_image(original_text_crop_pil)
+    digit_masks = [text_crop_mask[y:y + h, x:x + w] for (x, y, w, h) in valid_bboxes]
+    batch_results = recognize_digit_images_batch(digit_pil_crops, digit_masks) # bbox별 개별 호출 대신 한 번의 배치 호출
+    for (x, y, w, h), (label, score) in zip(valid_bboxes, batch_results):
+        if label.isdigit():
+            recognized_digits_list.append({'bbox_in_text_crop': (x, y, w, h), 'text': label, 'confidence': score, 'center_x_in_text_crop': x + w / 2.0, 'center_y_in_text_crop': y + h / 2.0})
     recognized_digits_list.sort(key=lambda d: d['center_x_in_text_crop'])
     return recognized_digits_list
 
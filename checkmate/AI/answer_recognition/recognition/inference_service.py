@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+# 숫자 인식 모델 호출을 여러 작업(과목)에 걸쳐 모아 배치로 처리하는 프로세스 내부 서비스.
+# predict_fn은 이미지 리스트를 받아 같은 순서의 (label, score) 리스트를 반환해야 합니다.
+
+PredictFn = Callable[[List[Any]], List[Tuple[str, float]]]
+
+
+class DigitInferenceService:
+    """
+    요청 큐 + 단일 워커 스레드로 동작하는 마이크로 배칭 추론 서비스.
+
+    - submit(): 이미지마다 Future를 반환하며, 여러 스레드(동시에 도는 인식 작업)에서 호출할 수 있습니다.
+    - 워커는 큐에서 첫 요청을 꺼낸 뒤 max_wait_ms 동안 또는 max_batch_size가 찰 때까지 요청을 더 모아
+      predict_fn을 한 번 호출하고, 결과를 각 Future에 나누어 돌려줍니다.
+    - autotune_batch_size(): start() 전에 호출하면 배치 크기별 지연 시간을 측정해 처리량이 가장 좋은 크기를 고릅니다.
+    """
+
+    def __init__(self, predict_fn: PredictFn, max_batch_size: int = 64, max_wait_ms: float = 10.0):
+        self._predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self.stats: Dict[str, float] = {"batches": 0, "items": 0, "busy_seconds": 0.0}
+        self.autotune_results: Dict[int, float] = {} # batch_size -> 이미지당 평균 지연(초)
+
+    # --- 수명 주기 ---
+    def start(self) -> "DigitInferenceService":
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop_event.clear()
+                self._worker = threading.Thread(target=self._run, name="DigitInferenceService", daemon=True)
+                self._worker.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+
+    # --- 요청 API ---
+    def submit(self, images: Sequence[Any]) -> List[Future]:
+        """이미지 리스트를 큐에 넣고 이미지별 Future 리스트를 반환합니다."""
+        self.start()
+        futures = []
+        for img in images:
+            future: Future = Future()
+            self._queue.put((img, future))
+            futures.append(future)
+        return futures
+
+    def predict(self, images: Sequence[Any], timeout: Optional[float] = None) -> List[Tuple[str, float]]:
+        """submit() 후 모든 결과를 기다려 입력 순서대로 반환합니다. 실패한 이미지는 ('?', 0.0)입니다."""
+        results: List[Tuple[str, float]] = []
+        for future in self.submit(images):
+            try:
+                results.append(future.result(timeout=timeout))
+            except Exception as e:
+                print(f"Error in digit inference service request: {e}")
+                results.append(('?', 0.0))
+        return results
+
+    # --- 배치 크기 자동 조정 ---
+    def autotune_batch_size(
+        self,
+        sample_image: Optional[Any] = None,
+        candidates: Sequence[int] = (1, 4, 8, 16, 32, 64, 128),
+        repeats: int = 2
+    ) -> int:
+        """
+        후보 배치 크기마다 predict_fn을 직접 호출해 이미지당 지연 시간을 측정하고,
+        가장 빠른 값의 5% 이내에 드는 후보 중 가장 작은 배치 크기를 max_batch_size로 설정합니다.
+        (작은 배치일수록 요청 하나가 기다리는 시간이 짧아지기 때문)
+        """
+        if sample_image is None:
+            sample_image = Image.new('L', (28, 28), 255)
+        candidates = sorted({c for c in candidates if 0 < c <= self.max_batch_size} | {self.max_batch_size})
+        self.autotune_results = {}
+        for batch_size in candidates:
+            batch = [sample_image] * batch_size
+            try:
+                self._predict_fn(batch) # 워밍업
+                started = time.perf_counter()
+                for _ in range(max(1, repeats)):
+                    self._predict_fn(batch)
+                elapsed = (time.perf_counter() - started) / max(1, repeats)
+            except Exception as e:
+                print(f"Autotune: batch_size={batch_size} failed: {e}")
+                continue
+            self.autotune_results[batch_size] = elapsed / batch_size
+            print(f"Autotune: batch_size={batch_size} -> {elapsed * 1000:.1f}ms/batch, {elapsed / batch_size * 1000:.2f}ms/image")
+
+        if self.autotune_results:
+            best_per_image = min(self.autotune_results.values())
+            self.max_batch_size = min(b for b, t in self.autotune_results.items() if t <= best_per_image * 1.05)
+            print(f"Autotune: selected max_batch_size={self.max_batch_size}")
+        return self.max_batch_size
+
+    # --- 워커 루프 ---
+    def _collect_batch(self) -> List[Tuple[Any, Future]]:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # 대기 시간이 끝났더라도 이미 큐에 쌓인 요청은 배치에 포함
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            live = [(img, future) for img, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            started = time.perf_counter()
+            try:
+                predictions = self._predict_fn([img for img, _ in live])
+                for (_, future), prediction in zip(live, predictions):
+                    future.set_result(prediction)
+                for _, future in live[len(predictions):]:
+                    future.set_result(('?', 0.0))
+            except Exception as e:
+                for _, future in live:
+                    future.set_exception(e)
+            self.stats["batches"] += 1
+            self.stats["items"] += len(live)
+            self.stats["busy_seconds"] += time.perf_counter() - started
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .digit_preprocess import normalize_digit_masks, MNIST_CANVAS_SIZE
+
+# 정규화 + 축소한 이진 숫자 비트맵의 해시를 키로 하는 LRU 예측 캐시.
+# 같은(또는 거의 같은) 모양의 digit crop은 같은 키가 되어 모델 추론을 건너뜁니다.
+
+
+class DigitPredictionCache:
+    """
+    Args:
+        max_entries: 최대 항목 수 (초과 시 가장 오래 사용하지 않은 항목부터 제거)
+        key_size: 키 비트맵 한 변의 크기. 28x28 정규화 캔버스를 평균 풀링해 key_size x key_size로 줄인 뒤 이진화
+        model_tag: 예측을 만든 모델 설정 식별자. 저장된 캐시 파일의 태그가 다르면 불러오지 않습니다.
+    """
+
+    def __init__(self, max_entries: int = 100000, key_size: int = 14, model_tag: str = ""):
+        if MNIST_CANVAS_SIZE % key_size != 0:
+            raise ValueError(f"key_size must divide {MNIST_CANVAS_SIZE}, got {key_size}")
+        self.max_entries = max(1, int(max_entries))
+        self.key_size = key_size
+        self.model_tag = model_tag
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._new_keys: Optional[List[str]] = None # enable_new_entry_tracking() 이후 추가된 키 (worker -> 부모 프로세스 전달용)
+        self.loaded_paths: Set[str] = set() # load()로 읽은 캐시 파일 (worker가 같은 파일을 다시 읽지 않도록)
+
+    # --- 키 ---
+    def make_keys(self, masks: Sequence[np.ndarray]) -> List[str]:
+        """마스크 배치 -> 키 리스트 (정규화/풀링/이진화를 배치 단위로 한 번에 수행)"""
+        if not len(masks):
+            return []
+        normalized = normalize_digit_masks(masks)
+        pool = MNIST_CANVAS_SIZE // self.key_size
+        pooled = normalized.reshape(len(masks), self.key_size, pool, self.key_size, pool).mean(axis=(2, 4))
+        packed = np.packbits(pooled > 0.5, axis=1)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in packed.reshape(len(masks), -1)]
+
+    # --- 조회/저장 ---
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Tuple[str, float]]]:
+        results: List[Optional[Tuple[str, float]]] = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                results.append(value)
+        return results
+
+    def put_many(self, keys: Sequence[str], predictions: Sequence[Tuple[str, float]], record_new: bool = True) -> None:
+        with self._lock:
+            for key, (label, score) in zip(keys, predictions):
+                if label == '?': # 인식 실패 결과는 캐시하지 않음
+                    continue
+                if record_new and self._new_keys is not None and key not in self._entries:
+                    self._new_keys.append(key)
+                self._entries[key] = (label, float(score))
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def enable_new_entry_tracking(self) -> None:
+        with self._lock:
+            if self._new_keys is None:
+                self._new_keys = []
+
+    def take_new_entries(self) -> List[Tuple[str, Tuple[str, float]]]:
+        """마지막 호출 이후 새로 추가된 (key, (label, score)) 목록을 반환하고 비웁니다. (추적 중이 아니면 빈 리스트)"""
+        with self._lock:
+            if not self._new_keys:
+                return []
+            new_entries = [(key, self._entries[key]) for key in self._new_keys if key in self._entries]
+            self._new_keys = []
+            return new_entries
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
+
+    # --- 디스크 저장 (과목별 파일) ---
+    def save(self, path: str) -> None:
+        with self._lock:
+            payload = {"model_tag": self.model_tag, "key_size": self.key_size, "entries": list(self._entries.items())}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """저장된 캐시를 불러와 현재 항목에 합칩니다. 모델 태그/키 크기가 다르면 무시합니다. 불러온 항목 수를 반환."""
+        self.loaded_paths.add(path)
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading digit prediction cache {path}: {e}")
+            return 0
+        if payload.get("model_tag") != self.model_tag or payload.get("key_size") != self.key_size:
+            print(f"Digit prediction cache {path} was built with a different model setting. Ignored.")
+            return 0
+        entries = payload.get("entries", [])
+        self.put_many([key for key, _ in entries], [tuple(value) for _, value in entries], record_new=False)
+        return len(entries)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# 답안지별 인식 결과 체크포인트 (과목 폴더의 JSON Lines 파일).
+# 답안지 한 장이 끝날 때마다 결과를 한 줄씩 추가 기록(flush + fsync)하므로, 작업이 중간에 죽어도 끝난 답안지까지는 남습니다.
+# 다시 실행하면 내용 해시, 파일명, 정답 키 해시, 파이프라인 태그가 모두 같은 답안지는 인식을 건너뛰고 저장된 결과를 다시 내보냅니다.
+# (answer_json의 학번은 파일명에서 오므로 파일명이 바뀐 답안지는 다시 인식)
+
+
+def answer_key_hash(answer_key_data: Dict[str, Any]) -> str:
+    """정답 키 해시 (키 순서와 무관하게 같은 내용이면 같은 값)"""
+    canonical = json.dumps(answer_key_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def pipeline_tag() -> str:
+    # PIPELINE_VERSION + 숫자 분류기 태그(예측 캐시와 같은 값) + 영역 검출/분할 설정 조합
+    # config/digit_recognizer는 import할 때 모델을 불러오므로 태그가 필요할 때 import (tag를 넘기면 모델 없이 SheetCheckpointStore 사용 가능)
+    from .config import (
+        PIPELINE_VERSION, NUMPY_REGION_PIPELINE, YOLO_REDUCED_DECODE,
+        REGION_TEMPLATE_ENABLED, LINE_DETECTOR, TEXT_SEGMENTER, SHARED_BINARY_MASK
+    )
+    from .recognition.digit_recognizer import prediction_model_tag
+    return (
+        f"v{PIPELINE_VERSION}-{prediction_model_tag()}"
+        f"-np{int(NUMPY_REGION_PIPELINE)}-reduced{int(YOLO_REDUCED_DECODE)}-template{int(REGION_TEMPLATE_ENABLED)}"
+        f"-{LINE_DETECTOR}-{TEXT_SEGMENTER}-mask{int(SHARED_BINARY_MASK)}"
+    )
+
+
+class SheetCheckpointStore:
+    """
+    Args:
+        path: 체크포인트 파일 경로 (과목 폴더)
+        key_hash: 이번 실행의 정답 키 해시 (answer_key_hash)
+        tag: 이번 실행의 파이프라인 태그. 없으면 pipeline_tag()
+    """
+
+    def __init__(self, path: str, key_hash: str, tag: Optional[str] = None):
+        self.path = path
+        self.key_hash = key_hash
+        self.tag = tag or pipeline_tag()
+        self._records: Dict[Tuple[str, str], Dict[str, Any]] = {} # (image_file, content_hash) -> 기록
+        self._file = None
+        self._lock = threading.Lock()
+        self.stale = 0 # 정답 키/파이프라인이 달라 버린 기록 수
+
+    def load(self) -> int:
+        """파일에서 유효한 기록을 불러오고 그 수를 반환합니다. 깨진 줄(기록 중 종료)은 건너뜁니다."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("answer_key_hash") != self.key_hash or record.get("pipeline") != self.tag:
+                    self.stale += 1
+                    continue
+                self._records[(record["image_file"], record["content_hash"])] = record # 같은 답안지는 나중 기록이 우선
+        return len(self._records)
+
+    def lookup(self, content_hash: str, image_file: str) -> Optional[Dict[str, Any]]:
+        """재사용할 수 있는 답안지 결과 ({"answer_json", "failure_json", "detection"}) 또는 None"""
+        record = self._records.get((image_file, content_hash))
+        if record is None:
+            return None
+        return {"answer_json": record["answer_json"], "failure_json": record["failure_json"], "detection": record.get("detection")}
+
+    def record(self, content_hash: str, image_file: str, sheet_result: Dict[str, Any]) -> None:
+        """성공한 답안지 결과를 바로 파일에 추가합니다."""
+        record = {
+            "content_hash": content_hash,
+            "image_file": image_file,
+            "answer_key_hash": self.key_hash,
+            "pipeline": self.tag,
+            "answer_json": sheet_result.get("answer_json") or {},
+            "failure_json": sheet_result.get("failure_json", []),
+            "detection": sheet_result.get("detection"),
+            "recorded_at": time.time()
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._ends_with_partial_line():
+                    self._file.write("\n") # 기록 중 종료된 줄 뒤에 이어 쓰지 않도록
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records[(image_file, content_hash)] = record
+
+    def compact(self, keep_sheets: Iterable[Tuple[str, str]]) -> int:
+        """
+        현재 답안지((image_file, content_hash) 목록)의 유효한 기록만 남기도록 파일을 다시 씁니다. (중복/이전 설정/삭제된 답안지 기록 제거)
+        내용이 같은 답안지가 파일명만 달리 여러 장 있어도 파일명마다 따로 남습니다. 남긴 기록 수를 반환합니다.
+        """
+        keep = set(keep_sheets)
+        with self._lock:
+            self._close_locked()
+            self._records = {key: record for key, record in self._records.items() if key in keep}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self._records.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            return len(self._records)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _ends_with_partial_line(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _close_locked(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,216 @@
+import logging
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import ANSWER_RECOGNITION_WORKERS, DIGIT_PREDICTION_CACHE_PERSIST, YOLO_BATCH_SIZE
+from .data_structures import DetectedArea
+from .main import preprocess_answer_sheet, recognize_answer_sheet_data
+from .preprocessing.yolo_detector import yolo_predict_and_extract_areas_batch
+from .preprocessing.region_template import RegionTemplate, detect_areas_with_template
+from .recognition.digit_recognizer import get_prediction_cache, disable_digit_inference_service
+from .recognition.digit_cascade import cascade_stats_scope
+
+logger = logging.getLogger(__name__)
+
+# 답안지(전처리 + 인식)를 chunk 단위로 처리하는 함수와, 여러 chunk를 동시에 돌리는 프로세스 풀.
+# chunk의 영역 검출은 과목 템플릿 정렬(없으면 한 번의 YOLO 배치 호출)로 하고, 이후 단계는 답안지별로 진행합니다.
+# worker는 spawn으로 시작되어 이 모듈을 import할 때(config.py) 모델을 한 번만 로드하고,
+# 이후에는 이미지 경로만 받아 답안지별 결과 dict를 돌려줍니다. Kafka 전송/파일 저장/진행 상황 갱신은 부모 프로세스(app.py)가 합니다.
+# worker는 한 번에 chunk 하나만 처리하므로 공유 추론 서비스(inference_service.py)를 끄고 답안지 단위 배치로 직접 추론합니다.
+# (작업 간 배치 합치기는 worker 풀을 쓰지 않을 때, 같은 프로세스에서 동시에 도는 작업 사이에서만 적용됨)
+
+
+def process_answer_sheet(
+    image_path: str,
+    answer_key_data: Dict[str, Any],
+    tail_question_counts: Dict[str, int],
+    cache_namespace: Optional[str] = None,
+    detected_areas: Optional[Tuple[Optional[DetectedArea], Optional[DetectedArea]]] = None
+) -> Dict[str, Any]:
+    """
+    Returns:
+        {"image_path", "answer_json", "failure_json", "error"}
+        전처리 결과가 없거나 예외가 발생하면 error에 사유가 담기고 answer_json은 None입니다.
+    """
+    result: Dict[str, Any] = {"image_path": image_path, "answer_json": None, "failure_json": [], "error": None}
+    try:
+        processed_crops = preprocess_answer_sheet(image_path, answer_key_data, detected_areas=detected_areas)
+        if not processed_crops:
+            result["error"] = "No crops from preprocessing"
+            return result
+        recognition_result = recognize_answer_sheet_data(
+            processed_crops, answer_key_data, tail_question_counts, cache_namespace=cache_namespace
+        )
+        result["answer_json"] = recognition_result.get("answer_json", {})
+        result["failure_json"] = recognition_result.get("failure_json", [])
+    except Exception as e:
+        result["error"] = str(e)
+        result["traceback"] = traceback.format_exc()
+    return result
+
+
+def process_answer_sheet_chunk(
+    image_paths: List[str],
+    answer_key_data: Dict[str, Any],
+    tail_question_counts: Dict[str, int],
+    cache_namespace: Optional[str] = None,
+    region_template: Optional[RegionTemplate] = None
+) -> List[Dict[str, Any]]:
+    """
+    chunk 전체의 영역을 먼저 구한 뒤 답안지별로 처리합니다. 입력 순서대로 process_answer_sheet 결과를 반환.
+    region_template이 있으면 템플릿 정렬로, 없으면 한 번의 YOLO 배치 호출로 영역을 구합니다.
+    각 결과의 "detection"에 영역을 구한 방법("template"/"yolo")이 기록됩니다.
+    배치 검출에서 문항 번호/답변 영역 중 하나라도 빠진 답안지는 답안지별 YOLO로 다시 검출합니다.
+    """
+    methods = ["yolo"] * len(image_paths)
+    try:
+        if region_template is not None:
+            chunk_areas, methods = detect_areas_with_template(region_template, image_paths)
+        else:
+            chunk_areas = yolo_predict_and_extract_areas_batch(image_paths, batch_size=len(image_paths))
+    except Exception as e:
+        logger.warning(f"Chunk region detection failed, falling back to per-sheet detection: {e}")
+        chunk_areas = [None] * len(image_paths)
+
+    results = []
+    for image_path, detected_areas, method in zip(image_paths, chunk_areas, methods):
+        if detected_areas is not None and (detected_areas[0] is None or detected_areas[1] is None):
+            # 배치 검출에서 영역을 못 찾은 답안지는 예전처럼 답안지 한 장씩 YOLO를 다시 돌려 봄 (detected_areas=None)
+            logger.info(f"Batch region detection missed areas, retrying per-sheet detection: {image_path}")
+            detected_areas, method = None, "yolo"
+        result = process_answer_sheet(image_path, answer_key_data, tail_question_counts, cache_namespace, detected_areas)
+        result["detection"] = method
+        results.append(result)
+    return results
+
+
+def plan_sheet_chunks(image_paths: List[str], workers: int, chunk_size: int = YOLO_BATCH_SIZE) -> List[List[str]]:
+    """답안지를 chunk로 나눕니다. 답안지 수가 적으면 모든 worker가 일하도록 chunk를 줄입니다."""
+    if not image_paths:
+        return []
+    per_worker = -(-len(image_paths) // max(1, workers))
+    size = max(1, min(chunk_size, per_worker))
+    return [image_paths[i:i + size] for i in range(0, len(image_paths), size)]
+
+
+# --- Worker Process ---
+def _init_worker(threads_per_worker: int) -> None:
+    logging.basicConfig(level=logging.INFO) # spawn된 worker는 부모(app.py)의 로깅 설정을 물려받지 않음
+    # worker 여러 개가 각자 코어 전체를 쓰려고 하면 오히려 느려지므로 프로세스당 스레드 수를 나눠 줌
+    import cv2
+    cv2.setNumThreads(threads_per_worker)
+    disable_digit_inference_service()
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+
+def _process_answer_sheet_chunk_in_worker(
+    image_paths: List[str],
+    answer_key_data: Dict[str, Any],
+    tail_question_counts: Dict[str, int],
+    cache_namespace: Optional[str],
+    cache_path: Optional[str],
+    region_template: Optional[RegionTemplate]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Tuple[str, float]]], Dict[str, float]]:
+    cache = get_prediction_cache(cache_namespace)
+    if cache is not None:
+        cache.enable_new_entry_tracking()
+        # 과목 캐시가 새로 만들어졌으면(처음이거나 LRU에서 버려진 뒤) 저장된 캐시 파일을 다시 읽음
+        if cache_path and DIGIT_PREDICTION_CACHE_PERSIST and cache_path not in cache.loaded_paths:
+            cache.load(cache_path)
+
+    with cascade_stats_scope() as cascade_counts:
+        results = process_answer_sheet_chunk(image_paths, answer_key_data, tail_question_counts, cache_namespace, region_template)
+    # worker에서 새로 채운 예측 캐시 항목은 부모 프로세스의 캐시에 합쳐서 저장하도록 함께 반환
+    # cascade 통계도 worker 프로세스에만 쌓이므로 이 chunk의 카운터를 돌려주고 부모가 작업 단위로 합산
+    cache_entries = cache.take_new_entries() if cache is not None else []
+    return results, cache_entries, cascade_counts
+
+
+# --- Pool ---
+_sheet_pool: Optional[ProcessPoolExecutor] = None
+_sheet_pool_lock = threading.Lock()
+
+
+def get_sheet_process_pool() -> Optional[ProcessPoolExecutor]:
+    """공유 worker 풀 (처음 호출 시 생성). ANSWER_RECOGNITION_WORKERS가 1 이하이면 None."""
+    global _sheet_pool
+    if ANSWER_RECOGNITION_WORKERS <= 1:
+        return None
+    with _sheet_pool_lock:
+        if _sheet_pool is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // ANSWER_RECOGNITION_WORKERS)
+            _sheet_pool = ProcessPoolExecutor(
+                max_workers=ANSWER_RECOGNITION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'), # torch/Kafka 스레드가 있는 프로세스를 fork하지 않음
+                initializer=_init_worker,
+                initargs=(threads_per_worker,)
+            )
+            logger.info(f"Sheet process pool started: {ANSWER_RECOGNITION_WORKERS} workers x {threads_per_worker} threads")
+    return _sheet_pool
+
+
+def submit_answer_sheet_chunk(
+    pool: ProcessPoolExecutor,
+    image_paths: List[str],
+    answer_key_data: Dict[str, Any],
+    tail_question_counts: Dict[str, int],
+    cache_namespace: Optional[str] = None,
+    cache_path: Optional[str] = None,
+    region_template: Optional[RegionTemplate] = None
+):
+    """Future의 결과는 (답안지별 결과 리스트, 새 예측 캐시 항목, 이 chunk의 cascade 카운터)입니다."""
+    return pool.submit(
+        _process_answer_sheet_chunk_in_worker, image_paths, answer_key_data, tail_question_counts,
+        cache_namespace, cache_path, region_template
+    )
+
+
+def iter_bounded_chunk_futures(
+    submit_chunk: Callable[[List[str]], Future],
+    chunks: List[List[str]],
+    max_in_flight: int
+) -> Iterator[Tuple[List[str], Future]]:
+    """
+    chunk를 한 작업당 최대 max_in_flight개까지만 풀에 넣고, 하나가 끝날 때마다 다음 chunk를 넣습니다.
+    (큰 작업 하나가 공유 풀의 대기열을 모두 채워 다른 작업이 그 뒤에 줄 서지 않도록 함)
+    끝난 순서대로 (chunk, future)를 돌려줍니다.
+    """
+    chunk_iter = iter(chunks)
+    in_flight: Dict[Future, List[str]] = {}
+
+    def fill() -> None:
+        while len(in_flight) < max(1, max_in_flight):
+            chunk = next(chunk_iter, None)
+            if chunk is None:
+                return
+            in_flight[submit_chunk(chunk)] = chunk
+
+    fill()
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk = in_flight.pop(future)
+            fill() # 결과를 처리하는 동안에도 worker가 쉬지 않도록 먼저 다음 chunk를 넣음
+            yield chunk, future
+
+
+def load_or_build_region_template(template_path: str, image_paths: List[str], reference_count: int) -> Optional[RegionTemplate]:
+    """과목 폴더에 저장된 템플릿을 불러오고, 없으면 앞쪽 reference_count장으로 만들어 저장합니다."""
+    template = RegionTemplate.load(template_path)
+    if template is not None or not image_paths:
+        return template
+    template = RegionTemplate.build(image_paths[:reference_count])
+    if template is not None:
+        try:
+            template.save(template_path)
+        except OSError as e:
+            logger.error(f"Error saving region template {template_path}: {e}")
+    return template
@@ -0,0 +1,101 @@
+'''
+cascade 1단계용 tiny 숫자 분류기(HOG + softmax 선형 모델)를 MNIST로 학습해 .npz로 저장하는 오프라인 도구입니다.
+
+checkmate/AI 디렉토리에서 실행합니다. 기본 저장 위치는 config.TINY_DIGIT_MODEL_PATH(저장소에 포함된 모델 파일)입니다.
+    python -m answer_recognition.train_tiny_digit_model
+    python -m answer_recognition.train_tiny_digit_model --data mlxtend --output /tmp/tiny_digit_model.npz
+
+--data openml : MNIST 전체 70,000장 (openml mnist_784, 학습 60,000 / 평가 10,000). 네트워크 필요
+--data mlxtend: mlxtend 패키지에 들어 있는 MNIST 5,000장 (학습 4,000 / 평가 1,000). 오프라인 학습용
+                (저장소에 포함된 모델은 이 데이터로 학습함. DIGIT_CASCADE_ENABLED 기본값을 켜기 전에 openml로 다시 학습)
+
+학습 후 digit_cascade_benchmark.py로 실제 답안지 crop에서 transformer와의 일치율을 확인하세요.
+
+학습 이미지는 실제 답안지 digit crop과 같은 분포가 되도록
+이진화 -> 잉크 bounding box crop -> normalize_digit_masks 순서로 만듭니다.
+'''
+import argparse
+import time
+from typing import Tuple
+
+import numpy as np
+
+from .config import TINY_DIGIT_MODEL_PATH, DIGIT_CASCADE_THRESHOLD
+from .recognition.digit_cascade import TinyDigitClassifier, hog_features
+from .recognition.digit_preprocess import normalize_digit_masks
+
+
+def _mnist_to_masks(images: np.ndarray):
+    masks = []
+    for image in images:
+        binary = (image > 127).astype(np.uint8) * 255
+        ys, xs = np.nonzero(binary)
+        if len(ys) == 0:
+            masks.append(binary)
+            continue
+        masks.append(binary[ys.min():ys.max() + 1, xs.min():xs.max() + 1])
+    return masks
+
+
+def load_mnist(source: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(이미지 (N, 28, 28), label 문자열 (N,), 학습용 개수). 학습용 개수 이후는 평가용"""
+    if source == 'mlxtend':
+        from mlxtend.data import mnist_data
+
+        print("Loading MNIST subset (mlxtend mnist_data, 5,000 images)...")
+        x_all, y_all = mnist_data()
+        order = np.random.RandomState(0).permutation(len(x_all)) # label 순으로 정렬되어 있어 섞은 뒤 나눔
+        return x_all[order].reshape(-1, 28, 28), y_all[order].astype(str), 4000
+
+    from sklearn.datasets import fetch_openml
+
+    print("Loading MNIST (openml mnist_784)...")
+    x_all, y_all = fetch_openml('mnist_784', version=1, return_X_y=True, as_frame=False)
+    return x_all.reshape(-1, 28, 28), y_all.astype(str), 60000
+
+
+def train(output_path: str, threshold: float, c_value: float = 1.0, max_iter: int = 300, source: str = 'openml') -> TinyDigitClassifier:
+    from sklearn.linear_model import LogisticRegression
+
+    x_all, y_all, train_count = load_mnist(source)
+
+    print("Building features...")
+    normalized = normalize_digit_masks(_mnist_to_masks(x_all))
+    features = hog_features(normalized)
+    x_train = features[:train_count]
+    y_train, y_test = y_all[:train_count], y_all[train_count:]
+
+    mean = x_train.mean(axis=0)
+    std = x_train.std(axis=0) + 1e-6
+
+    print("Training softmax regression...")
+    started = time.perf_counter()
+    clf = LogisticRegression(C=c_value, max_iter=max_iter)
+    clf.fit((x_train - mean) / std, y_train)
+    print(f"  trained in {time.perf_counter() - started:.1f}s")
+
+    model = TinyDigitClassifier(clf.coef_.T, clf.intercept_, mean, std, clf.classes_.tolist())
+    predictions = model.predict_normalized(normalized[train_count:])
+    labels = np.array([label for label, _ in predictions])
+    scores = np.array([score for _, score in predictions])
+    accepted = scores >= threshold
+    print(f"  test accuracy: {(labels == y_test).mean():.4f}")
+    print(f"  threshold {threshold}: accepted {accepted.mean():.2%}, accuracy on accepted {(labels[accepted] == y_test[accepted]).mean():.4f}")
+
+    model.save(output_path)
+    print(f"Saved tiny digit model: {output_path}")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the tier-1 HOG + linear digit classifier used by the cascade.")
+    parser.add_argument('--output', default=TINY_DIGIT_MODEL_PATH)
+    parser.add_argument('--threshold', type=float, default=DIGIT_CASCADE_THRESHOLD)
+    parser.add_argument('--C', dest='c_value', type=float, default=1.0)
+    parser.add_argument('--data', choices=('openml', 'mlxtend'), default='openml')
+    args = parser.parse_args()
+    train(args.output, args.threshold, args.c_value, source=args.data)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,14 +5,13 @@ import re
 
 # data_structures는 상위 디렉토리 또는 answer_recognition 패키지 레벨에서 가져와야 함
 # 현재 key_utils.py는 answer_recognition/utils/ 안에 위치
-from ..data_structures import DetectedArea
+from ..data_structures import DetectedArea, AnswerCrop
 # 이미지 처리 함수들 import
 from ..preprocessing.image_utils import (
-    preprocess_line_image_for_text_contours, 
-    merge_contours_and_crop_text_pil,
-    enhance_and_find_contours_for_lines,
+    find_horizontal_lines,
     crop_between_lines
 )
+from ..preprocessing.sheet_image import image_size
 # 숫자 인식 함수는 이제 직접 사용하지 않음
 
 
@@ -59,7 +58,7 @@ def create_question_info_dict(
     # qn_area_orig_y_offset = main_qn_area['bbox'][1] # 원본 답안지 기준 y 오프셋. 이제 사용하지 않음.
 
     # 수정된 로직: 수평선을 기준으로 QN 영역을 자르고, 그 개수를 사용합니다.
-    line_contours_in_qn = enhance_and_find_contours_for_lines(qn_area_pil)
+    line_contours_in_qn = find_horizontal_lines(qn_area_pil)
     # crop_between_lines는 [{'image_obj': Image, 'y_top_in_area': int, 'y_bottom_in_area': int}, ...] 형태의 리스트 반환
     line_cropped_list_in_qn = crop_between_lines(qn_area_pil, line_contours_in_qn)
 
@@ -152,71 +151,57 @@ def create_question_info_dict(
     return y_coordinates_dict
 
 
-def generate_final_key_for_ans_crop(
+def answer_counts_by_question(answer_key_data: Dict[str, Any]) -> Dict[str, int]:
+    """답안 키의 문제 번호("2", "2-1") -> answer_count. 같은 번호가 여러 번 있으면 처음 항목을 사용합니다."""
+    answer_counts: Dict[str, int] = {}
+    for q_entry in answer_key_data.get('questions', []):
+        qn_str_key = str(q_entry.get('question_number'))
+        sub_qn_val = q_entry.get('sub_question_number', 0)
+        sub_qn_str_key = str(sub_qn_val) if sub_qn_val and str(sub_qn_val) != "0" else ""
+        current_key_in_answer_data = f"{qn_str_key}-{sub_qn_str_key}" if sub_qn_str_key else qn_str_key
+        answer_counts.setdefault(current_key_in_answer_data, q_entry.get('answer_count', 0))
+    return answer_counts
+
+
+def build_answer_crop(
     subject_student_id_base: str, # "과목명_학번"
     ans_text_crop_full_info: Dict[str, Any], 
     question_info_dict: Dict[str, List[int]], 
-    answer_key_data: Dict[str, Any]
-) -> str:
-    # 디버그: 현재 처리중인 텍스트 조각 정보
-    line_id_for_debug = ans_text_crop_full_info.get('line_id_in_ans_area', 'unknownLine')
-    x_coord_for_debug = ans_text_crop_full_info.get('x_in_line', -1)
-    # print(f"[Debug KeyGen] 처리 시작: ID={subject_student_id_base}, Line={line_id_for_debug}, X={x_coord_for_debug}")
-
+    answer_counts: Dict[str, int] # answer_counts_by_question의 결과 (답안지마다 한 번만 계산)
+) -> AnswerCrop:
     y_in_line = ans_text_crop_full_info['y_in_line_relative_to_line_crop_top']
     line_y_top = ans_text_crop_full_info['line_y_top_relative_to_ans_area']
     ans_area_y_offset = ans_text_crop_full_info['ans_area_y_offset_orig']
-    text_crop_height = ans_text_crop_full_info['image_obj'].height
+    text_crop_height = image_size(ans_text_crop_full_info['image_obj'])[1]
     abs_y_top_of_text_crop = ans_area_y_offset + line_y_top + y_in_line
     abs_y_center_of_text_crop = line_y_top + (text_crop_height // 2)
 
-    # print(f"  [Debug KeyGen] 계산된 텍스트 y 중심: {abs_y_center_of_text_crop}")
-
     matching_qn_str = "unknownQN"
-    # print(f"  [Debug KeyGen] 문제번호 매칭 시도...")
     for qn_key, y_range_orig in question_info_dict.items():
-        # print(f"    - 확인 중: qn_key='{qn_key}', y_range={y_range_orig}. (텍스트 y 중심: {abs_y_center_of_text_crop})")
         if y_range_orig[0] <= abs_y_center_of_text_crop <= y_range_orig[1]:
             matching_qn_str = qn_key
-            # print(f"      ==> 매칭 성공: '{matching_qn_str}'")
-            break
-    
-    if matching_qn_str == "unknownQN":
-        # print(f"  [Debug KeyGen] 최종 문제번호 매칭 실패: matching_qn_str = 'unknownQN'")
-        # --- "unknownQN"으로 매칭된 경우 ans_text_crop_pil 이미지 저장 디버그 코드 시작 ---
-        # try:
-        #     image_to_save = ans_text_crop_full_info['image_obj']
-        #     debug_image_dir = Path("debug_unknown_qn_images")
-        #     os.makedirs(debug_image_dir, exist_ok=True)
-        #     
-        #     # 파일명에 특수문자나 공백이 없도록 처리 고려 (여기서는 간단히 처리)
-        #     safe_subject_id_base = re.sub(r'[^a-zA-Z0-9_\-]', '_', subject_student_id_base)
-        #     safe_line_id = re.sub(r'[^a-zA-Z0-9_\-]', '_', line_id_for_debug)
-        #
-        #     filename = f"{safe_subject_id_base}_{safe_line_id}_x{x_coord_for_debug}_yCenter{abs_y_center_of_text_crop}.png"
-        #     save_path = debug_image_dir / filename
-        #     image_to_save.save(save_path)
-        #     print(f"  [Debug KeyGen] 'unknownQN' 이미지 저장됨: {save_path}")
-        # except Exception as e:
-        #     print(f"  [Debug KeyGen] 'unknownQN' 이미지 저장 중 오류: {e}")
-        # --- "unknownQN"으로 매칭된 경우 ans_text_crop_pil 이미지 저장 디버그 코드 끝 ---
-        pass # print 문과 이미지 저장 코드가 제거되었으므로, 필요한 경우 pass 추가
-
-    answer_count_for_qn = 0
-    for q_entry in answer_key_data.get('questions', []):
-        qn_str_key = str(q_entry.get('question_number'))
-        sub_qn_val = q_entry.get('sub_question_number', 0)
-        sub_qn_str_key = str(sub_qn_val) if sub_qn_val and str(sub_qn_val) != "0" else ""
-        current_key_in_answer_data = f"{qn_str_key}-{sub_qn_str_key}" if sub_qn_str_key else qn_str_key
-        if current_key_in_answer_data == matching_qn_str:
-            answer_count_for_qn = q_entry.get('answer_count', 0)
             break
 
-            
-    x_in_line_coord = ans_text_crop_full_info['x_in_line']
-    line_id_in_ans_area = ans_text_crop_full_info.get('line_id_in_ans_area','lineX')
+    return AnswerCrop(
+        sheet_id=subject_student_id_base,
+        line_id=int(ans_text_crop_full_info.get('line_id_in_ans_area', -1)),
+        x=int(ans_text_crop_full_info['x_in_line']),
+        y=int(abs_y_top_of_text_crop),
+        question=matching_qn_str,
+        answer_count=int(answer_counts.get(matching_qn_str, 0)),
+        image=ans_text_crop_full_info['image_obj'],
+        mask=ans_text_crop_full_info.get('mask_obj'),
+        digit_boxes=ans_text_crop_full_info.get('digit_boxes')
+    )
 
-    # ans_area_id 부분을 키에서 제거
-    key_base = f"{subject_student_id_base}_L{line_id_in_ans_area}_x{x_in_line_coord}_y{abs_y_top_of_text_crop}_qn{matching_qn_str}_ac{answer_count_for_qn}"
-    
-    return key_base.replace(" ", "") 
\ No newline at end of file
+
+def generate_final_key_for_ans_crop(
+    subject_student_id_base: str, # "과목명_학번"
+    ans_text_crop_full_info: Dict[str, Any], 
+    question_info_dict: Dict[str, List[int]], 
+    answer_key_data: Dict[str, Any]
+) -> str:
+    # 외부 출력용 문자열 키. 전처리/인식 경로는 build_answer_crop의 AnswerCrop 필드를 직접 사용합니다.
+    return build_answer_crop(
+        subject_student_id_base, ans_text_crop_full_info, question_info_dict, answer_counts_by_question(answer_key_data)
+    ).key
@@ -1,5 +1,5 @@
 import sys # 경로 추가를 위해 import
-from flask import Flask, request, jsonify, current_app, send_file # send_file 추가
+from flask import Flask, request, jsonify, current_app, send_file, Response, stream_with_context # send_file 추가
 import os
 import tempfile
 import traceback
@@ -7,6 +7,7 @@ import zipfile # decompression 모듈 내부에서 사용하지만, 여기서도
 import pandas as pd # XLSX 처리용
 from werkzeug.utils import secure_filename # 주석 해제 또는 다시 추가
 import uuid # UUID 추가
+import time
 import shutil # 백그라운드 작업에서 임시 폴더 삭제용
 import json # KafkaProducer value_serializer에서 사용되므로 필요, Flask jsonify와는 다름
 import unicodedata # 유니코드 정규화 위해 추가
@@ -14,7 +15,7 @@ from datetime import datetime # Kafka 메시지 타임스탬프용
 import requests # Spring 서버 통신용
 # import re # 이제 사용 안 함
 
-import threading
+import multiprocessing
 from kafka import KafkaProducer
 # Flask의 jsonify와 이름 충돌을 피하기 위해 json 모듈은 보통 그대로 사용합니다.
 # value_serializer에서 json.dumps를 사용하므로 import json은 필요합니다.
@@ -52,24 +53,58 @@ from student_id_recognition.decompression_parsing.parsing_xlsx import parsing_xl
 # from answer_recognition.main import DEFAULT_QN_DIRECTORY_PATH, DEFAULT_ANSWER_JSON_PATH, DEFAULT_OCR_RESULTS_JSON_PATH
 
 # Algorithm.OCR 모듈 import
-from answer_recognition.main import preprocess_answer_sheet, recognize_answer_sheet_data
+from answer_recognition.sheet_worker import (
+    process_answer_sheet_chunk, plan_sheet_chunks, get_sheet_process_pool, submit_answer_sheet_chunk, iter_bounded_chunk_futures,
+    load_or_build_region_template
+)
+from answer_recognition.recognition.digit_recognizer import get_prediction_cache
+from answer_recognition.recognition.digit_cascade import cascade_stats_scope, empty_cascade_stats, merge_cascade_stats, summarize_cascade_stats
+from job_scheduler import JobScheduler, JobQueueFull
+from job_store import JobStore
+from kafka_emitter import KafkaEmitter
+from job_events import JobEventBroker, format_sse
+from upload_ingest import ingest_multipart, IngestError, IngestLimits
+from student_image_index import StudentImageIndex
+from student_manifest import StudentManifest
+from image_derivatives import DerivativeCache, FORMAT_MIMETYPES, parse_requested_width, webp_supported
+from answer_recognition.sheet_checkpoint import SheetCheckpointStore, answer_key_hash
+from answer_recognition.preprocessing.sheet_source import (
+    find_sheet_archive, open_archive_source, make_archive_ref, make_sheet_ref, sheet_file_name, sheet_content_hashes
+)
+from answer_recognition.config import (
+    DIGIT_PREDICTION_CACHE_PERSIST, DIGIT_PREDICTION_CACHE_FILENAME, ANSWER_RECOGNITION_WORKERS, SHEET_CHUNKS_IN_FLIGHT_PER_JOB,
+    REGION_TEMPLATE_ENABLED, REGION_TEMPLATE_REFERENCE_SHEETS, REGION_TEMPLATE_FILENAME,
+    SHEET_CHECKPOINT_ENABLED, SHEET_CHECKPOINT_FILENAME,
+    ARCHIVE_READ_WORKERS, ARCHIVE_EXTRACT_DIRNAME
+)
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False # 한글을 ASCII로 이스케이프하지 않도록 설정
 
 # Kafka 프로듀서 설정 (Flask 초기화 시에 생성해두는 것을 권장)
 # bootstrap_servers는 실제 환경에 맞게 수정해야 합니다.
+# 메시지는 kafka_emitter로 비동기 전송하므로, 답안지별 메시지가 linger 동안 모여 압축된 배치로 나갑니다.
+KAFKA_LINGER_MS = int(os.environ.get('OCR_KAFKA_LINGER_MS', 20))
+KAFKA_BATCH_SIZE = int(os.environ.get('OCR_KAFKA_BATCH_SIZE', 256 * 1024)) # partition별 배치 최대 크기(bytes)
+KAFKA_COMPRESSION = os.environ.get('OCR_KAFKA_COMPRESSION', 'gzip') or None # gzip | snappy | lz4 | zstd (gzip 외에는 추가 패키지 필요)
+KAFKA_MAX_PENDING = int(os.environ.get('OCR_KAFKA_MAX_PENDING', 200)) # 응답 대기 메시지가 이 수에 도달하면 flush
 producer = None
-try:
-    producer = KafkaProducer(
-        bootstrap_servers='43.202.183.74:9092', # TODO: 실제 Kafka 서버 주소로 변경!
-        value_serializer=lambda v: json.dumps(v).encode('utf-8')
-    )
-    app.logger.info("Kafka Producer initialized successfully.")
-except Exception as e:
-    app.logger.error(f"Failed to initialize Kafka Producer: {e}. Background tasks might not send Kafka messages.")
-    # Kafka 연결 실패 시 프로듀서가 None으로 유지됩니다.
-    # 백그라운드 작업에서 producer 사용 전 None 체크 필요.
+# 답안지 worker 프로세스(spawn)는 이 파일을 __mp_main__으로 다시 import하므로, 부모 프로세스에서만 연결
+if multiprocessing.parent_process() is None:
+    try:
+        producer = KafkaProducer(
+            bootstrap_servers='43.202.183.74:9092', # TODO: 실제 Kafka 서버 주소로 변경!
+            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            linger_ms=KAFKA_LINGER_MS,
+            batch_size=KAFKA_BATCH_SIZE,
+            compression_type=KAFKA_COMPRESSION
+        )
+        app.logger.info("Kafka Producer initialized successfully.")
+    except Exception as e:
+        app.logger.error(f"Failed to initialize Kafka Producer: {e}. Background tasks might not send Kafka messages.")
+        # Kafka 연결 실패 시 프로듀서가 None으로 유지됩니다.
+        # 백그라운드 작업에서 producer 사용 전 None 체크 필요.
+kafka_emitter = KafkaEmitter(producer, app.logger, KAFKA_MAX_PENDING) # producer가 None이면 전송을 건너뜀
 
 # 위 방식 대신, 앱 초기화 시점에 생성
 UPLOAD_FOLDER_BASE = os.path.join(tempfile.gettempdir(), 'ocr_flask_uploads')
@@ -88,10 +123,210 @@ logging.basicConfig(level=logging.INFO) # INFO 레벨로 변경
 ALLOWED_EXTENSIONS_ZIP = {'zip'}
 ALLOWED_EXTENSIONS_XLSX = {'xlsx'}
 
+# 스트리밍 수신 (/recognize/student_id): 업로드를 받으면서 ZIP을 바로 풀고, 제한은 받는 도중에 확인 (upload_ingest.py)
+STREAMING_INGEST_ENABLED = os.environ.get('OCR_STREAMING_INGEST', '1') == '1'
+INGEST_LIMITS = IngestLimits(
+    max_upload_bytes=int(os.environ.get('OCR_INGEST_MAX_UPLOAD_BYTES', 2 * 1024 ** 3)),
+    max_members=int(os.environ.get('OCR_INGEST_MAX_MEMBERS', 3000)),
+    max_member_bytes=int(os.environ.get('OCR_INGEST_MAX_MEMBER_BYTES', 128 * 1024 ** 2)),
+    max_extracted_bytes=int(os.environ.get('OCR_INGEST_MAX_EXTRACTED_BYTES', 8 * 1024 ** 3))
+)
+
+# 아카이브 모드: 업로드한 ZIP을 과목 폴더에 두고, 답안 인식은 ZIP에서 답안지를 바로 읽음 (answer_recognition/preprocessing/sheet_source.py)
+# 학번 인식 모듈은 압축 해제 폴더가 필요하므로 학번 인식까지는 풀어 두고, 끝나면 ZIP에 있는 이미지는 지웁니다.
+# 파일명 변경은 디스크에서 하지 않고 답안지 이름(ZIP 항목 -> 변경할 이름)으로만 반영하며, 검토자가 연 답안지만 디스크에 풉니다.
+ARCHIVE_SHEET_SOURCE_ENABLED = os.environ.get('OCR_ARCHIVE_SHEET_SOURCE', '0') == '1'
+SHEET_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# 학번 매핑 (student_manifest.py): 답안 인식 전에 파일을 하나씩 rename하지 않고 원본 파일명 -> 답안지 이름/학번을 과목 폴더에 기록
+# OCR_RENAME_FILES_ON_DISK=1이면 답안 인식이 끝난 뒤 매핑대로 디스크 파일명도 한 번에 바꿈
+STUDENT_MANIFEST_FILENAME = 'student_manifest.json'
+RENAME_FILES_ON_DISK = os.environ.get('OCR_RENAME_FILES_ON_DISK', '0') == '1'
+
+# 백그라운드 작업(학번 인식, 답안 인식) 스케줄러: 동시에 실행할 작업 수와 대기열 길이 제한
+# 답안 인식 작업 하나가 이미 ANSWER_RECOGNITION_WORKERS개의 프로세스를 쓰므로 동시 작업 수는 작게 유지
+JOB_WORKERS = int(os.environ.get('OCR_JOB_WORKERS', 2))
+JOB_QUEUE_MAX = int(os.environ.get('OCR_JOB_QUEUE_MAX', 8))
+JOB_DEFAULT_DURATION = 120.0 # 완료된 작업이 없을 때 Retry-After 계산에 쓰는 작업당 예상 시간(초)
+job_scheduler = JobScheduler(JOB_WORKERS, JOB_QUEUE_MAX, JOB_DEFAULT_DURATION, app.logger)
+
+# 작업 상태/진행률/단계별 소요 시간 저장소 (SQLite, 서버 재시작 후에도 이력 유지)
+JOB_STORE_PATH = os.environ.get('OCR_JOB_STORE_PATH', os.path.join(APP_ROOT, 'ocr_jobs.sqlite'))
+# 시작 시 다른 호스트(같은 DB를 공유하는 서버)의 작업은 이 시간(초) 동안 갱신이 없을 때만 중단 처리 (같은 호스트는 pid로 확인)
+JOB_OWNER_STALE_SECONDS = float(os.environ.get('OCR_JOB_OWNER_STALE_SECONDS', 3600))
+job_store = JobStore(JOB_STORE_PATH)
+if multiprocessing.parent_process() is None:
+    interrupted_jobs = job_store.mark_interrupted(JOB_OWNER_STALE_SECONDS)
+    if interrupted_jobs:
+        app.logger.warning(f"이전 실행에서 끝나지 못한 작업 {interrupted_jobs}개를 중단 처리했습니다.")
+
+# 작업별 이벤트 스트림 (GET /jobs/<job_id>/events, SSE): 답안지 결과(sheet), 주기적 진행률(progress), 완료(done)
+job_events = JobEventBroker()
+JOB_EVENT_PROGRESS_INTERVAL = 2.0 # progress 이벤트 간격(초). 연결 유지(heartbeat) 역할도 함
+
+# /get-student-image 축소본 캐시 (image_derivatives.py): 요청 폭을 IMAGE_DERIVATIVE_WIDTHS 중 하나로 맞춘 WebP/JPEG 파일을 UPLOAD_FOLDER_BASE에 저장
+# OCR_IMAGE_PREGENERATE_WIDTH를 주면 답안 인식이 끝난 뒤 그 폭의 축소본을 과목 전체에 대해 미리 만듦
+IMAGE_DERIVATIVE_WIDTHS = tuple(sorted(int(width) for width in os.environ.get('OCR_IMAGE_WIDTHS', '480,960,1600').split(',') if width.strip()))
+IMAGE_DERIVATIVE_QUALITY = int(os.environ.get('OCR_IMAGE_QUALITY', 80))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('OCR_IMAGE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+IMAGE_CACHE_MAX_AGE = int(os.environ.get('OCR_IMAGE_CACHE_MAX_AGE', 3600)) # 브라우저 캐시 유효 시간(초). 지나면 ETag로 재검증
+IMAGE_PREGENERATE_WIDTH = int(os.environ.get('OCR_IMAGE_PREGENERATE_WIDTH', 0))
+WEBP_SUPPORTED = webp_supported()
+derivative_cache = DerivativeCache(
+    os.path.join(UPLOAD_FOLDER_BASE, 'derivatives'), IMAGE_DERIVATIVE_WIDTHS, IMAGE_DERIVATIVE_QUALITY, IMAGE_CACHE_MAX_BYTES, app.logger
+)
+
+# /get-student-image의 과목별 학번 -> 답안지 이미지 인덱스 (요청 간 공유, 폴더 mtime이 바뀌거나 파일명 변경 작업 후 다시 만듦)
+student_image_index = StudentImageIndex(
+    archive_enabled=ARCHIVE_SHEET_SOURCE_ENABLED, manifest_filename=STUDENT_MANIFEST_FILENAME,
+    extract_dirname=ARCHIVE_EXTRACT_DIRNAME, image_extensions=SHEET_IMAGE_EXTENSIONS, logger=app.logger
+)
+
+
+def job_progress_data(job):
+    """job_store 기록 -> progress/done 이벤트 데이터"""
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "result": job["result"],
+        "phase": job["phase"],
+        "message": job["message"] or "",
+        "processed": job["processed"],
+        "total": job["total"],
+        "sheets_per_second": job["sheets_per_second"],
+        "eta_seconds": job["eta_seconds"],
+        "elapsed_seconds": job["elapsed_seconds"],
+        "phase_timings": job["phase_timings"]
+    }
+
+
+def close_job_events(task_id):
+    """작업 스트림에 done 이벤트를 보내고 닫습니다. (작업 함수의 finally에서 호출)"""
+    job = job_store.get(task_id)
+    job_events.close(task_id, job_progress_data(job) if job else {"job_id": task_id})
+
+
+def sheet_event_data(image_file, sheet_result, from_checkpoint=False):
+    """답안지 한 장의 sheet 이벤트 데이터 (실패 이미지 base64는 제외한 답안 요약)"""
+    answer_json = sheet_result.get("answer_json") or {}
+    return {
+        "image_file": image_file,
+        "status": "error" if sheet_result.get("error") else "success",
+        "error": sheet_result.get("error"),
+        "from_checkpoint": from_checkpoint,
+        "student_id": answer_json.get("student_id"),
+        "answers": [
+            {
+                "question_number": answer["question_number"],
+                "sub_question_number": answer["sub_question_number"],
+                "student_answer": answer["student_answer"],
+                "confidence": answer["confidence"]
+            }
+            for answer in answer_json.get("answers", [])
+        ],
+        "failure_count": len(sheet_result.get("failure_json") or [])
+    }
+
+
+def queue_full_response(error):
+    """대기열이 가득 찼을 때의 429 응답 (Retry-After 헤더 포함)"""
+    app.logger.warning(f"작업 대기열 포화로 요청 거절: {job_scheduler.stats()}")
+    response = jsonify({
+        "error": "Server is busy. Too many recognition jobs are queued.",
+        "retry_after": error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+# --- 학번 매핑 manifest / 아카이브 모드 (ARCHIVE_SHEET_SOURCE_ENABLED) ---
+def build_student_manifest(subject_path, source, originals, student_list, logger, task_id):
+    """
+    student_list의 파일명 명세를 원본 파일명(또는 ZIP 항목 이름)과 매칭해 과목 폴더에 manifest로 저장합니다. (파일은 rename하지 않음)
+    source: 이미지 폴더 이름 또는 ZIP 파일명
+    """
+    started_at = time.time()
+    originals = list(originals)
+    manifest, failures = StudentManifest.build(
+        os.path.join(subject_path, STUDENT_MANIFEST_FILENAME), source, originals, student_list or [],
+        logger, f"[BG ANSWER TASK - {task_id}]"
+    )
+    manifest.save()
+    student_image_index.invalidate(subject_path)
+    logger.info(
+        f"[BG ANSWER TASK - {task_id}] 학번 매핑 저장: 답안지 {len(originals)}장, 매핑 {len(manifest.entries)}건, "
+        f"매칭 실패 {len(failures)}건 ({time.time() - started_at:.3f}초, {manifest.path})"
+    )
+    return manifest
+
+def ensure_archive_sheet_extracted(image):
+    """아카이브 모드의 StudentImage를 ZIP에서 풀어 둡니다. (이미 풀어 둔 것이 ZIP보다 새로우면 그대로 사용)"""
+    if os.path.exists(image.path) and os.path.getmtime(image.path) >= image.mtime:
+        return image.path
+    with open_archive_source(image.archive_path) as source:
+        if source is None:
+            raise FileNotFoundError(image.archive_path)
+        return source.extract(image.member, image.path)
+
+def read_student_image_bytes(image):
+    """StudentImage의 원본 바이트 (아카이브 모드면 ZIP 항목을 풀지 않고 메모리에서 읽음)"""
+    if image.member is not None:
+        with open_archive_source(image.archive_path) as source:
+            if source is None:
+                raise FileNotFoundError(image.archive_path)
+            return source.read(image.member).tobytes()
+    with open(image.path, 'rb') as f:
+        return f.read()
+
+def choose_derivative_format(requested_format):
+    """요청 format -> 축소본 형식 ("webp" | "jpeg"). auto면 Accept 헤더로 정하고, WebP를 만들 수 없으면 JPEG"""
+    if requested_format == 'auto':
+        requested_format = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    if requested_format == 'webp' and WEBP_SUPPORTED:
+        return 'webp'
+    return 'jpeg'
+
+def pregenerate_review_images(subject_path, logger, task_id):
+    """과목 전체 답안지의 검토용 축소본을 미리 만듭니다. (IMAGE_PREGENERATE_WIDTH)"""
+    started_at = time.time()
+    width = derivative_cache.snap_width(IMAGE_PREGENERATE_WIDTH)
+    derivative_format = 'webp' if WEBP_SUPPORTED else 'jpeg'
+    try:
+        images = student_image_index.images(subject_path)
+    except OSError as e:
+        logger.warning(f"[BG ANSWER TASK - {task_id}] 축소본 생성 건너뜀 (이미지 목록을 읽을 수 없음): {e}")
+        return
+    for image in images:
+        try:
+            derivative_cache.get(
+                (image.path, image.member, image.size, image.mtime), width, derivative_format,
+                lambda image=image: read_student_image_bytes(image)
+            )
+        except Exception as e:
+            logger.warning(f"[BG ANSWER TASK - {task_id}] 축소본 생성 실패 ({image.path}): {e}")
+    logger.info(f"[BG ANSWER TASK - {task_id}] 검토용 축소본 {len(images)}장 준비 (폭 {width}, {derivative_format}, {time.time() - started_at:.1f}초)")
+
+def release_extracted_sheets(archive_path, extracted_images_path):
+    """학번 인식이 끝난 뒤 압축 해제 폴더에서 ZIP에 같은 이름/크기로 남아 있는 이미지를 지우고 지운 수를 반환합니다."""
+    member_sizes = {}
+    with open_archive_source(archive_path) as source:
+        if source is None or not os.path.isdir(extracted_images_path):
+            return 0
+        for member in source.names(SHEET_IMAGE_EXTENSIONS):
+            member_sizes[unicodedata.normalize('NFC', os.path.basename(member))] = source.size(member)
+    released_count = 0
+    for filename in os.listdir(extracted_images_path):
+        file_path = os.path.join(extracted_images_path, filename)
+        expected_size = member_sizes.get(unicodedata.normalize('NFC', filename))
+        if expected_size is not None and os.path.isfile(file_path) and os.path.getsize(file_path) == expected_size:
+            os.remove(file_path)
+            released_count += 1
+    student_image_index.invalidate(os.path.dirname(extracted_images_path))
+    return released_count
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """헬스 체크 엔드포인트"""
@@ -110,17 +345,27 @@ def health_check():
     
     return jsonify({"status": "healthy", "message": "OCR service is running."}), 200
 
-def background_task(subject_name, zip_path, xlsx_path, extracted_images_path, processing_folder_path, parent_logger):
+def background_task(subject_name, zip_path, xlsx_path, extracted_images_path, processing_folder_path, parent_logger, task_id=None, archive_extracted=False):
+    """archive_extracted: 스트리밍 수신에서 업로드 중에 이미 압축을 푼 경우 (zip_path는 저장되지 않음)"""
     logger = parent_logger # 전달받은 로거 사용
     try:
         logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 작업 시작.")
+        if task_id:
+            job_store.start_phase(task_id, "extract", "압축 해제 중")
         # 4. 압축 해제
-        if not extract_archive(zip_path, extracted_images_path):
+        if archive_extracted:
+            logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 업로드 중 압축 해제된 폴더 사용: {extracted_images_path}")
+        elif not extract_archive(zip_path, extracted_images_path):
             logger.error(f"[BG TASK - {os.path.basename(processing_folder_path)}] 압축 해제 실패: {zip_path}")
+            if task_id:
+                job_store.finish(task_id, "error", "압축 해제 실패")
             return
-        logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 압축 해제 완료: {zip_path} -> {extracted_images_path}")
+        else:
+            logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 압축 해제 완료: {zip_path} -> {extracted_images_path}")
 
         # 5. XLSX 파싱
+        if task_id:
+            job_store.start_phase(task_id, "xlsx", "출석부 파싱 중")
         student_numbers_from_xlsx = []
         if os.path.exists(xlsx_path):
             try:
@@ -132,6 +377,8 @@ def background_task(subject_name, zip_path, xlsx_path, extracted_images_path, pr
             logger.warning(f"[BG TASK - {os.path.basename(processing_folder_path)}] XLSX 파일 없음: {xlsx_path}")
 
         # 6. 학번 인식 (및 조건부 파일명 변경)
+        if task_id:
+            job_store.start_phase(task_id, "student_id", "학번 인식 중")
         logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 학번 인식 모듈 호출 (subject_name: {subject_name})...")
         
         # Define Kafka topic for student_id_recognition module
@@ -157,20 +404,32 @@ def background_task(subject_name, zip_path, xlsx_path, extracted_images_path, pr
         logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 학번 인식 완료. Kafka 전송 대상 이미지 수: {len(result_from_module.get('lowConfidenceImages', []))}")
 
         # 7. Kafka로 결과 전송 (2차 수정이 필요한 이미지 정보만 전송됨)
-        if producer:
-            try:
-                topic_name = "student-id-image-requests" # 필요시 토픽명 변경
-                producer.send(topic_name, result_from_module)
-                producer.flush()
+        if task_id:
+            job_store.start_phase(task_id, "kafka", "결과 전송 중")
+        if kafka_emitter.available:
+            topic_name = "student-id-image-requests" # 필요시 토픽명 변경
+            if kafka_emitter.send(topic_name, result_from_module) and kafka_emitter.flush():
                 logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] Kafka 전송 완료. Topic: {topic_name}, Message: {result_from_module}")
-            except Exception as e:
-                logger.error(f"[BG TASK - {os.path.basename(processing_folder_path)}] Kafka 메시지 전송 실패: {e}")
+            else:
+                logger.error(f"[BG TASK - {os.path.basename(processing_folder_path)}] Kafka 메시지 전송 실패. Topic: {topic_name}")
         else:
             logger.error(f"[BG TASK - {os.path.basename(processing_folder_path)}] Kafka Producer not available. Skipping message send.")
 
+        # 아카이브 모드: 이후 단계는 ZIP에서 답안지를 읽으므로 풀어 둔 이미지는 지움
+        if ARCHIVE_SHEET_SOURCE_ENABLED and os.path.isfile(zip_path):
+            released_count = release_extracted_sheets(zip_path, extracted_images_path)
+            logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 아카이브 모드: 압축 해제 이미지 {released_count}장 정리 (답안지는 {zip_path}에서 읽음)")
+
+        if task_id:
+            job_store.finish(task_id, "success", f"학번 인식 완료 (확인 필요 {len(result_from_module.get('lowConfidenceImages', []))}장)")
+
     except Exception as e:
         logger.error(f"[BG TASK - {os.path.basename(processing_folder_path)}] 백그라운드 작업 중 예외 발생: {traceback.format_exc()}")
+        if task_id:
+            job_store.finish(task_id, "error", f"학번 인식 중 오류: {str(e)}")
     finally:
+        if task_id:
+            close_job_events(task_id)
         if os.path.exists(processing_folder_path):
             logger.info(f"[BG TASK - {os.path.basename(processing_folder_path)}] 백그라운드 작업 완료. 처리 폴더 ({processing_folder_path})는 유지됩니다.")
         else:
@@ -178,6 +437,8 @@ def background_task(subject_name, zip_path, xlsx_path, extracted_images_path, pr
 
 @app.route('/recognize/student_id', methods=['POST'])
 def recognize_student_id_endpoint():
+    if STREAMING_INGEST_ENABLED and request.mimetype == 'multipart/form-data':
+        return recognize_student_id_streaming()
     session_temp_dir = None # finally 또는 except에서 사용하기 위해 try 바깥에 선언
     try:
         subject_name = request.form.get('subject')
@@ -202,6 +463,9 @@ def recognize_student_id_endpoint():
         if not allowed_file(xlsx_file_obj.filename, ALLOWED_EXTENSIONS_XLSX):
             return jsonify({"error": "Invalid xlsx_file type"}), 400
 
+        # 파일을 저장하기 전에 대기열 여유 확인
+        job_scheduler.ensure_capacity()
+
         # session_temp_dir = tempfile.mkdtemp(dir=current_app.config['UPLOAD_FOLDER_BASE']) # 기존 임시폴더 생성 코드 주석 처리
         # app.logger.info(f"세션 임시 폴더 생성: {session_temp_dir} (ID: {os.path.basename(session_temp_dir)})")
 
@@ -240,20 +504,12 @@ def recognize_student_id_endpoint():
         os.makedirs(extracted_images_path, exist_ok=True)
         app.logger.info(f"압축 해제 대상 폴더 생성/확인: {extracted_images_path}")
 
-        thread = threading.Thread(
-            target=background_task,
-            args=(subject_name, zip_path, xlsx_path, extracted_images_path, subject_data_path, app.logger),
-            name=f"BGTask-{subject_name_for_path}-{zip_folder_name_for_extraction}"
+        return submit_student_id_job(
+            subject_name, subject_name_for_path, zip_path, xlsx_path, extracted_images_path, subject_data_path, zip_folder_name_for_extraction
         )
-        thread.start()
-        app.logger.info(f"백그라운드 스레드 시작됨 ({thread.name}) for subject folder: {subject_data_path}")
-
-        return jsonify({"status": "processing_started", 
-                        "message": "Files received and student ID recognition process started in background.",
-                        "subject_folder": subject_data_path, 
-                        "zip_folder_name": zip_folder_name_for_extraction
-                        }), 202
 
+    except JobQueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         app.logger.error(f"recognize_student_id_endpoint 예외 발생: {traceback.format_exc()}")
         # subject_data_path 변수가 이 블록에서 사용될 수 있도록, try 시작 전에 None으로 초기화 필요
@@ -267,6 +523,110 @@ def recognize_student_id_endpoint():
         app.logger.info(f"오류 발생. 생성된 과목 폴더 ({subject_data_path if 'subject_data_path' in locals() else 'N/A'})는 유지됩니다.")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+def submit_student_id_job(subject_name, subject_name_for_path, zip_path, xlsx_path, extracted_images_path, subject_data_path,
+                          zip_folder_name_for_extraction, archive_extracted=False):
+    """학번 인식 작업을 기록/대기열에 등록하고 202 응답을 반환합니다. 대기열이 가득 차면 JobQueueFull."""
+    task_id = f"student-id-{subject_name_for_path}-{uuid.uuid4().hex[:8]}"
+    job_store.create(task_id, "student_id", subject_name, "대기 중")
+    job_events.open(task_id)
+    try:
+        job_scheduler.submit(
+            "student_id", subject_name, background_task,
+            subject_name, zip_path, xlsx_path, extracted_images_path, subject_data_path, app.logger, task_id, archive_extracted,
+            job_id=task_id
+        )
+    except JobQueueFull:
+        job_store.finish(task_id, "error", "대기열 포화로 거절됨")
+        close_job_events(task_id)
+        raise
+    app.logger.info(f"백그라운드 작업 대기열 등록 ({task_id}, 대기 순번 {job_scheduler.positions().get(task_id)}) for subject folder: {subject_data_path}")
+
+    return jsonify({"status": "processing_started", 
+                    "message": "Files received and student ID recognition process started in background.",
+                    "task_id": task_id,
+                    "events_url": f"/jobs/{task_id}/events",
+                    "subject_folder": subject_data_path, 
+                    "zip_folder_name": zip_folder_name_for_extraction
+                    }), 202
+
+def recognize_student_id_streaming():
+    """
+    recognize_student_id_endpoint의 스트리밍 수신 모드.
+    요청 본문을 chunk 단위로 읽으면서 answerSheetZip을 staging 폴더(APP_ROOT/.ingest-<uuid>)에 바로 풀고,
+    업로드가 끝나면 과목 폴더로 옮겨 압축 해제 단계 없이 학번 인식 작업을 등록합니다. (ZIP 자체는 아카이브 모드에서만 저장)
+    subject 필드가 파일보다 뒤에 올 수 있으므로 과목 폴더는 업로드가 끝난 뒤에 정합니다.
+    """
+    staging_dir = os.path.join(APP_ROOT, f".ingest-{uuid.uuid4().hex}")
+    try:
+        # 업로드를 받기 전에 대기열 여유 확인
+        job_scheduler.ensure_capacity()
+        started_at = time.time()
+        first_image_at = None
+        def on_image_extracted(image_path):
+            nonlocal first_image_at
+            if first_image_at is None:
+                first_image_at = time.time()
+                app.logger.info(f"[recognize_student_id] 첫 답안지 압축 해제: {os.path.basename(image_path)} ({first_image_at - started_at:.1f}초)")
+
+        ingest = ingest_multipart(
+            request.stream, request.headers.get('Content-Type', ''), staging_dir, 'answerSheetZip',
+            limits=INGEST_LIMITS, on_member=on_image_extracted, keep_archive=ARCHIVE_SHEET_SOURCE_ENABLED
+        )
+        app.logger.info(
+            f"[recognize_student_id] 스트리밍 수신 완료: {ingest.bytes_received} bytes, 이미지 {len(ingest.extracted_files)}장 "
+            f"(건너뜀 {ingest.skipped_members}개), {time.time() - started_at:.1f}초"
+        )
+
+        subject_name = ingest.fields.get('subject')
+        app.logger.info(f"[recognize_student_id] Received subject_name from form: '{subject_name}'")
+        original_zip_filename = ingest.filenames.get('answerSheetZip')
+        original_xlsx_filename = ingest.filenames.get('attendanceSheet')
+        if not subject_name:
+            return jsonify({"error": "Missing 'subject' in form data"}), 400
+        if original_zip_filename is None:
+            return jsonify({"error": "Missing 'answerSheetZip' in files"}), 400
+        if original_xlsx_filename is None or 'attendanceSheet' not in ingest.files:
+            return jsonify({"error": "Missing 'attendanceSheet' in files"}), 400
+        if original_zip_filename == '' or original_xlsx_filename == '':
+            return jsonify({"error": "File name cannot be empty"}), 400
+        if not allowed_file(original_xlsx_filename, ALLOWED_EXTENSIONS_XLSX):
+            return jsonify({"error": "Invalid xlsx_file type"}), 400
+
+        subject_name_for_path = subject_name
+        subject_data_path = os.path.join(APP_ROOT, subject_name_for_path)
+        os.makedirs(subject_data_path, exist_ok=True)
+
+        zip_name_part, _ = os.path.splitext(original_zip_filename)
+        zip_folder_name_for_extraction = zip_name_part if zip_name_part else uuid.uuid4().hex
+        zip_path = os.path.join(subject_data_path, original_zip_filename) # 아카이브 모드에서만 저장 (아니면 로그용)
+        xlsx_path = os.path.join(subject_data_path, original_xlsx_filename)
+        os.replace(ingest.files['attendanceSheet'], xlsx_path)
+        if ingest.archive_path:
+            os.replace(ingest.archive_path, zip_path)
+
+        # 풀어 놓은 이미지를 과목 폴더로 이동 (같은 파일 시스템이므로 rename)
+        extracted_images_path = os.path.join(subject_data_path, zip_folder_name_for_extraction)
+        os.makedirs(extracted_images_path, exist_ok=True)
+        for image_path in ingest.extracted_files:
+            os.replace(image_path, os.path.join(extracted_images_path, os.path.basename(image_path)))
+        app.logger.info(f"파일 이동 완료: {extracted_images_path} ({len(ingest.extracted_files)}장), {xlsx_path}")
+
+        return submit_student_id_job(
+            subject_name, subject_name_for_path, zip_path, xlsx_path, extracted_images_path, subject_data_path,
+            zip_folder_name_for_extraction, archive_extracted=True
+        )
+
+    except IngestError as e:
+        app.logger.warning(f"[recognize_student_id] 스트리밍 수신 거절: {e.message}")
+        return jsonify({"error": e.message}), e.status_code
+    except JobQueueFull as e:
+        return queue_full_response(e)
+    except Exception as e:
+        app.logger.error(f"recognize_student_id_streaming 예외 발생: {traceback.format_exc()}")
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
 def send_spring_notification(action, subject_name, additional_data=None, request_origin=None):
     """Spring 서버에 알림을 보내는 함수 - 요청을 보낸 곳으로 callback"""
     try:
@@ -312,16 +672,20 @@ def send_spring_notification(action, subject_name, additional_data=None, request
         app.logger.error(f"Spring 알림 전송 실패 ({action}): {e}")
         app.logger.error(f"Spring 알림 전송 실패 상세: {traceback.format_exc()}")
 
-def background_answer_recognition_task(subject_name, student_id_update_data, answer_key_data, parent_logger, request_origin):
-    """백그라운드에서 답안 인식을 수행하는 함수"""
+def background_answer_recognition_task(subject_name, student_id_update_data, answer_key_data, parent_logger, request_origin, task_id=None):
+    """백그라운드에서 답안 인식을 수행하는 함수 (task_id: 요청 응답으로 돌려준 작업 ID)"""
     logger = parent_logger
-    task_id = f"answer-recognition-{subject_name}-{uuid.uuid4().hex[:8]}"
+    task_id = task_id or f"answer-recognition-{subject_name}-{uuid.uuid4().hex[:8]}"
+    checkpoints = None
     
     try:
         logger.info(f"[BG ANSWER TASK - {task_id}] 작업 시작")
         
-        # 작업 상태 등록
-        current_tasks[subject_name] = {"status": "pending", "task_id": task_id}
+        # 작업 상태 등록 (대기열을 거치지 않고 직접 호출된 경우 여기서 생성)
+        if job_store.get(task_id) is None:
+            job_store.create(task_id, "answer", subject_name)
+            job_events.open(task_id)
+        job_store.start_phase(task_id, "prepare", "준비 중")
         
         # Spring에 처리 시작 알림
         send_spring_notification("pending", subject_name, {"task_id": task_id}, request_origin)
@@ -333,7 +697,7 @@ def background_answer_recognition_task(subject_name, student_id_update_data, ans
 
         if not os.path.isdir(subject_path):
             logger.error(f"Subject path not found: {subject_path}")
-            current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": "Subject directory not found"}
+            job_store.finish(task_id, "error", "Subject directory not found")
             send_spring_notification("DONE", subject_name, {
                 "task_id": task_id, 
                 "status": "error", 
@@ -341,54 +705,73 @@ def background_answer_recognition_task(subject_name, student_id_update_data, ans
             }, request_origin)
             return
 
-        # 하위 디렉토리 찾기
-        subdirectories = [d for d in os.listdir(subject_path) if os.path.isdir(os.path.join(subject_path, d))]
+        # 학번 매핑: 파일을 rename하지 않고 원본 파일명(ZIP 항목) -> 답안지 이름을 manifest로 저장하고, 답안지는 그 이름으로 처리
+        # 아카이브 모드면 압축 해제 폴더 대신 ZIP에서 답안지를 바로 읽음
+        manifest = None
+        archive_path = find_sheet_archive(subject_path) if ARCHIVE_SHEET_SOURCE_ENABLED else None
+        if archive_path:
+            with open_archive_source(archive_path) as archive_source:
+                members = archive_source.names(SHEET_IMAGE_EXTENSIONS) if archive_source else []
+            logger.info(f"[BG ANSWER TASK - {task_id}] 학번 매핑 시작 (아카이브: {archive_path})")
+            job_store.start_phase(task_id, "rename", "학번 매핑 중")
+            manifest = build_student_manifest(subject_path, os.path.basename(archive_path), members, student_list, logger, task_id)
+            sheet_paths = {}
+            for member in members:
+                sheet_paths[manifest.sheet_name(member)] = make_archive_ref(archive_path, member, manifest.sheet_name(member))
+            dir_path = subject_path # <이미지>_answers.json 저장 위치
+            job_store.start_phase(task_id, "load", "답안 인식 중")
+        else:
+            # 하위 디렉토리 찾기
+            subdirectories = [d for d in os.listdir(subject_path) if os.path.isdir(os.path.join(subject_path, d))]
         
-        if len(subdirectories) != 1:
-            logger.error(f"Expected 1 subdirectory, found {len(subdirectories)}")
-            current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": f"Invalid subdirectory count: {len(subdirectories)}"}
-            send_spring_notification("DONE", subject_name, {
-                "task_id": task_id,
-                "status": "error", 
-                "message": f"Invalid subdirectory count: {len(subdirectories)}"
-            }, request_origin)
-            return
-
-        target_zip_folder_name = subdirectories[0]
-        base_image_path = os.path.join(subject_path, target_zip_folder_name)
-        logger.info(f"Target base image path: {base_image_path}")
-
-        # 파일명 변경 작업 (동기적으로 수행)
-        logger.info(f"[BG ANSWER TASK - {task_id}] 파일명 변경 시작")
-        current_tasks[subject_name] = {"status": "processing", "task_id": task_id, "message": "파일명 변경 중"}
-        background_rename_files_task(subject_name, student_list, base_image_path, logger)
-        logger.info(f"[BG ANSWER TASK - {task_id}] 파일명 변경 완료")
-
-        # 답안 인식 로직 수행
-        logger.info(f"[BG ANSWER TASK - {task_id}] 답안 인식 시작")
-        current_tasks[subject_name] = {"status": "processing", "task_id": task_id, "message": "답안 인식 중"}
+            if len(subdirectories) != 1:
+                logger.error(f"Expected 1 subdirectory, found {len(subdirectories)}")
+                job_store.finish(task_id, "error", f"Invalid subdirectory count: {len(subdirectories)}")
+                send_spring_notification("DONE", subject_name, {
+                    "task_id": task_id,
+                    "status": "error", 
+                    "message": f"Invalid subdirectory count: {len(subdirectories)}"
+                }, request_origin)
+                return
+
+            target_zip_folder_name = subdirectories[0]
+            base_image_path = os.path.join(subject_path, target_zip_folder_name)
+            logger.info(f"Target base image path: {base_image_path}")
         
-        dir_path = os.path.join(APP_ROOT, subject_name, subject_name)
+            dir_path = os.path.join(APP_ROOT, subject_name, subject_name)
         
-        if not os.path.exists(dir_path):
-            logger.error(f"디렉토리를 찾을 수 없습니다: {dir_path}")
-            current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": f"Directory not found: {dir_path}"}
-            send_spring_notification("DONE", subject_name, {
-                "task_id": task_id,
-                "status": "error",
-                "message": f"Directory not found: {dir_path}"
-            }, request_origin)
-            return
-
-        # 이미지 파일 목록 추출
-        image_extensions = ['.jpg', '.jpeg', '.png']
-        image_files = []
-        for ext in image_extensions:
-            image_files.extend([f for f in os.listdir(dir_path) if f.lower().endswith(ext)])
-
+            if not os.path.exists(dir_path):
+                logger.error(f"디렉토리를 찾을 수 없습니다: {dir_path}")
+                job_store.finish(task_id, "error", f"Directory not found: {dir_path}")
+                send_spring_notification("DONE", subject_name, {
+                    "task_id": task_id,
+                    "status": "error",
+                    "message": f"Directory not found: {dir_path}"
+                }, request_origin)
+                return
+
+            # 이미지 파일 목록 추출
+            image_extensions = ['.jpg', '.jpeg', '.png']
+            image_files = []
+            for ext in image_extensions:
+                image_files.extend([f for f in os.listdir(dir_path) if f.lower().endswith(ext)])
+
+            logger.info(f"[BG ANSWER TASK - {task_id}] 학번 매핑 시작")
+            job_store.start_phase(task_id, "rename", "학번 매핑 중")
+            manifest = build_student_manifest(subject_path, os.path.basename(dir_path), image_files, student_list, logger, task_id)
+            sheet_paths = {}
+            for image_file in image_files:
+                sheet_paths[manifest.sheet_name(image_file)] = make_sheet_ref(os.path.join(dir_path, image_file), manifest.sheet_name(image_file))
+
+            # 답안 인식 로직 수행
+            logger.info(f"[BG ANSWER TASK - {task_id}] 답안 인식 시작")
+            job_store.start_phase(task_id, "load", "답안 인식 중")
+
+        # 답안지 이름(결과 파일명/학번 파싱에 쓰는 파일명) -> 이미지 경로 또는 archive ref
+        image_files = list(sheet_paths)
         if not image_files:
-            logger.warning(f"이미지 파일을 찾을 수 없습니다: {dir_path}")
-            current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": "No image files found"}
+            logger.warning(f"이미지 파일을 찾을 수 없습니다: {archive_path or dir_path}")
+            job_store.finish(task_id, "error", "No image files found")
             send_spring_notification("DONE", subject_name, {
                 "task_id": task_id,
                 "status": "error",
@@ -416,65 +799,163 @@ def background_answer_recognition_task(subject_name, student_id_update_data, ans
         
         tail_question_counts = extract_tail_question_counts(answer_key_data)
 
-        # 각 이미지 처리
-        processed_count = 0
-        for image_file in image_files:
-            try:
-                image_path = os.path.join(dir_path, image_file)
-                logger.info(f"처리 중: {image_file}")
-                
-                # 진행 상황 업데이트
-                current_tasks[subject_name] = {"status": "processing", "task_id": task_id, "message": f"처리 중: {processed_count+1}/{len(image_files)}"}
+        # 과목별 숫자 예측 캐시 (이전 채점에서 저장한 캐시 파일이 있으면 불러옴)
+        prediction_cache = get_prediction_cache(subject_name)
+        prediction_cache_path = os.path.join(APP_ROOT, subject_name, DIGIT_PREDICTION_CACHE_FILENAME)
+        if prediction_cache and DIGIT_PREDICTION_CACHE_PERSIST:
+            loaded_count = prediction_cache.load(prediction_cache_path)
+            logger.info(f"[BG ANSWER TASK - {task_id}] 숫자 예측 캐시 로드: {loaded_count}개 ({prediction_cache_path})")
 
-                # 1. 전처리
-                processed_crops = preprocess_answer_sheet(image_path, answer_key_data)
-                if not processed_crops:
+        # 답안지 한 장의 결과 처리 (Kafka 전송, failure_json 누적, 결과 저장, 진행 상황 갱신)
+        # from_checkpoint: 체크포인트에서 재사용한 결과 (다시 기록하지 않고, 진행률은 다시 인식하는 답안지 기준)
+        processed_count = 0
+        finished_count = 0
+        reused_count = 0
+        content_hashes = {} # 이미지 파일명 -> 내용 해시 (체크포인트 사용 시)
+        detection_counts = defaultdict(int) # 영역 검출 방법별 답안지 수 (template / yolo / checkpoint)
+        cascade_counts = empty_cascade_stats() # 이 작업의 숫자 분류 cascade 카운터 (worker chunk별 카운터 합산)
+        def handle_sheet_result(image_file, sheet_result, from_checkpoint=False):
+            nonlocal processed_count, finished_count, reused_count
+            job_events.publish(task_id, "sheet", sheet_event_data(image_file, sheet_result, from_checkpoint))
+            if from_checkpoint:
+                reused_count += 1
+                detection_counts["checkpoint"] += 1
+            else:
+                finished_count += 1
+                if sheet_result.get("detection"):
+                    detection_counts[sheet_result["detection"]] += 1
+                job_store.update_progress(
+                    task_id, finished_count, len(pending_files),
+                    f"처리 중: {finished_count}/{len(pending_files)} (재사용 {reused_count}장)"
+                )
+
+            if sheet_result.get("error"):
+                if sheet_result.get("traceback"):
+                    logger.error(f"이미지 처리 중 오류 ({image_file}): {sheet_result['traceback']}")
+                else:
                     logger.warning(f"전처리 결과가 없음: {image_file}")
-                    errors.append({"file": image_file, "error": "No crops from preprocessing"})
-                    continue
+                errors.append({"file": image_file, "error": sheet_result["error"]})
+                return
 
-                # 2. 인식
-                recognition_result = recognize_answer_sheet_data(processed_crops, answer_key_data, tail_question_counts)
+            # Kafka로 결과 전송 (비동기, 작업 끝에 한 번 flush)
+            answer_json = sheet_result.get("answer_json") or {}
+            kafka_emitter.send('student-responses', answer_json)
 
-                # Kafka로 결과 전송
-                answer_json = recognition_result.get("answer_json", {})
-                if producer:
-                    try:
-                        producer.send('student-responses', answer_json)
-                        producer.flush()
-                    except Exception as kafka_error:
-                        logger.error(f"Kafka 전송 실패 ({image_file}): {kafka_error}")
+            # failure_json 업데이트
+            failure_json["images"].extend(sheet_result.get("failure_json", []))
 
-                # failure_json 업데이트
-                failure_images = recognition_result.get("failure_json", [])
-                failure_json["images"].extend(failure_images)
-
-                # 결과 저장
+            # 결과 저장 (체크포인트 사용 시 체크포인트 파일에 한 줄 추가)
+            if checkpoints is not None:
+                if not from_checkpoint:
+                    checkpoints.record(content_hashes[image_file], image_file, sheet_result)
+            else:
                 answer_json_filename = os.path.join(dir_path, f"{os.path.splitext(image_file)[0]}_answers.json")
                 with open(answer_json_filename, 'w', encoding='utf-8') as f:
                     json.dump(answer_json, f, ensure_ascii=False, indent=4)
 
-                processed_count += 1
-                logger.info(f"처리 완료: {image_file} ({processed_count}/{len(image_files)})")
-
-            except Exception as e:
-                logger.error(f"이미지 처리 중 오류 ({image_file}): {traceback.format_exc()}")
-                errors.append({"file": image_file, "error": str(e)})
+            processed_count += 1
+            logger.info(f"처리 완료: {image_file} ({processed_count}/{len(image_files)})")
+
+        # 체크포인트: 이전 실행에서 끝난 답안지는 저장된 결과를 다시 내보내고, 없거나 달라진 답안지만 인식
+        pending_files = list(image_files)
+        if SHEET_CHECKPOINT_ENABLED:
+            job_store.start_phase(task_id, "checkpoint", "이전 결과 확인 중")
+            checkpoint_path = os.path.join(APP_ROOT, subject_name, SHEET_CHECKPOINT_FILENAME)
+            checkpoints = SheetCheckpointStore(checkpoint_path, answer_key_hash(answer_key_data))
+            loaded_count = checkpoints.load()
+            logger.info(f"[BG ANSWER TASK - {task_id}] 체크포인트 로드: {loaded_count}개 (정답 키/파이프라인 불일치로 버림 {checkpoints.stale}개)")
+            pending_files = []
+            content_hashes.update(zip(image_files, sheet_content_hashes([sheet_paths[image_file] for image_file in image_files], ARCHIVE_READ_WORKERS)))
+            for image_file in image_files:
+                cached_result = checkpoints.lookup(content_hashes[image_file], image_file)
+                if cached_result is None:
+                    pending_files.append(image_file)
+                    continue
+                try:
+                    handle_sheet_result(image_file, cached_result, from_checkpoint=True)
+                except Exception as e:
+                    logger.error(f"체크포인트 결과 처리 중 오류 ({image_file}): {traceback.format_exc()}")
+                    errors.append({"file": image_file, "error": str(e)})
+            logger.info(f"[BG ANSWER TASK - {task_id}] 체크포인트 재사용 {reused_count}장, 인식할 답안지 {len(pending_files)}장")
+
+        # 각 이미지 처리: YOLO 배치 검출 단위(chunk)로 나누고, worker 풀이 있으면 여러 chunk를 동시에 처리하여 끝난 순서대로 결과 처리
+        sheet_pool = get_sheet_process_pool() if pending_files else None
+        image_paths = [sheet_paths[image_file] for image_file in pending_files]
+
+        # 과목별 영역 템플릿 (저장된 것이 없으면 기준 답안지 몇 장으로 생성)
+        region_template = None
+        if REGION_TEMPLATE_ENABLED and pending_files:
+            job_store.start_phase(task_id, "template", "영역 템플릿 준비 중")
+            region_template_path = os.path.join(APP_ROOT, subject_name, REGION_TEMPLATE_FILENAME)
+            region_template = load_or_build_region_template(region_template_path, image_paths, REGION_TEMPLATE_REFERENCE_SHEETS)
+            if region_template is None:
+                logger.warning(f"[BG ANSWER TASK - {task_id}] 영역 템플릿을 만들지 못해 모든 답안지를 YOLO로 검출합니다.")
+
+        # 처리 속도(장/초)와 ETA는 이 단계부터 다시 인식하는 답안지 기준으로 측정
+        job_store.start_phase(task_id, "recognition", f"처리 중: 0/{len(pending_files)} (재사용 {reused_count}장)", total=len(pending_files))
+        sheet_chunks = plan_sheet_chunks(image_paths, ANSWER_RECOGNITION_WORKERS if sheet_pool else 1)
+        if sheet_pool:
+            logger.info(f"[BG ANSWER TASK - {task_id}] worker 풀로 {len(pending_files)}장 병렬 처리 (chunk {len(sheet_chunks)}개)")
+            def submit_chunk(chunk_paths):
+                return submit_answer_sheet_chunk(
+                    sheet_pool, chunk_paths, answer_key_data, tail_question_counts,
+                    cache_namespace=subject_name, cache_path=prediction_cache_path, region_template=region_template
+                )
+            for chunk_paths, future in iter_bounded_chunk_futures(submit_chunk, sheet_chunks, SHEET_CHUNKS_IN_FLIGHT_PER_JOB):
+                try:
+                    chunk_results, cache_entries, chunk_cascade_counts = future.result()
+                except Exception as e:
+                    chunk_error = {"error": str(e), "traceback": traceback.format_exc()}
+                    for image_path in chunk_paths:
+                        handle_sheet_result(sheet_file_name(image_path), chunk_error)
+                    continue
+                merge_cascade_stats(cascade_counts, chunk_cascade_counts)
+                if cache_entries and prediction_cache:
+                    cache_keys, cache_values = zip(*cache_entries)
+                    prediction_cache.put_many(cache_keys, cache_values)
+                for sheet_result in chunk_results:
+                    image_file = sheet_file_name(sheet_result["image_path"])
+                    try:
+                        handle_sheet_result(image_file, sheet_result)
+                    except Exception as e:
+                        logger.error(f"이미지 결과 처리 중 오류 ({image_file}): {traceback.format_exc()}")
+                        errors.append({"file": image_file, "error": str(e)})
+        else:
+            for chunk_paths in sheet_chunks:
+                logger.info(f"처리 중: {', '.join(sheet_file_name(p) for p in chunk_paths)}")
+                with cascade_stats_scope() as chunk_cascade_counts:
+                    chunk_results = process_answer_sheet_chunk(
+                        chunk_paths, answer_key_data, tail_question_counts, cache_namespace=subject_name, region_template=region_template
+                    )
+                merge_cascade_stats(cascade_counts, chunk_cascade_counts)
+                for sheet_result in chunk_results:
+                    image_file = sheet_file_name(sheet_result["image_path"])
+                    try:
+                        handle_sheet_result(image_file, sheet_result)
+                    except Exception as e:
+                        logger.error(f"이미지 결과 처리 중 오류 ({image_file}): {traceback.format_exc()}")
+                        errors.append({"file": image_file, "error": str(e)})
 
         # failure_json 저장 및 Kafka 전송
+        job_store.start_phase(task_id, "finalize")
+        if checkpoints is not None:
+            kept_count = checkpoints.compact(content_hashes.items())
+            logger.info(f"[BG ANSWER TASK - {task_id}] 체크포인트 정리: {kept_count}개 유지 ({checkpoint_path})")
+        if RENAME_FILES_ON_DISK and manifest is not None and not archive_path:
+            # 매핑된 이름대로 디스크 파일명도 한 번에 변경 (답안 인식 이후라 인식 시간에는 영향 없음)
+            background_rename_files_task(subject_name, manifest, dir_path, logger)
         failure_json_filename = os.path.join(APP_ROOT, subject_name, "failure.json")
         with open(failure_json_filename, 'w', encoding='utf-8') as f:
             json.dump(failure_json, f, ensure_ascii=False, indent=4)
 
-        if producer:
-            try:
-                producer.send('low-confidence-images', failure_json)
-                producer.flush()
-            except Exception as kafka_error:
-                logger.error(f"Failure JSON Kafka 전송 실패: {kafka_error}")
+        # 답안지별 결과가 모두 전송된 뒤 failure_json을 보내고, Spring 완료 알림 전에 전송 완료를 기다림
+        kafka_emitter.flush()
+        kafka_emitter.send('low-confidence-images', failure_json)
+        if kafka_emitter.available and not kafka_emitter.flush():
+            logger.error("Failure JSON Kafka 전송 실패 (flush 오류)")
 
         # 작업 완료 상태 업데이트
-        current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": f"완료: {processed_count}/{len(image_files)} 처리됨"}
+        job_store.finish(task_id, "success", f"완료: {processed_count}/{len(image_files)} 처리됨 (재사용 {reused_count}장)")
 
         # Spring에 완료 알림
         send_spring_notification("DONE", subject_name, {
@@ -482,19 +963,38 @@ def background_answer_recognition_task(subject_name, student_id_update_data, ans
             "status": "success",
             "processed_files": processed_count,
             "total_files": len(image_files),
+            "reused_files": reused_count,
             "errors": len(errors)
         }, request_origin)
 
-        logger.info(f"[BG ANSWER TASK - {task_id}] 작업 완료. 처리: {processed_count}/{len(image_files)}, 오류: {len(errors)}")
+        logger.info(f"[BG ANSWER TASK - {task_id}] 작업 완료. 처리: {processed_count}/{len(image_files)} (체크포인트 재사용 {reused_count}장), 오류: {len(errors)}")
+        logger.info(f"[BG ANSWER TASK - {task_id}] 영역 검출 방법별 답안지 수: {dict(detection_counts)}")
+        logger.info(f"[BG ANSWER TASK - {task_id}] Kafka 전송 누적 통계: {kafka_emitter.stats()}")
+        if cascade_counts["tier1_items"]:
+            logger.info(f"[BG ANSWER TASK - {task_id}] 숫자 분류 cascade 통계: {summarize_cascade_stats(cascade_counts)}")
+        if prediction_cache:
+            logger.info(f"[BG ANSWER TASK - {task_id}] 숫자 예측 캐시 통계: {prediction_cache.stats()}")
+            if DIGIT_PREDICTION_CACHE_PERSIST:
+                try:
+                    prediction_cache.save(prediction_cache_path)
+                except OSError as cache_error:
+                    logger.error(f"숫자 예측 캐시 저장 실패 ({prediction_cache_path}): {cache_error}")
 
+        if IMAGE_PREGENERATE_WIDTH > 0:
+            # Spring 완료 알림 이후라 답안 인식 완료 시간에는 영향 없음
+            pregenerate_review_images(subject_path, logger, task_id)
     except Exception as e:
         logger.error(f"[BG ANSWER TASK - {task_id}] 백그라운드 작업 중 예외 발생: {traceback.format_exc()}")
-        current_tasks[subject_name] = {"status": "DONE", "task_id": task_id, "message": f"오류 발생: {str(e)}"}
+        job_store.finish(task_id, "error", f"오류 발생: {str(e)}")
         send_spring_notification("DONE", subject_name, {
             "task_id": task_id,
             "status": "error",
             "message": str(e)
         }, request_origin)
+    finally:
+        if checkpoints is not None:
+            checkpoints.close()
+        close_job_events(task_id)
 
 @app.route('/recognize/answer', methods=['POST'])
 def recognize_answer_endpoint():
@@ -537,25 +1037,37 @@ def recognize_answer_endpoint():
 
         app.logger.info(f"[recognize_answer] 비동기 처리 시작 - subject: {subject_name}")
 
-        # 백그라운드 스레드 시작
+        # 작업 스케줄러 대기열에 등록 (실행은 worker가 순서대로)
         task_id = f"answer-{subject_name}-{uuid.uuid4().hex[:8]}"
-        thread = threading.Thread(
-            target=background_answer_recognition_task,
-            args=(subject_name, student_id_update_data, answer_key_data, app.logger, request_origin),
-            name=f"AnswerRecognition-{task_id}"
-        )
-        thread.start()
-
-        app.logger.info(f"백그라운드 답안 인식 스레드 시작됨: {thread.name}")
+        job_scheduler.ensure_capacity()
+        job_store.create(task_id, "answer", subject_name, "대기 중")
+        job_events.open(task_id)
+        try:
+            job_scheduler.submit(
+                "answer", subject_name, background_answer_recognition_task,
+                subject_name, student_id_update_data, answer_key_data, app.logger, request_origin, task_id,
+                job_id=task_id
+            )
+        except JobQueueFull:
+            job_store.finish(task_id, "error", "대기열 포화로 거절됨")
+            close_job_events(task_id)
+            raise
+
+        queue_position = job_scheduler.positions().get(task_id)
+        app.logger.info(f"백그라운드 답안 인식 작업 대기열 등록: {task_id} (대기 순번 {queue_position})")
 
         # 즉시 응답 반환
         return jsonify({
             "status": "processing_started",
             "message": "Answer recognition process started in background",
             "task_id": task_id,
-            "subject": subject_name
+            "subject": subject_name,
+            "queue_position": queue_position,
+            "events_url": f"/jobs/{task_id}/events"  # SSE 진행 스트림
         }), 202
 
+    except JobQueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         app.logger.error(f"recognize_answer_endpoint 예외 발생: {traceback.format_exc()}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -654,10 +1166,17 @@ def generate_report():
         download_name=f"{secure_filename(subject if subject else 'report')}_report.pdf"
     )
 
-@app.route('/get-student-image', methods=['POST'])
+@app.route('/get-student-image', methods=['GET', 'POST'])
 def get_student_image():
+    """
+    학번의 답안지 이미지. POST는 JSON, GET은 query string으로 같은 값을 받습니다. (GET은 브라우저 캐시/조건부 요청 사용 가능)
+      - subject, student_id: 필수
+      - width: 축소 폭 (IMAGE_DERIVATIVE_WIDTHS 중 요청 이상인 가장 작은 값으로 맞춤). 없으면 원본
+      - format: "webp" | "jpeg" | "auto"(기본, Accept에 image/webp가 있으면 WebP) | "original"
+    ETag/If-None-Match, Range, Cache-Control은 send_file이 처리합니다.
+    """
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
         subject_name = data.get('subject')
         student_id_query = data.get('student_id')
 
@@ -666,6 +1185,14 @@ def get_student_image():
         if not student_id_query:
             return jsonify({"error": "Missing 'student_id' in JSON payload"}), 400
 
+        try:
+            requested_width = parse_requested_width(data.get('width'))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid 'width'"}), 400
+        requested_format = str(data.get('format') or 'auto').lower()
+        if requested_format not in ('auto', 'webp', 'jpeg', 'jpg', 'original'):
+            return jsonify({"error": "Invalid 'format' (webp | jpeg | auto | original)"}), 400
+
         app.logger.info(f"[get-student-image] Request for subject: '{subject_name}', student_id: '{student_id_query}'") # 로깅 수정
 
         # 과목명으로 기본 경로 설정
@@ -676,72 +1203,68 @@ def get_student_image():
             app.logger.error(f"[get-student-image] Subject base path not found: {subject_path}")
             return jsonify({"error": f"Directory for subject '{subject_name_for_path}' not found."}), 404
 
-        # 과목 폴더 내의 하위 디렉토리(압축 해제된 이미지 폴더) 찾기 - 이전 로직 복원
+        # 과목별 학번 -> 이미지 인덱스에서 조회 (폴더가 바뀌었을 때만 다시 만듦)
         try:
-            subdirectories = [d for d in os.listdir(subject_path) 
-                              if os.path.isdir(os.path.join(subject_path, d)) and 
-                              d != 'debug_cropped_images' and not d.startswith('.')]
+            student_image = student_image_index.lookup(subject_path, student_id_query)
         except OSError as e:
-            app.logger.error(f"[get-student-image] Error listing subdirectories in {subject_path}: {e}")
-            return jsonify({"error": f"Could not read subject directory contents for '{subject_name_for_path}'."}), 500
-
-        if len(subdirectories) == 0:
-            app.logger.error(f"[get-student-image] No image data subdirectories found in {subject_path} for subject '{subject_name_for_path}'.")
-            return jsonify({"error": f"No processed image folder found for subject '{subject_name_for_path}'."}), 404
-        elif len(subdirectories) > 1:
-            app.logger.warning(f"[get-student-image] Multiple image data subdirectories found in {subject_path}: {subdirectories}. Using the first one: {subdirectories[0]}")
-            # 또는 필요시 에러 처리:
-            # return jsonify({"error": f"Multiple processed image folders found for subject '{subject_name_for_path}'. Cannot determine target."}), 409
-        
-        target_image_folder_name = subdirectories[0] # 스캔을 통해 찾은 폴더명 사용
-        base_image_path = os.path.join(subject_path, target_image_folder_name)
-        app.logger.info(f"[get-student-image] Target image path: {base_image_path} (determined by scanning)")
-
-        if not os.path.isdir(base_image_path): # 이 검사는 여전히 유효
-            app.logger.error(f"[get-student-image] Determined image folder is not a directory: {base_image_path}")
-            return jsonify({"error": f"Determined image folder '{target_image_folder_name}' for subject '{subject_name_for_path}' is not a valid directory."}), 500
-
-        normalized_student_id_query = unicodedata.normalize('NFC', student_id_query)
-        found_image_path = None
-
+            app.logger.error(f"[get-student-image] Error reading image directory for subject '{subject_name_for_path}': {e}")
+            return jsonify({"error": "Error accessing image files."}), 500
+        if student_image is not None and student_image.member is None and not os.path.isfile(student_image.path):
+            # mtime 해상도보다 짧은 간격으로 바뀐 폴더 대비
+            student_image_index.invalidate(subject_path)
+            student_image = student_image_index.lookup(subject_path, student_id_query)
+
+        if student_image is None:
+            app.logger.warning(f"[get-student-image] Image for student_id '{student_id_query}' not found in {subject_path}")
+            return jsonify({"error": f"Image for student ID '{student_id_query}' not found."}), 404
+
+        # 축소본: width나 변환 format을 요청하면 디스크 캐시의 WebP/JPEG 파일을 보냄 (없으면 만들어 둠)
+        derivative_format = None
+        pinned_derivative = None
+        if requested_format != 'original' and (requested_width or requested_format != 'auto'):
+            derivative_format = choose_derivative_format(requested_format)
+        mimetype = None
         try:
-            for filename_raw in os.listdir(base_image_path):
-                if os.path.isfile(os.path.join(base_image_path, filename_raw)):
-                    filename_nfc = unicodedata.normalize('NFC', filename_raw)
-                    base_name_nfc, ext = os.path.splitext(filename_nfc)
-                    
-                    if '_' in base_name_nfc:
-                        parts = base_name_nfc.split('_')
-                        file_student_id_part = parts[-1]
-                        
-                        if file_student_id_part == normalized_student_id_query:
-                            found_image_path = os.path.join(base_image_path, filename_raw) # 원본 파일명으로 경로 생성
-                            app.logger.info(f"[get-student-image] Found matching image: {found_image_path}")
-                            break 
-            
-            if found_image_path:
-                # 이미지 전송 전 디버깅 로그
-                file_size = os.path.getsize(found_image_path)
-                app.logger.info(f"[get-student-image] Preparing to send image: {found_image_path} (size: {file_size} bytes)")
-                print(f"[DEBUG] Sending image for student_id '{student_id_query}': {found_image_path} ({file_size} bytes)")
-                
-                try:
-                    response = send_file(found_image_path) # mimetype은 send_file이 자동 감지 시도
-                    app.logger.info(f"[get-student-image] Image successfully sent for student_id '{student_id_query}'")
-                    print(f"[DEBUG] Image successfully sent for student_id '{student_id_query}'")
-                    return response
-                except Exception as send_error:
-                    app.logger.error(f"[get-student-image] Error sending image file: {send_error}")
-                    print(f"[DEBUG ERROR] Failed to send image: {send_error}")
-                    return jsonify({"error": f"Failed to send image file: {str(send_error)}"}), 500
+            if derivative_format:
+                width = derivative_cache.snap_width(requested_width or IMAGE_DERIVATIVE_WIDTHS[-1])
+                # 보내는 동안 캐시 정리로 지워지지 않도록 고정하고, 응답이 닫힐 때 풀어 줌
+                found_image_path = derivative_cache.get(
+                    (student_image.path, student_image.member, student_image.size, student_image.mtime),
+                    width, derivative_format, lambda: read_student_image_bytes(student_image), pin=True
+                )
+                pinned_derivative = found_image_path
+                mimetype = FORMAT_MIMETYPES[derivative_format]
+            elif student_image.member is not None:
+                # 아카이브 모드: 검토자가 연 답안지만 ZIP에서 풀어 둠
+                found_image_path = ensure_archive_sheet_extracted(student_image)
             else:
-                app.logger.warning(f"[get-student-image] Image for student_id '{student_id_query}' not found in {base_image_path}")
-                return jsonify({"error": f"Image for student ID '{student_id_query}' not found."}), 404
-
-        except OSError as e:
-            app.logger.error(f"[get-student-image] Error reading image directory {base_image_path}: {e}")
+                found_image_path = student_image.path
+        except (OSError, KeyError) as e:
+            app.logger.error(f"[get-student-image] Error preparing image for student_id '{student_id_query}' ({student_image.path}): {e}")
             return jsonify({"error": "Error accessing image files."}), 500
 
+        # 이미지 전송 전 디버깅 로그
+        app.logger.info(f"[get-student-image] Preparing to send image: {found_image_path} (original size: {student_image.size} bytes)")
+        print(f"[DEBUG] Sending image for student_id '{student_id_query}': {found_image_path} ({student_image.size} bytes)")
+
+        try:
+            # conditional: If-None-Match/If-Modified-Since -> 304, Range -> 206. 파일은 wsgi.file_wrapper로 전송 (서버가 지원하면 sendfile)
+            response = send_file(found_image_path, mimetype=mimetype, conditional=True, etag=True, max_age=IMAGE_CACHE_MAX_AGE)
+            response.cache_control.private = True # 학생 답안지이므로 공유 캐시(프록시/CDN)에는 저장하지 않음
+            if derivative_format and requested_format == 'auto':
+                response.vary.add('Accept')
+            if pinned_derivative:
+                response.call_on_close(lambda: derivative_cache.release(pinned_derivative))
+            app.logger.info(f"[get-student-image] Image successfully sent for student_id '{student_id_query}'")
+            print(f"[DEBUG] Image successfully sent for student_id '{student_id_query}'")
+            return response
+        except Exception as send_error:
+            if pinned_derivative:
+                derivative_cache.release(pinned_derivative)
+            app.logger.error(f"[get-student-image] Error sending image file: {send_error}")
+            print(f"[DEBUG ERROR] Failed to send image: {send_error}")
+            return jsonify({"error": f"Failed to send image file: {str(send_error)}"}), 500
+
     except Exception as e:
         app.logger.error(f"[get-student-image] Unexpected error: {traceback.format_exc()}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
@@ -786,130 +1309,50 @@ def test_spring_notification():
 def hello():
     return "Hello, World", 200
 
-def background_rename_files_task(subject_name, student_list, base_image_path, parent_logger):
+def background_rename_files_task(subject_name, manifest, base_image_path, parent_logger):
+    """
+    학번 매핑 manifest의 이름대로 디스크의 파일명을 한 번에 바꿉니다. (OCR_RENAME_FILES_ON_DISK, 답안 인식이 끝난 뒤 실행)
+    바꾼 파일은 manifest에서 새 파일명을 키로 옮겨, 이후 조회/재실행에서도 같은 답안지 이름/학번을 유지합니다.
+    """
     logger = parent_logger
     task_id = f"rename-{secure_filename(subject_name)}-{uuid.uuid4().hex[:8]}"
-    logger.info(f"[BG RENAME TASK - {task_id}] 작업 시작. Target path: {base_image_path}")
+    logger.info(f"[BG RENAME TASK - {task_id}] 작업 시작. Target path: {base_image_path} ({len(manifest.entries)}건)")
 
-    results = []
     renamed_count = 0
     error_count = 0
     skipped_count = 0
-    known_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-
     try:
-        logger.info(f"[BG RENAME TASK - {task_id}] Attempting to list files in: {base_image_path}")
-        # normalized_to_raw_map: NFC 정규화된 파일명을 key로, 원본(raw) 파일명을 value로 저장
-        normalized_to_raw_map = {}
-        try:
-            for f_raw in os.listdir(base_image_path):
-                if os.path.isfile(os.path.join(base_image_path, f_raw)):
-                    f_normalized_nfc = unicodedata.normalize('NFC', f_raw)
-                    if f_normalized_nfc in normalized_to_raw_map:
-                        logger.warning(f"[BG RENAME TASK - {task_id}] Duplicate NFC name '{f_normalized_nfc}' for raw names '{normalized_to_raw_map[f_normalized_nfc]}' and '{f_raw}'. Using last one.")
-                    normalized_to_raw_map[f_normalized_nfc] = f_raw
-            logger.info(f"[BG RENAME TASK - {task_id}] Raw files mapped. NFC keys: {list(normalized_to_raw_map.keys())}")
-            if not normalized_to_raw_map:
-                 logger.warning(f"[BG RENAME TASK - {task_id}] No files found in {base_image_path}")
-        except OSError as e:
-            logger.error(f"[BG RENAME TASK - {task_id}] Critical Error: Error listing files in {base_image_path}: {e}")
-            results.append({"original_spec": "N/A", "status": "error", "message": f"Failed to list files. Error: {str(e)}"})
-            error_count = len(student_list)
-            logger.error(f"[BG RENAME TASK - {task_id}] 작업 중단. 파일 목록 읽기 실패.")
-            return
-
-        for item in student_list:
-            if not isinstance(item, dict) or 'file_name' not in item:
-                results.append({"original_spec": str(item), "status": "error", "message": "Invalid item format"})
-                error_count += 1
-                continue
-
-            full_corrected_name_spec = unicodedata.normalize('NFC', item['file_name'])
-            parts = full_corrected_name_spec.split('_', 1)
-            if len(parts) < 2:
-                results.append({"original_name_spec": full_corrected_name_spec, "status": "error", "message": "Spec does not contain '_' separator."})
-                error_count += 1
-                continue
-
-            original_file_search_key_raw = parts[0]
-            new_full_filename_nfc = unicodedata.normalize('NFC', parts[1])
-            
-            original_file_search_key_base = original_file_search_key_raw
-            for ext in known_extensions:
-                if original_file_search_key_base.lower().endswith(ext.lower()):
-                    original_file_search_key_base = original_file_search_key_base[:-len(ext)]
-                    break
-            original_file_search_key_base = unicodedata.normalize('NFC', original_file_search_key_base.strip())
-
-            logger.info(f"[BG RENAME TASK - {task_id}] Processing: raw_key_from_spec='{original_file_search_key_raw}', final_search_key_base_nfc='{original_file_search_key_base}', new_name_nfc='{new_full_filename_nfc}'")
-
-            found_files_details = []
-            for nfc_filename_from_dir in normalized_to_raw_map.keys():
-                base_nfc_from_dir, _ = os.path.splitext(nfc_filename_from_dir)
-                base_nfc_from_dir = base_nfc_from_dir.strip()
-
-                logger.debug(f"[BG RENAME TASK - {task_id}] Comparing DIR_base_nfc: '{base_nfc_from_dir}' (contains?) search_key_base_nfc: '{original_file_search_key_base}'")
-                if original_file_search_key_base in base_nfc_from_dir:
-                    raw_filename_matched = normalized_to_raw_map[nfc_filename_from_dir]
-                    found_files_details.append({
-                        "nfc_name": nfc_filename_from_dir, 
-                        "raw_name": raw_filename_matched, 
-                        "base_nfc": base_nfc_from_dir
-                    })
-            
-            logger.info(f"[BG RENAME TASK - {task_id}] For search_key_base_nfc '{original_file_search_key_base}', matched_raw_filenames: {[f['raw_name'] for f in found_files_details]}")
-            
-            if len(found_files_details) == 0:
-                results.append({"search_key": original_file_search_key_base, "new_name": new_full_filename_nfc, "status": "error", "message": "Original file not found containing this key in its base name."})
-                logger.warning(f"[BG RENAME TASK - {task_id}] Original file containing key '{original_file_search_key_base}' in its base name not found in {base_image_path}")
-                error_count += 1
-                continue
-            elif len(found_files_details) > 1:
-                ambiguous_files_log = [{'raw': f['raw_name'], 'nfc': f['nfc_name']} for f in found_files_details]
-                results.append({"search_key": original_file_search_key_base, "new_name": new_full_filename_nfc, "status": "error", "message": f"Multiple files found: {ambiguous_files_log}. Ambiguous."})
-                logger.warning(f"[BG RENAME TASK - {task_id}] Multiple files found for key '{original_file_search_key_base}': {ambiguous_files_log}. Ambiguous, skipping.")
-                error_count += 1
+        for original_name_raw, entry in list(manifest.entries.items()):
+            new_full_filename_nfc = entry["name"]
+            if unicodedata.normalize('NFC', original_name_raw) == new_full_filename_nfc:
+                skipped_count += 1
                 continue
-            
-            old_filename_raw_matched = found_files_details[0]['raw_name']
-            old_file_path_raw = os.path.join(base_image_path, old_filename_raw_matched)
+            old_file_path_raw = os.path.join(base_image_path, original_name_raw)
             new_file_path_nfc = os.path.join(base_image_path, new_full_filename_nfc)
-
-            logger.info(f"[BG RENAME TASK - {task_id}] Attempting to rename RAW path: '{old_file_path_raw}' to NFC path: '{new_file_path_nfc}'")
-
-            if not os.path.exists(old_file_path_raw):
-                logger.error(f"[BG RENAME TASK - {task_id}] CRITICAL: File '{old_file_path_raw}' not found on filesystem right before rename! Skipping.")
-                results.append({"original_name_raw": old_filename_raw_matched, "new_name": new_full_filename_nfc, "status": "error", "message": "File disappeared or raw path mismatch."})
+            if os.path.exists(new_file_path_nfc):
+                logger.warning(f"[BG RENAME TASK - {task_id}] Target already exists, skipping: '{new_file_path_nfc}'")
                 error_count += 1
                 continue
-
-            if unicodedata.normalize('NFC', old_filename_raw_matched) == new_full_filename_nfc:
-                results.append({"original_name_raw": old_filename_raw_matched, "new_name": new_full_filename_nfc, "status": "skipped", "message": "New name is same as old name (after NFC normalization)."})
-                logger.info(f"[BG RENAME TASK - {task_id}] Skipped renaming '{old_filename_raw_matched}' as new name '{new_full_filename_nfc}' is effectively identical.")
-                skipped_count += 1
-                continue
-
             try:
                 os.rename(old_file_path_raw, new_file_path_nfc)
-                results.append({"original_name_raw": old_filename_raw_matched, "new_name": new_full_filename_nfc, "status": "renamed"})
-                logger.info(f"[BG RENAME TASK - {task_id}] Successfully renamed: '{old_file_path_raw}' -> '{new_file_path_nfc}'")
-                renamed_count+=1
             except OSError as e:
-                results.append({"original_name_raw": old_filename_raw_matched, "new_name": new_full_filename_nfc, "status": "error", "message": f"OS error during rename: {str(e)}"})
-                logger.error(f"[BG RENAME TASK - {task_id}] Error renaming RAW_PATH:'{old_file_path_raw}' to NFC_PATH:'{new_file_path_nfc}': {e}. Matched via NFC name: '{found_files_details[0]['nfc_name']}'")
+                logger.error(f"[BG RENAME TASK - {task_id}] Error renaming RAW_PATH:'{old_file_path_raw}' to NFC_PATH:'{new_file_path_nfc}': {e}")
                 error_count += 1
-        
+                continue
+            manifest.entries[new_full_filename_nfc] = manifest.entries.pop(original_name_raw)
+            renamed_count += 1
+        manifest.save()
         logger.info(f"[BG RENAME TASK - {task_id}] 파일명 변경 처리 완료. 성공: {renamed_count}, 실패: {error_count}, 스킵: {skipped_count}")
 
     except Exception as e:
         logger.error(f"[BG RENAME TASK - {task_id}] 백그라운드 작업 중 전역 예외 발생: {traceback.format_exc()}")
-
-# 간단한 작업 상태 추적
-current_tasks = {}  # {"subject": {"status": "pending|processing|DONE", "task_id": "xxx"}}
+    finally:
+        # 파일명이 바뀌었으므로 학번 -> 이미지 인덱스를 바로 버림 (폴더 mtime 해상도와 무관하게)
+        student_image_index.invalidate(os.path.dirname(base_image_path))
 
 @app.route('/get-status', methods=['POST'])
 def get_status():
-    """Spring에서 작업 상태를 조회하는 엔드포인트"""
+    """Spring에서 작업 상태를 조회하는 엔드포인트 (과목의 가장 최근 답안 인식 작업)"""
     try:
         data = request.get_json()
         subject = data.get('subject')
@@ -918,24 +1361,94 @@ def get_status():
             return jsonify({"error": "subject가 필요합니다"}), 400
         
         # 해당 과목의 현재 작업 상태 확인
-        if subject in current_tasks:
-            task_info = current_tasks[subject]
-            return jsonify({
-                "subject": subject,
-                "status": task_info["status"],  # "pending" 또는 "processing" 또는 "DONE"
-                "task_id": task_info.get("task_id"),
-                "message": task_info.get("message", "")
-            }), 200
-        else:
+        job = job_store.latest_for_subject(subject, kind="answer")
+        if job is None:
             return jsonify({
                 "subject": subject,
                 "status": "not_found",
                 "message": "해당 과목의 작업이 없습니다"
             }), 404
+
+        return jsonify({
+            "subject": subject,
+            "status": job["status"],  # "pending" 또는 "processing" 또는 "DONE"
+            "task_id": job["job_id"],
+            "message": job["message"] or "",
+            "result": job["result"],  # "success" | "error" | "interrupted" (DONE일 때)
+            "phase": job["phase"],
+            "processed": job["processed"],
+            "total": job["total"],
+            "phase_timings": job["phase_timings"],  # 단계별 소요 시간(초)
+            "sheets_per_second": job["sheets_per_second"],
+            "eta_seconds": job["eta_seconds"],
+            "elapsed_seconds": job["elapsed_seconds"],
+            "queue_position": job_scheduler.positions().get(job["job_id"])  # 대기 순번 (1부터), 실행 중이면 0
+        }), 200
             
     except Exception as e:
         return jsonify({"error": f"상태 조회 실패: {str(e)}"}), 500
 
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """실행 중/지난 작업 목록. ?active=1 이면 대기/실행 중인 작업만, ?subject=, ?limit= (기본 50)"""
+    try:
+        active_only = request.args.get('active', '').lower() in ('1', 'true', 'yes')
+        subject = request.args.get('subject')
+        limit = min(500, max(1, int(request.args.get('limit', 50))))
+        positions = job_scheduler.positions()
+        jobs = job_store.list_jobs(active_only=active_only, subject=subject, limit=limit)
+        for job in jobs:
+            job["queue_position"] = positions.get(job["job_id"])
+        return jsonify({"jobs": jobs, "scheduler": job_scheduler.stats(), "kafka": kafka_emitter.stats()}), 200
+    except ValueError:
+        return jsonify({"error": "limit은 정수여야 합니다"}), 400
+    except Exception as e:
+        return jsonify({"error": f"작업 목록 조회 실패: {str(e)}"}), 500
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    작업 이벤트 스트림 (SSE, text/event-stream)
+      - sheet:    답안지 한 장 처리 완료 (답안 요약)
+      - progress: JOB_EVENT_PROGRESS_INTERVAL초마다 진행률/처리 속도/ETA
+      - done:     작업 종료 (마지막 상태). 이후 스트림을 닫습니다.
+    재연결 시 Last-Event-ID 헤더(또는 ?last_event_id=)를 주면 그 이후 sheet 이벤트부터 다시 보냅니다.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "해당 작업이 없습니다", "task_id": job_id}), 404
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_id = 0
+
+    def generate():
+        event_cursor = last_id
+        yield f"retry: {int(JOB_EVENT_PROGRESS_INTERVAL * 1000)}\n\n"
+        if not job_events.has_job(job_id):
+            # 서버 재시작 전 작업 등 이벤트가 남아 있지 않은 작업: 마지막 상태만 보내고 종료
+            yield format_sse("done", job_progress_data(job))
+            return
+        next_progress_at = time.monotonic()
+        while True:
+            events, closed = job_events.wait_events(job_id, event_cursor, max(0.0, next_progress_at - time.monotonic()))
+            for event_id, event, data in events:
+                event_cursor = event_id
+                yield format_sse(event, data, event_id)
+            if closed:
+                return
+            if time.monotonic() >= next_progress_at:
+                next_progress_at = time.monotonic() + JOB_EVENT_PROGRESS_INTERVAL
+                current_job = job_store.get(job_id)
+                if current_job:
+                    yield format_sse("progress", job_progress_data(current_job))
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # 프록시(nginx) 버퍼링 방지
+    )
+
 if __name__ == '__main__':
     # Spring과의 통신을 위해 0.0.0.0으로 호스트를 설정하고, 지정된 포트(예: 8080)를 사용합니다.
     # Docker 환경에서는 이 포트가 외부로 노출됩니다.
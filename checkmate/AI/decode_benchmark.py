@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+답안지 디코딩 속도/메모리 테스트: 전체 해상도 디코딩 vs 축소 디코딩
+
+사용법: python decode_benchmark.py <답안지 이미지 폴더> [최대 장수]
+각 방식은 별도 프로세스에서 실행하여, 답안지당 평균 디코딩 시간과 최대 RSS 증가량을 비교합니다.
+  - pil_full:       기존 방식 (PIL로 전체 해상도 RGB 디코딩)
+  - cv2_full:       NUMPY_REGION_PIPELINE (전체 해상도 BGR 디코딩 + 흑백 변환)
+  - reduced_gray:   YOLO_REDUCED_DECODE (검출용 축소 BGR + 전체 해상도 흑백만 디코딩)
+"""
+
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from answer_recognition.preprocessing.sheet_image import (
+    load_sheet_image, read_sheet_bytes, decode_reduced_color, decode_gray
+)
+
+YOLO_DECODE_MIN_SIDE = 1280 # answer_recognition/config.py와 같은 값 (config를 import하면 모델까지 로드되므로 따로 둠)
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+
+
+def decode_pil_full(image_path):
+    image = Image.open(image_path).convert("RGB")
+    return image.size
+
+
+def decode_cv2_full(image_path):
+    sheet_bgr, sheet_gray = load_sheet_image(image_path)
+    return sheet_gray.shape
+
+
+def decode_reduced_gray(image_path):
+    buffer = read_sheet_bytes(image_path)
+    sheet_bgr = decode_reduced_color(buffer, YOLO_DECODE_MIN_SIDE)
+    sheet_gray = decode_gray(buffer)
+    return sheet_bgr.shape, sheet_gray.shape
+
+
+STRATEGIES = {
+    "pil_full": decode_pil_full,
+    "cv2_full": decode_cv2_full,
+    "reduced_gray": decode_reduced_gray,
+}
+
+
+def max_rss_mb():
+    # Linux의 ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_strategy(name, image_paths, queue):
+    """한 방식으로 모든 답안지를 디코딩 (새 프로세스에서 실행)"""
+    decode = STRATEGIES[name]
+    decode(image_paths[0]) # 라이브러리 초기화 비용 제외
+    rss_before = max_rss_mb()
+    start_time = time.time()
+    for image_path in image_paths:
+        decode(image_path)
+    total_time = time.time() - start_time
+    queue.put((total_time, max_rss_mb() - rss_before, decode(image_paths[0])))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    image_paths = sorted(str(p) for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    if not image_paths:
+        print(f"이미지가 없습니다: {sys.argv[1]}")
+        return
+    print(f"답안지 {len(image_paths)}장, YOLO_DECODE_MIN_SIDE={YOLO_DECODE_MIN_SIDE}")
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in STRATEGIES:
+        queue = context.Queue()
+        process = context.Process(target=run_strategy, args=(name, image_paths, queue))
+        process.start()
+        total_time, rss_delta, shape = queue.get()
+        process.join()
+        results[name] = total_time
+        print(f"\n=== {name} ===")
+        print(f"디코딩 크기: {shape}")
+        print(f"총 소요 시간: {total_time:.4f}초")
+        print(f"답안지당 평균 시간: {total_time / len(image_paths) * 1000:.1f}ms")
+        print(f"최대 RSS 증가량: {rss_delta:.1f}MB")
+
+    baseline = results["pil_full"]
+    print("\n=== 요약 (pil_full 대비) ===")
+    for name, total_time in results.items():
+        print(f"{name}: {baseline / total_time:.2f}배")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+숫자 분류 cascade 비교: transformer 분류기 vs tiny 모델(HOG + softmax) 1단계
+
+사용법: python digit_cascade_benchmark.py <답안지 이미지 폴더> [정답 키 JSON] [최대 장수]
+digit_preprocess_benchmark.py와 같은 방법으로 실제 답안지의 digit crop(PIL, 이진 마스크)을 모은 뒤,
+transformer 결과(현재 DIGIT_PREPROCESS_FAST_PATH 설정의 경로)를 기준으로 tiny 모델을 비교합니다.
+임계값마다:
+  - 통과율: tiny 신뢰도가 임계값 이상이라 transformer로 보내지 않는 crop 비율
+  - 통과 crop 일치율: 통과한 crop 중 tiny label이 transformer label과 같은 비율
+  - label 변경: transformer가 확신한(>= CONFIDENCE_THRESHOLD) crop인데 tiny가 다른 label로 통과시킨 수 (채점 결과가 바뀜)
+  - '?' 대체: transformer가 확신하지 못해 '?'였던 crop을 tiny가 label로 통과시킨 수
+  - 속도: cascade 전체(tiny + 남은 crop의 transformer)의 crop당 평균 시간
+DIGIT_CASCADE_ENABLED를 켜기 전에 DIGIT_CASCADE_THRESHOLD에서 label 변경이 0에 가까운지 확인하세요.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from digit_preprocess_benchmark import collect_digit_crops
+from answer_recognition.config import DIGIT_PREPROCESS_FAST_PATH, DIGIT_CASCADE_THRESHOLD, TINY_DIGIT_MODEL_PATH
+from answer_recognition.recognition.digit_cascade import TinyDigitClassifier
+from answer_recognition.recognition.digit_recognizer import _predict_digit_images_direct, _predict_digit_masks_direct
+
+CONFIDENCE_THRESHOLD = 0.85  # main.py의 digit 신뢰도 임계값
+CASCADE_THRESHOLDS = sorted({0.9, 0.95, 0.97, 0.99, DIGIT_CASCADE_THRESHOLD})
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+DEFAULT_ANSWER_KEY = Path(__file__).resolve().parent / 'answer_recognition' / 'answer_key.json'
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    answer_key_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ANSWER_KEY
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    with open(answer_key_path, 'r', encoding='utf-8') as f:
+        answer_key_data = json.load(f)
+    tail_question_counts = Counter(str(q["question_number"]) for q in answer_key_data.get("questions", []))
+
+    image_paths = sorted(str(p) for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    if not image_paths:
+        print(f"이미지가 없습니다: {sys.argv[1]}")
+        return
+
+    digit_images, digit_masks = [], []
+    for image_path in image_paths:
+        images, masks = collect_digit_crops(image_path, answer_key_data, dict(tail_question_counts))
+        digit_images.extend(images)
+        digit_masks.extend(masks)
+    print(f"답안지 {len(image_paths)}장, digit crop {len(digit_images)}개, tiny 모델 {TINY_DIGIT_MODEL_PATH}")
+    if not digit_images or len(digit_images) != len(digit_masks):
+        return
+
+    start_time = time.time()
+    if DIGIT_PREPROCESS_FAST_PATH:
+        transformer = _predict_digit_masks_direct(digit_masks)
+    else:
+        transformer = _predict_digit_images_direct(digit_images)
+    transformer_time = time.time() - start_time
+    start_time = time.time()
+    tiny = TinyDigitClassifier.load(TINY_DIGIT_MODEL_PATH).predict_masks(digit_masks)
+    tiny_time = time.time() - start_time
+    per_transformer_crop = transformer_time / len(digit_images)
+
+    print("\n=== 속도 (crop당 평균) ===")
+    print(f"transformer: {per_transformer_crop * 1000:.3f}ms")
+    print(f"tiny:        {tiny_time / len(digit_images) * 1000:.3f}ms")
+
+    total = len(digit_images)
+    print(f"\n=== 임계값별 비교 (transformer 기준, 확신 기준 {CONFIDENCE_THRESHOLD}) ===")
+    for threshold in CASCADE_THRESHOLDS:
+        accepted = [(t, f) for t, f in zip(transformer, tiny) if f[1] >= threshold]
+        same = sum(t[0] == f[0] for t, f in accepted)
+        changed = Counter((t[0], f[0]) for t, f in accepted if t[1] >= CONFIDENCE_THRESHOLD and t[0] != f[0])
+        filled = sum(t[1] < CONFIDENCE_THRESHOLD for t, f in accepted)
+        # cascade 시간 추정: tiny 전체 + 통과하지 못한 crop의 transformer
+        cascade_time = tiny_time + per_transformer_crop * (total - len(accepted))
+        marker = " (현재 설정)" if threshold == DIGIT_CASCADE_THRESHOLD else ""
+        print(f"\n임계값 {threshold}{marker}")
+        print(f"  통과율:           {len(accepted)}/{total} ({len(accepted) / total:.4f})")
+        if accepted:
+            print(f"  통과 crop 일치율: {same}/{len(accepted)} ({same / len(accepted):.4f})")
+        print(f"  label 변경:       {sum(changed.values())}개")
+        print(f"  '?' 대체:         {filled}개")
+        print(f"  cascade 속도:     {cascade_time / total * 1000:.3f}ms (transformer만 {per_transformer_crop * 1000:.3f}ms)")
+        for (transformer_label, tiny_label), count in changed.most_common(5):
+            print(f"    {transformer_label} -> {tiny_label}: {count}개")
+
+
+if __name__ == "__main__":
+    main()
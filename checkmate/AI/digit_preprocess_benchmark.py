@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+숫자 분류기 입력 전처리 비교: 기존 경로(PIL crop + HF image processor) vs fast path(이진 마스크 numpy 정규화)
+
+사용법: python digit_preprocess_benchmark.py <답안지 이미지 폴더> [정답 키 JSON] [최대 장수]
+답안지마다 preprocess_answer_sheet/recognize_answer_sheet_data를 그대로 실행해 실제 digit crop(PIL, 이진 마스크)을 모은 뒤,
+같은 crop을 두 경로로 분류합니다. (파일명에 8자리 학번이 있어야 숫자 인식 단계까지 진행됩니다)
+  - 일치율: 두 경로의 label이 같은 crop 비율, 기존 경로가 확신한(>= CONFIDENCE_THRESHOLD) crop 중 일치 비율
+  - 신뢰도: 각 경로에서 CONFIDENCE_THRESHOLD 이상인 crop 비율 (미만이면 main.py에서 '?'로 처리됨)
+  - 속도: crop당 평균 분류 시간
+DIGIT_PREPROCESS_FAST_PATH를 켜기 전에 일치율과 불일치 label 쌍을 확인하세요.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from answer_recognition import main as recognition_main
+from answer_recognition.main import preprocess_answer_sheet, recognize_answer_sheet_data
+from answer_recognition.recognition.digit_recognizer import _predict_digit_images_direct, _predict_digit_masks_direct
+
+CONFIDENCE_THRESHOLD = 0.85  # main.py의 digit 신뢰도 임계값
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+DEFAULT_ANSWER_KEY = Path(__file__).resolve().parent / 'answer_recognition' / 'answer_key.json'
+
+
+def collect_digit_crops(image_path, answer_key_data, tail_question_counts):
+    """답안지 한 장의 digit crop (PIL 이미지 리스트, 이진 마스크 리스트). 인식 단계의 배치 호출 입력을 그대로 가로챔"""
+    captured = ([], [])
+
+    def capture(digit_images, digit_masks=None, *args, **kwargs):
+        captured[0].extend(digit_images)
+        captured[1].extend(digit_masks or [])
+        return _predict_digit_images_direct(digit_images)
+
+    crops = preprocess_answer_sheet(image_path, answer_key_data)
+    if not crops:
+        return captured
+    original = recognition_main.recognize_digit_images_batch
+    recognition_main.recognize_digit_images_batch = capture
+    try:
+        recognize_answer_sheet_data(crops, answer_key_data, tail_question_counts)
+    finally:
+        recognition_main.recognize_digit_images_batch = original
+    return captured
+
+
+def time_classifier(classifier, items):
+    start_time = time.time()
+    predictions = classifier(items)
+    return time.time() - start_time, predictions
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    answer_key_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ANSWER_KEY
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    with open(answer_key_path, 'r', encoding='utf-8') as f:
+        answer_key_data = json.load(f)
+    tail_question_counts = Counter(str(q["question_number"]) for q in answer_key_data.get("questions", []))
+
+    image_paths = sorted(str(p) for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    if not image_paths:
+        print(f"이미지가 없습니다: {sys.argv[1]}")
+        return
+
+    digit_images, digit_masks = [], []
+    for image_path in image_paths:
+        images, masks = collect_digit_crops(image_path, answer_key_data, dict(tail_question_counts))
+        digit_images.extend(images)
+        digit_masks.extend(masks)
+    print(f"답안지 {len(image_paths)}장, digit crop {len(digit_images)}개")
+    if not digit_images or len(digit_images) != len(digit_masks):
+        return
+
+    baseline_time, baseline = time_classifier(_predict_digit_images_direct, digit_images)
+    fast_time, fast = time_classifier(_predict_digit_masks_direct, digit_masks)
+
+    same = sum(b[0] == f[0] for b, f in zip(baseline, fast))
+    confident = [(b, f) for b, f in zip(baseline, fast) if b[1] >= CONFIDENCE_THRESHOLD]
+    confident_same = sum(b[0] == f[0] for b, f in confident)
+    disagreements = Counter((b[0], f[0]) for b, f in zip(baseline, fast) if b[0] != f[0])
+
+    print("\n=== 속도 (crop당 평균) ===")
+    print(f"기존(PIL + processor): {baseline_time / len(digit_images) * 1000:.3f}ms")
+    print(f"fast path:             {fast_time / len(digit_images) * 1000:.3f}ms")
+
+    print("\n=== 일치율 (기존 경로 기준) ===")
+    print(f"label 일치:              {same}/{len(baseline)} ({same / len(baseline):.4f})")
+    if confident:
+        print(f"기존 확신 crop 중 일치:  {confident_same}/{len(confident)} ({confident_same / len(confident):.4f})")
+    print(f"신뢰도 >= {CONFIDENCE_THRESHOLD}: 기존 {sum(b[1] >= CONFIDENCE_THRESHOLD for b in baseline)}개, "
+          f"fast path {sum(f[1] >= CONFIDENCE_THRESHOLD for f in fast)}개")
+    if disagreements:
+        print("불일치 label 쌍 (기존 -> fast path):")
+        for (baseline_label, fast_label), count in disagreements.most_common(10):
+            print(f"  {baseline_label} -> {fast_label}: {count}개")
+
+
+if __name__ == "__main__":
+    main()
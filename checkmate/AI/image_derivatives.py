@@ -0,0 +1,207 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps, features
+
+# 검토 화면용 답안지 축소본(derivative) 디스크 캐시.
+# 원본 스캔 대신 요청한 폭으로 줄인 WebP/JPEG 파일을 한 번 만들어 두고 이후 요청은 그 파일을 그대로 보냅니다. (send_file의 ETag/Range 처리)
+# 캐시 키는 원본 식별자(경로/ZIP 항목, 크기, mtime)와 폭/형식이므로 원본이 바뀌면 새 파일을 만들고, 이전 파일은 max_bytes를 넘을 때 오래 쓰지 않은 것부터 지웁니다.
+# 요청 폭은 widths 중 요청 이상인 가장 작은 값으로 맞춰(캐시 파일 종류 제한), 원본보다 크게 늘리지는 않습니다.
+
+FORMAT_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+FORMAT_MIMETYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def webp_supported() -> bool:
+    return bool(features.check('webp'))
+
+
+class DerivativeCache:
+    """
+    Args:
+        root: 축소본을 저장할 폴더
+        widths: 허용하는 축소 폭 (요청 폭을 이 중 하나로 맞춤)
+        quality: WebP/JPEG 품질
+        max_bytes: 캐시 폴더 크기 상한 (넘으면 오래 쓰지 않은 파일부터 삭제, 0이면 제한 없음)
+        logger: 생성/정리 로그용 (app.logger)
+
+    사용 순서는 메모리의 LRU(경로 -> 크기)로 관리합니다. (atime은 relatime/noatime 마운트에서 의미가 없고,
+    mtime을 갱신하면 send_file의 ETag/Last-Modified가 바뀜) 폴더는 시작할 때 한 번만 훑어 mtime 순으로 채웁니다.
+    get(pin=True)로 받은 파일은 release()할 때까지 삭제하지 않습니다. (응답을 보내는 중인 파일)
+    """
+
+    def __init__(self, root: str, widths: Sequence[int] = (480, 960, 1600), quality: int = 80,
+                 max_bytes: int = 2 * 1024 ** 3, logger: Any = None):
+        self.root = root
+        self.widths = tuple(sorted(int(width) for width in widths if int(width) > 0))
+        self.quality = int(quality)
+        self.max_bytes = int(max_bytes)
+        self.logger = logger
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict() # 경로 -> 크기 (앞쪽이 오래 쓰지 않은 파일)
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {} # 보내는 중인 파일 -> 요청 수
+        self._generated = 0
+        self._hits = 0
+        self._evicted = 0
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def snap_width(self, width: int) -> int:
+        """요청 폭 -> 허용 폭 (요청 이상인 가장 작은 값, 없으면 가장 큰 값)"""
+        for allowed in self.widths:
+            if allowed >= width:
+                return allowed
+        return self.widths[-1]
+
+    def get(self, source_key: Tuple[Any, ...], width: int, fmt: str, read_source: Callable[[], bytes], pin: bool = False) -> str:
+        """
+        축소본 파일 경로. 없으면 read_source()의 원본 바이트로 만들어 저장합니다.
+        Args:
+            source_key: 원본 식별자 (경로/ZIP 항목, 크기, mtime 등. 원본이 바뀌면 달라져야 함)
+            width: snap_width로 맞춘 폭
+            fmt: "webp" | "jpeg"
+            pin: True면 release(path)를 호출할 때까지 정리 대상에서 제외 (응답 전송용)
+        """
+        digest = hashlib.blake2b(repr(source_key).encode('utf-8'), digest_size=16).hexdigest()
+        path = os.path.join(self.root, digest[:2], f"{digest}_w{width}{FORMAT_EXTENSIONS[fmt]}")
+        if self._use_existing(path, pin):
+            with self._lock:
+                self._hits += 1
+            return path
+
+        # 같은 축소본을 동시에 요청하면 한 번만 만듦
+        with self._lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        try:
+            with lock:
+                if not self._use_existing(path, pin):
+                    self._generate(read_source(), width, fmt, path)
+                    with self._lock:
+                        self._generated += 1
+                    self._add(path, os.path.getsize(path), pin)
+        finally:
+            with self._lock:
+                self._locks.pop(path, None)
+        self._evict(keep=path)
+        return path
+
+    def release(self, path: str) -> None:
+        """get(pin=True)로 받은 파일의 전송이 끝났을 때 호출합니다."""
+        with self._lock:
+            count = self._pins.get(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+            else:
+                self._pins.pop(path, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "generated": self._generated, "hits": self._hits, "evicted": self._evicted,
+                "files": len(self._entries), "bytes": self._total_bytes
+            }
+
+    # --- 내부 ---
+    def _scan(self) -> None:
+        """시작 시 한 번: 디스크에 남아 있는 축소본을 mtime 순으로 LRU에 넣음"""
+        files = []
+        for dir_path, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                file_path = os.path.join(dir_path, filename)
+                if filename.endswith('.tmp'):
+                    continue
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, file_path, stat.st_size))
+        for _, file_path, size in sorted(files):
+            self._entries[file_path] = size
+            self._total_bytes += size
+
+    def _use_existing(self, path: str, pin: bool) -> bool:
+        """path가 있으면 LRU 맨 뒤로 옮기고(pin이면 고정) True"""
+        with self._lock:
+            if path in self._entries:
+                if os.path.exists(path):
+                    self._entries.move_to_end(path)
+                    if pin:
+                        self._pins[path] = self._pins.get(path, 0) + 1
+                    return True
+                self._total_bytes -= self._entries.pop(path) # 밖에서 지워진 파일
+        try:
+            size = os.path.getsize(path) # 다른 프로세스가 만든 파일
+        except OSError:
+            return False
+        self._add(path, size, pin)
+        return True
+
+    def _add(self, path: str, size: int, pin: bool) -> None:
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            if pin:
+                self._pins[path] = self._pins.get(path, 0) + 1
+
+    def _generate(self, source_bytes: bytes, width: int, fmt: str, path: str) -> None:
+        with Image.open(io.BytesIO(source_bytes)) as image:
+            # JPEG은 디코딩 단계에서 (회전 후) 폭이 width 이상으로 남는 배율까지 먼저 축소 (DCT scaling)
+            swaps_axes = image.getexif().get(EXIF_ORIENTATION_TAG) in (5, 6, 7, 8)
+            image.draft("RGB", (1, width) if swaps_axes else (width, 1))
+            # 원본을 그대로 보낼 때 브라우저가 EXIF 방향대로 회전해 보여 주므로 축소본도 같은 방향으로 저장
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            if fmt == "webp":
+                image.save(tmp_path, "WEBP", quality=self.quality, method=4)
+            else:
+                image.save(tmp_path, "JPEG", quality=self.quality, optimize=True, progressive=True)
+        os.replace(tmp_path, path)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """
+        상한을 넘으면 오래 쓰지 않은 파일부터 상한의 90%까지 한 번에 지웁니다. (매 요청마다 정리하지 않도록)
+        keep(방금 만든 파일)과 보내는 중인 파일은 건너뜁니다.
+        """
+        if self.max_bytes <= 0:
+            return
+        victims = []
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            for path in list(self._entries):
+                if self._total_bytes <= self.max_bytes * 0.9:
+                    break
+                if path == keep or path in self._pins or path in self._locks:
+                    continue
+                self._total_bytes -= self._entries.pop(path)
+                victims.append(path)
+            self._evicted += len(victims)
+            total = self._total_bytes
+        for path in victims:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if self.logger:
+            self.logger.info(f"[DerivativeCache] 캐시 정리: {len(victims)}개 삭제 (현재 {total} bytes)")
+
+
+def parse_requested_width(value: Optional[Any]) -> Optional[int]:
+    """요청의 width 값 -> 양의 정수 또는 None (없거나 0). 잘못된 값이면 ValueError"""
+    if value in (None, "", 0, "0"):
+        return None
+    width = int(value)
+    if width < 0:
+        raise ValueError("width must be positive")
+    return width
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# 작업별 이벤트(답안지 결과, 단계 변경, 완료)를 모아 두었다가 구독자(SSE 스트림)에게 전달하는 브로커.
+# 이벤트는 작업마다 최근 history개까지 보관하므로, 늦게 연결하거나 끊겼다가 다시 연결한(Last-Event-ID) 구독자도
+# 놓친 이벤트부터 받을 수 있습니다. 끝난 작업의 이벤트는 retention초 뒤에 지웁니다.
+
+
+class JobEventBroker:
+    """
+    Args:
+        history: 작업당 보관할 최근 이벤트 수
+        retention: 끝난 작업의 이벤트를 보관하는 시간(초)
+    """
+
+    def __init__(self, history: int = 2000, retention: float = 600.0):
+        self.history = max(1, int(history))
+        self.retention = retention
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+
+    # --- 발행 (작업 스레드) ---
+    def open(self, job_id: str) -> None:
+        """작업 등록 시 호출. 실행 전(대기 중)에 연결한 구독자도 이벤트를 기다릴 수 있게 합니다."""
+        with self._condition:
+            self._job_locked(job_id)
+            self._expire_locked()
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]) -> int:
+        """이벤트를 추가하고 이벤트 번호(작업 내 1부터 증가)를 반환합니다."""
+        with self._condition:
+            job = self._job_locked(job_id)
+            job["next_id"] += 1
+            job["events"].append((job["next_id"], event, data))
+            self._condition.notify_all()
+            return job["next_id"]
+
+    def close(self, job_id: str, data: Dict[str, Any]) -> None:
+        """"done" 이벤트를 발행하고 작업 스트림을 닫습니다."""
+        with self._condition:
+            job = self._job_locked(job_id)
+            job["next_id"] += 1
+            job["events"].append((job["next_id"], "done", data))
+            job["closed_at"] = time.time()
+            self._condition.notify_all()
+            self._expire_locked()
+
+    # --- 구독 (요청 스레드) ---
+    def has_job(self, job_id: str) -> bool:
+        with self._condition:
+            return job_id in self._jobs
+
+    def wait_events(self, job_id: str, last_id: int, timeout: float) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """
+        last_id 이후의 이벤트를 반환합니다. 없으면 새 이벤트가 오거나 timeout초가 지날 때까지 기다립니다.
+        Returns:
+            (events, closed): events는 (id, event, data) 리스트, closed는 작업 스트림이 닫혔는지 여부
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return [], True
+                events = [item for item in job["events"] if item[0] > last_id]
+                closed = job["closed_at"] is not None
+                remaining = deadline - time.monotonic()
+                if events or closed or remaining <= 0:
+                    return events, closed
+                self._condition.wait(remaining)
+
+    # --- 내부 ---
+    def _job_locked(self, job_id: str) -> Dict[str, Any]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = {"events": deque(maxlen=self.history), "next_id": 0, "closed_at": None}
+            self._jobs[job_id] = job
+        return job
+
+    def _expire_locked(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["closed_at"] is not None and now - job["closed_at"] > self.retention
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """SSE 메시지 한 개 (id, event, data 필드 + 빈 줄)"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
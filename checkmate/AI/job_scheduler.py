@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# 백그라운드 작업(학번 인식, 답안 인식)을 고정된 수의 worker 스레드와 길이가 제한된 대기열로 실행하는 스케줄러.
+# 요청마다 스레드를 새로 만들지 않으므로, 마감 시간대에 업로드가 몰려도 동시에 모델/메모리를 쓰는 작업 수가 worker 수로 제한됩니다.
+# 대기열이 가득 차면 submit이 JobQueueFull(retry_after)을 던지고, app.py는 429 + Retry-After로 응답합니다.
+
+
+class JobQueueFull(Exception):
+    """대기열이 가득 참. retry_after: 대기열 자리가 날 때까지의 예상 시간(초)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full. Retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Args:
+        workers: 동시에 실행할 작업 수 (worker 스레드 수)
+        max_queue: 실행을 기다릴 수 있는 최대 작업 수 (실행 중인 작업 제외)
+        default_duration: 완료된 작업이 없을 때 사용하는 작업당 예상 시간(초). 이후에는 종류(kind)별 이동 평균 사용
+        logger: 작업 시작/실패 로그용 (app.logger)
+    """
+
+    def __init__(self, workers: int, max_queue: int, default_duration: float = 60.0, logger: Any = None):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.default_duration = default_duration
+        self.logger = logger
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._durations: Dict[str, float] = {} # kind -> 작업 시간 이동 평균(초)
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    # --- 제출 ---
+    def submit(self, kind: str, key: str, fn: Callable[..., Any], *args: Any, job_id: Optional[str] = None) -> str:
+        """
+        작업을 대기열에 넣고 job_id를 반환합니다. 대기열이 가득 차면 JobQueueFull을 던집니다.
+        key는 로그에 남기는 작업 식별자입니다. (보통 과목명) 상태 조회는 job_id로 positions()를 사용
+        """
+        job = {"job_id": job_id or uuid.uuid4().hex, "kind": kind, "key": key, "fn": fn, "args": args, "submitted_at": time.time()}
+        with self._condition:
+            if self._is_full_locked():
+                raise JobQueueFull(self._retry_after_locked())
+            self._queue.append(job)
+            self._start_workers_locked()
+            self._condition.notify()
+        return job["job_id"]
+
+    def ensure_capacity(self) -> None:
+        """파일 저장처럼 비용이 큰 준비 작업 전에 호출. 대기열이 가득 차 있으면 JobQueueFull을 던집니다."""
+        with self._condition:
+            if self._is_full_locked():
+                raise JobQueueFull(self._retry_after_locked())
+
+    # --- 상태 조회 ---
+    def positions(self) -> Dict[str, int]:
+        """job_id -> 위치 (대기 중이면 1부터 시작하는 순번, 실행 중이면 0)"""
+        with self._condition:
+            positions = {job_id: 0 for job_id in self._running}
+            positions.update({job["job_id"]: position for position, job in enumerate(self._queue, start=1)})
+            return positions
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "average_durations": dict(self._durations)
+            }
+
+    # --- 내부 ---
+    def _is_full_locked(self) -> bool:
+        # 실행 중(최대 workers개) + 대기 중(최대 max_queue개)
+        return len(self._queue) + len(self._running) >= self.workers + self.max_queue
+
+    def _estimated_duration(self, kind: str) -> float:
+        return self._durations.get(kind, self.default_duration)
+
+    def _retry_after_locked(self) -> int:
+        # 대기열 자리는 실행 중인 작업 하나가 끝나 맨 앞 작업이 실행될 때 생기므로, 가장 먼저 끝날 것으로 예상되는 작업의 남은 시간
+        now = time.time()
+        remaining = [
+            max(0.0, self._estimated_duration(job["kind"]) - (now - job["started_at"]))
+            for job in self._running.values()
+        ]
+        if remaining and min(remaining) > 0:
+            estimate = min(remaining)
+        else:
+            # 예상 시간을 넘긴 작업만 있으면 평균 작업 시간을 worker 수로 나눈 값
+            kinds = [job["kind"] for job in self._queue] or [job["kind"] for job in self._running.values()]
+            estimate = sum(self._estimated_duration(kind) for kind in kinds) / max(1, len(kinds)) / self.workers
+        return max(1, int(math.ceil(estimate)))
+
+    def _start_workers_locked(self) -> None:
+        # worker 스레드는 첫 submit 때 시작 (app.py를 다시 import하는 답안지 worker 프로세스에서는 스레드를 만들지 않음)
+        if self._threads:
+            return
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"JobWorker-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job = self._queue.popleft()
+                job["started_at"] = time.time()
+                self._running[job["job_id"]] = job
+
+            if self.logger:
+                self.logger.info(
+                    f"[JobScheduler] 작업 시작: {job['kind']} ({job['key']}, {job['job_id']}), "
+                    f"대기 {job['started_at'] - job['submitted_at']:.1f}초"
+                )
+            try:
+                job["fn"](*job["args"])
+            except Exception:
+                if self.logger:
+                    self.logger.error(f"[JobScheduler] 작업 실패: {job['kind']} ({job['key']}): {traceback.format_exc()}")
+            finally:
+                duration = time.time() - job["started_at"]
+                with self._condition:
+                    self._running.pop(job["job_id"], None)
+                    previous = self._durations.get(job["kind"])
+                    self._durations[job["kind"]] = duration if previous is None else 0.7 * previous + 0.3 * duration
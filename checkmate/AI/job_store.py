@@ -0,0 +1,231 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# 백그라운드 작업(학번 인식, 답안 인식) 상태를 SQLite에 기록하는 저장소. (app.py의 current_tasks 대체)
+# 작업마다 단계(phase), 처리/전체 답안지 수, 단계별 소요 시간을 남기고, 조회 시 처리 속도(장/초)와 남은 시간(ETA)을 계산합니다.
+# 서버를 재시작해도 이력이 남으며, 재시작 전에 끝나지 못한 작업은 mark_interrupted로 중단 처리합니다.
+# 작업마다 만든 프로세스(owner: "호스트:pid:실행 토큰")를 기록해, 같은 DB를 쓰는 다른 서버 프로세스가 실행 중인 작업은 건드리지 않습니다.
+
+# status는 Spring/프론트와 주고받는 기존 값("pending" | "processing" | "DONE")을 그대로 쓰고,
+# 성공/실패 구분은 result("success" | "error" | "interrupted")에 기록합니다.
+ACTIVE_STATUSES = ("pending", "processing")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    phase TEXT,
+    message TEXT,
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    phase_timings TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    started_at REAL,
+    phase_started_at REAL,
+    progress_started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_subject_created ON jobs (subject, created_at);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+
+class JobStore:
+    """
+    Args:
+        db_path: SQLite 파일 경로. 연결은 처음 사용할 때 엽니다. (app.py를 다시 import하는 worker 프로세스에서는 열지 않음)
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._owner: Optional[str] = None
+        self._owner_pid: Optional[int] = None
+
+    @property
+    def owner(self) -> str:
+        """이 프로세스의 owner 값. fork된 프로세스는 pid가 달라지므로 다시 만듦 (실행 토큰은 같은 pid를 다시 받은 재시작과 구분)"""
+        if self._owner_pid != os.getpid():
+            self._owner_pid = os.getpid()
+            self._owner = f"{socket.gethostname()}:{self._owner_pid}:{uuid.uuid4().hex[:12]}"
+        return self._owner
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False) # 여러 작업 스레드가 하나의 연결을 lock으로 공유
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns: # owner 기록 전에 만든 DB
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+                conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+
+    # --- 기록 ---
+    def create(self, job_id: str, kind: str, subject: str, message: str = "") -> None:
+        """대기열에 등록된 작업 (status "pending", phase "queued")"""
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, kind, subject, status, phase, message, created_at, phase_started_at, updated_at, owner) "
+            "VALUES (?, ?, ?, 'pending', 'queued', ?, ?, ?, ?, ?)",
+            (job_id, kind, subject, message, now, now, now, self.owner)
+        )
+
+    def start_phase(self, job_id: str, phase: str, message: Optional[str] = None, total: Optional[int] = None) -> None:
+        """
+        이전 단계의 소요 시간을 phase_timings에 더하고 새 단계를 시작합니다. (status "processing")
+        total을 주면 처리 수를 0으로 되돌리고 이 시점부터 처리 속도를 측정합니다.
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            now = time.time()
+            timings = self._closed_timings(row, now)
+            conn.execute(
+                "UPDATE jobs SET status = 'processing', phase = ?, message = COALESCE(?, message), phase_timings = ?, "
+                "started_at = COALESCE(started_at, ?), phase_started_at = ?, "
+                "processed = CASE WHEN ? IS NULL THEN processed ELSE 0 END, total = COALESCE(?, total), "
+                "progress_started_at = CASE WHEN ? IS NULL THEN progress_started_at ELSE ? END, updated_at = ? "
+                "WHERE job_id = ?",
+                (phase, message, json.dumps(timings), now, now, total, total, total, now, now, job_id)
+            )
+            conn.commit()
+
+    def update_progress(self, job_id: str, processed: int, total: int, message: Optional[str] = None) -> None:
+        self._execute(
+            "UPDATE jobs SET processed = ?, total = ?, message = COALESCE(?, message), "
+            "progress_started_at = COALESCE(progress_started_at, ?), updated_at = ? WHERE job_id = ?",
+            (processed, total, message, time.time(), time.time(), job_id)
+        )
+
+    def finish(self, job_id: str, result: str, message: str = "") -> None:
+        """현재 단계를 닫고 작업을 끝냅니다. (status "DONE", result "success" | "error")"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'DONE', result = ?, message = ?, phase = 'finished', phase_timings = ?, "
+                "finished_at = ?, updated_at = ? WHERE job_id = ?",
+                (result, message, json.dumps(self._closed_timings(row, now)), now, now, job_id)
+            )
+            conn.commit()
+
+    def mark_interrupted(self, stale_after: float = 3600.0) -> int:
+        """
+        서버 시작 시 호출. 끝나지 못한 작업 중 만든 프로세스가 더 이상 없는 작업만 중단 처리하고 그 수를 반환합니다.
+        owner가 없는 작업(이전 형식)과 같은 호스트에서 pid가 사라진 작업이 대상입니다.
+        다른 호스트의 작업은 살아 있는지 알 수 없으므로 stale_after초 동안 갱신이 없을 때만 중단 처리합니다.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                f"SELECT job_id, owner, updated_at FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                ACTIVE_STATUSES
+            ).fetchall()
+            job_ids = [row["job_id"] for row in rows if not self._owner_alive(row["owner"], now - row["updated_at"], stale_after)]
+            for job_id in job_ids:
+                conn.execute(
+                    "UPDATE jobs SET status = 'DONE', result = 'interrupted', message = '서버 재시작으로 중단됨', "
+                    "finished_at = ?, updated_at = ? WHERE job_id = ?",
+                    (now, now, job_id)
+                )
+            conn.commit()
+            return len(job_ids)
+
+    # --- 조회 ---
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def latest_for_subject(self, subject: str, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """과목의 가장 최근 작업 (kind를 주면 그 종류 중에서)"""
+        if kind:
+            rows = self._execute("SELECT * FROM jobs WHERE subject = ? AND kind = ? ORDER BY created_at DESC LIMIT 1", (subject, kind))
+        else:
+            rows = self._execute("SELECT * FROM jobs WHERE subject = ? ORDER BY created_at DESC LIMIT 1", (subject,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def list_jobs(self, active_only: bool = False, subject: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """최근 작업 목록 (active_only면 대기/실행 중인 작업만)"""
+        conditions, params = [], []
+        if active_only:
+            conditions.append(f"status IN ({','.join('?' * len(ACTIVE_STATUSES))})")
+            params.extend(ACTIVE_STATUSES)
+        if subject:
+            conditions.append("subject = ?")
+            params.append(subject)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._execute(f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*params, int(limit)))
+        return [self._to_dict(row) for row in rows]
+
+    # --- 내부 ---
+    def _owner_alive(self, owner: Optional[str], idle_seconds: float, stale_after: float) -> bool:
+        parts = owner.rsplit(":", 2) if owner else []
+        if len(parts) != 3 or not parts[1].isdigit():
+            return False
+        host, pid = parts[0], int(parts[1])
+        if host != socket.gethostname():
+            return idle_seconds < stale_after
+        if pid == os.getpid():
+            return owner == self.owner # 같은 pid를 다시 받은 재시작(컨테이너의 pid 1 등)이면 토큰이 다름
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError: # 다른 사용자의 프로세스가 살아 있음
+            return True
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def _closed_timings(row: sqlite3.Row, now: float) -> Dict[str, float]:
+        timings = json.loads(row["phase_timings"] or "{}")
+        if row["phase"] and row["phase"] != "finished" and row["phase_started_at"] is not None:
+            timings[row["phase"]] = round(timings.get(row["phase"], 0.0) + now - row["phase_started_at"], 3)
+        return timings
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["phase_timings"] = json.loads(job["phase_timings"] or "{}")
+        end = job["finished_at"] or time.time()
+        elapsed = end - job["progress_started_at"] if job["progress_started_at"] else 0.0
+        rate = job["processed"] / elapsed if elapsed > 0 and job["processed"] else 0.0
+        job["sheets_per_second"] = round(rate, 3)
+        remaining = max(0, job["total"] - job["processed"])
+        if job["status"] == "DONE":
+            job["eta_seconds"] = 0
+        else:
+            job["eta_seconds"] = round(remaining / rate, 1) if rate > 0 else None
+        job["elapsed_seconds"] = round(end - job["started_at"], 3) if job["started_at"] else 0.0
+        return job
@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# KafkaProducer.send()를 비동기로 사용하는 전송기.
+# 메시지마다 flush()로 브로커 응답을 기다리지 않고 전송 결과는 콜백으로 집계하며,
+# 작업이 끝날 때(또는 응답을 기다리는 메시지가 max_pending개를 넘을 때) 한 번만 flush합니다.
+# 배치 크기/linger/압축은 KafkaProducer 설정(app.py)으로 정합니다.
+
+
+class KafkaEmitter:
+    """
+    Args:
+        producer: KafkaProducer (None이면 전송하지 않고 건너뜀)
+        logger: 전송 실패 로그용 (app.logger)
+        max_pending: 브로커 응답을 기다리는 메시지가 이 수에 도달하면 flush (메모리 상한)
+    """
+
+    def __init__(self, producer: Any, logger: Any = None, max_pending: int = 200):
+        self.producer = producer
+        self.logger = logger
+        self.max_pending = max(1, int(max_pending))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._topics: Dict[str, Dict[str, Any]] = {} # topic -> 전송 통계
+
+    @property
+    def available(self) -> bool:
+        return self.producer is not None
+
+    def send(self, topic: str, value: Any, key: Optional[bytes] = None) -> bool:
+        """전송을 요청하고 바로 반환합니다. producer가 없거나 요청 단계에서 실패하면 False."""
+        if self.producer is None:
+            return False
+        started_at = time.monotonic()
+        try:
+            future = self.producer.send(topic, value=value, key=key)
+        except Exception as e:
+            # 직렬화 오류, 버퍼 포화로 인한 시간 초과 등
+            self._on_error(topic, started_at, e, pending=False)
+            return False
+        with self._lock:
+            self._topic_stats(topic)["sent"] += 1
+            self._pending += 1
+            should_flush = self._pending >= self.max_pending
+        future.add_callback(self._on_success, topic, started_at)
+        future.add_errback(self._on_error, topic, started_at)
+        if should_flush:
+            self.flush()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """응답을 기다리는 모든 메시지를 전송 완료까지 기다립니다. 시간 초과/오류 시 False."""
+        if self.producer is None:
+            return False
+        try:
+            self.producer.flush(timeout=timeout)
+            return True
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"[KafkaEmitter] flush 실패: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """topic별 {"sent", "delivered", "failed", "avg_latency_ms", "max_latency_ms", "last_error"} 와 응답 대기 수"""
+        with self._lock:
+            topics = {}
+            for topic, stats in self._topics.items():
+                delivered = stats["delivered"]
+                topics[topic] = {
+                    "sent": stats["sent"],
+                    "delivered": delivered,
+                    "failed": stats["failed"],
+                    "avg_latency_ms": round(stats["latency_total"] / delivered * 1000, 1) if delivered else 0.0,
+                    "max_latency_ms": round(stats["latency_max"] * 1000, 1),
+                    "last_error": stats["last_error"]
+                }
+            return {"pending": self._pending, "topics": topics}
+
+    # --- 콜백 (producer의 I/O 스레드에서 호출) ---
+    def _on_success(self, topic: str, started_at: float, metadata: Any) -> None:
+        latency = time.monotonic() - started_at
+        with self._lock:
+            stats = self._topic_stats(topic)
+            stats["delivered"] += 1
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            self._pending = max(0, self._pending - 1)
+
+    def _on_error(self, topic: str, started_at: float, error: BaseException, pending: bool = True) -> None:
+        with self._lock:
+            stats = self._topic_stats(topic)
+            stats["failed"] += 1
+            stats["last_error"] = str(error)
+            if pending:
+                self._pending = max(0, self._pending - 1)
+        if self.logger:
+            self.logger.error(f"[KafkaEmitter] 전송 실패 (topic: {topic}, {time.monotonic() - started_at:.2f}초): {error}")
+
+    def _topic_stats(self, topic: str) -> Dict[str, Any]:
+        stats = self._topics.get(topic)
+        if stats is None:
+            stats = {"sent": 0, "delivered": 0, "failed": 0, "latency_total": 0.0, "latency_max": 0.0, "last_error": None}
+            self._topics[topic] = stats
+        return stats
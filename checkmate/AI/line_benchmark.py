@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+수평선 검출 속도/일치율 테스트: contour 방식 vs projection 방식
+
+사용법: python line_benchmark.py <답안지 이미지 폴더> [최대 장수] [반복 횟수]
+답안지마다 YOLO로 qn/ans 영역을 구한 뒤, 두 영역에 대해 두 검출기를 실행합니다.
+  - 속도: 영역당 평균 검출 시간
+  - 일치율: y 중심이 MATCH_TOLERANCE_PX 이내인 선끼리 짝지어 precision/recall 계산,
+           crop_between_lines로 나눈 행 경계(y_top, y_bottom)가 완전히 같은 영역의 비율
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from answer_recognition.preprocessing.yolo_detector import yolo_predict_and_extract_areas_batch
+from answer_recognition.preprocessing.image_utils import (
+    enhance_and_find_contours_for_lines,
+    find_horizontal_lines_by_projection,
+    crop_between_lines
+)
+
+MATCH_TOLERANCE_PX = 5
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+
+
+def time_detector(detector, image, repeat):
+    start_time = time.time()
+    for _ in range(repeat):
+        lines = detector(image)
+    return (time.time() - start_time) / repeat, lines
+
+
+def match_lines(reference, candidate):
+    """y 중심 기준으로 가까운 선끼리 한 번씩만 짝지어 일치한 개수를 반환"""
+    reference_y = sorted(y + h / 2 for _, y, _, h in reference)
+    candidate_y = sorted(y + h / 2 for _, y, _, h in candidate)
+    matched = 0
+    i = j = 0
+    while i < len(reference_y) and j < len(candidate_y):
+        if abs(reference_y[i] - candidate_y[j]) <= MATCH_TOLERANCE_PX:
+            matched += 1
+            i += 1
+            j += 1
+        elif reference_y[i] < candidate_y[j]:
+            i += 1
+        else:
+            j += 1
+    return matched
+
+
+def row_bounds(image, lines):
+    return [(row['y_top_in_area'], row['y_bottom_in_area']) for row in crop_between_lines(image, lines)]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    image_paths = sorted(str(p) for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    if not image_paths:
+        print(f"이미지가 없습니다: {sys.argv[1]}")
+        return
+
+    regions = []
+    for image_path, areas in zip(image_paths, yolo_predict_and_extract_areas_batch(image_paths)):
+        for area in areas:
+            if area is not None:
+                regions.append((f"{Path(image_path).stem}/{area['area_type']}", area['image_obj']))
+    print(f"답안지 {len(image_paths)}장, 영역 {len(regions)}개, 반복 {repeat}회")
+    if not regions:
+        return
+
+    contour_time = projection_time = 0.0
+    reference_count = candidate_count = matched_count = same_rows = 0
+    for name, image in regions:
+        elapsed, reference = time_detector(enhance_and_find_contours_for_lines, image, repeat)
+        contour_time += elapsed
+        elapsed, candidate = time_detector(find_horizontal_lines_by_projection, image, repeat)
+        projection_time += elapsed
+
+        matched = match_lines(reference, candidate)
+        reference_count += len(reference)
+        candidate_count += len(candidate)
+        matched_count += matched
+        if row_bounds(image, reference) == row_bounds(image, candidate):
+            same_rows += 1
+        elif matched != len(reference) or matched != len(candidate):
+            print(f"  불일치 {name}: contour {len(reference)}개, projection {len(candidate)}개, 일치 {matched}개")
+
+    print("\n=== 속도 (영역당 평균) ===")
+    print(f"contour:    {contour_time / len(regions) * 1000:.2f}ms")
+    print(f"projection: {projection_time / len(regions) * 1000:.2f}ms")
+    print(f"projection 속도 개선: {contour_time / projection_time:.2f}배" if projection_time else "")
+
+    print("\n=== 일치율 (contour 기준) ===")
+    print(f"recall:    {matched_count / reference_count:.4f}" if reference_count else "recall:    -")
+    print(f"precision: {matched_count / candidate_count:.4f}" if candidate_count else "precision: -")
+    print(f"행 경계 동일 영역: {same_rows}/{len(regions)}")
+
+
+if __name__ == "__main__":
+    main()
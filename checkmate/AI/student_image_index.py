@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from answer_recognition.preprocessing.sheet_source import find_sheet_archive, open_archive_source
+from student_manifest import StudentManifest, student_id_from_filename
+
+# 과목별 학번 -> 답안지 이미지 인덱스 (/get-student-image).
+# 과목 폴더를 처음 조회할 때 이미지 폴더를 한 번 훑어 인덱스를 만들고 요청 간에 공유하므로, 이후 조회는 폴더 크기와 무관합니다.
+# 과목 폴더/이미지 폴더/ZIP의 mtime이 바뀌면(파일 추가, 이름 변경, 삭제) 다음 조회 때 다시 만들고,
+# 파일명 변경 작업처럼 인덱스에 영향을 주는 작업은 invalidate로 바로 버립니다.
+# 학번은 과목 폴더의 학번 매핑 manifest(student_manifest.py)에서 읽고, 매핑이 없는 파일은 파일명(확장자 제외)의 마지막 '_' 뒤 부분입니다.
+# 같은 학번이 여러 장이면 폴더에서 먼저 나온 파일을 사용합니다.
+
+
+@dataclass(frozen=True)
+class StudentImage:
+    path: str                           # 이미지 파일 경로 (ZIP 항목이면 검토자용으로 풀어 둘 경로)
+    size: int
+    mtime: float
+    member: Optional[str] = None        # 아카이브 모드의 ZIP 항목 이름
+    archive_path: Optional[str] = None
+
+
+@dataclass
+class _SubjectIndex:
+    stamp: Tuple[Any, ...]
+    image_folder: Optional[str]
+    archive_path: Optional[str]
+    images: Dict[str, StudentImage]     # 학번(NFC) -> 이미지 (ZIP 항목이 디스크 파일보다 우선)
+
+
+class StudentImageIndex:
+    """
+    Args:
+        archive_enabled: 아카이브 모드면 과목 폴더의 답안지 ZIP 항목도 인덱스에 넣음
+        manifest_filename: 학번 매핑 manifest 파일명 (답안 인식 때 저장, 없으면 파일명/ZIP 항목 파일명에서 학번을 읽음)
+        extract_dirname: ZIP 항목을 풀어 둘 과목 폴더 아래 폴더 이름
+        max_subjects: 메모리에 둘 과목 수 (오래 조회하지 않은 과목부터 버림)
+        logger: 인덱스 생성 로그용 (app.logger)
+    """
+
+    def __init__(self, archive_enabled: bool = False, manifest_filename: str = 'student_manifest.json',
+                 extract_dirname: str = '.archive_sheets', image_extensions: tuple = ('.jpg', '.jpeg', '.png'),
+                 max_subjects: int = 64, logger: Any = None):
+        self.archive_enabled = archive_enabled
+        self.manifest_filename = manifest_filename
+        self.extract_dirname = extract_dirname
+        self.image_extensions = image_extensions
+        self.max_subjects = max(1, int(max_subjects))
+        self.logger = logger
+        self._subjects: "OrderedDict[str, _SubjectIndex]" = OrderedDict()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._builds = 0
+
+    def lookup(self, subject_path: str, student_id: str) -> Optional[StudentImage]:
+        """학번의 답안지 이미지. 없으면 None (과목 폴더를 읽을 수 없으면 OSError)"""
+        return self._get(subject_path).images.get(unicodedata.normalize('NFC', student_id))
+
+    def images(self, subject_path: str) -> List[StudentImage]:
+        """과목의 모든 학번 이미지 (축소본 미리 만들기용)"""
+        return list(self._get(subject_path).images.values())
+
+    def invalidate(self, subject_path: Optional[str] = None) -> None:
+        """과목(없으면 전체)의 인덱스를 버립니다."""
+        with self._lock:
+            if subject_path is None:
+                self._subjects.clear()
+            else:
+                self._subjects.pop(os.path.abspath(subject_path), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subjects": len(self._subjects), "hits": self._hits, "builds": self._builds}
+
+    # --- 내부 ---
+    def _get(self, subject_path: str) -> _SubjectIndex:
+        key = os.path.abspath(subject_path)
+        with self._lock:
+            cached = self._subjects.get(key)
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        if cached is not None and self._stamp(key, cached.image_folder, cached.archive_path) == cached.stamp:
+            with self._lock:
+                self._hits += 1
+                if key in self._subjects:
+                    self._subjects.move_to_end(key)
+            return cached
+
+        # 같은 과목을 동시에 조회한 요청은 한 번만 만들고 결과를 나눠 씀
+        with build_lock:
+            with self._lock:
+                cached = self._subjects.get(key)
+            if cached is not None and self._stamp(key, cached.image_folder, cached.archive_path) == cached.stamp:
+                return cached
+            index = self._build(key)
+            with self._lock:
+                self._builds += 1
+                self._subjects[key] = index
+                self._subjects.move_to_end(key)
+                while len(self._subjects) > self.max_subjects:
+                    self._subjects.popitem(last=False)
+            return index
+
+    @staticmethod
+    def _stamp(subject_path: str, image_folder: Optional[str], archive_path: Optional[str]) -> Tuple[Any, ...]:
+        stamp = [os.stat(subject_path).st_mtime_ns]
+        for path in (image_folder, archive_path):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns if path else None)
+            except OSError:
+                stamp.append(-1) # 사라진 폴더/ZIP
+        return tuple(stamp)
+
+    def _build(self, subject_path: str) -> _SubjectIndex:
+        started_at = time.time()
+        subdirectories = [
+            d for d in os.listdir(subject_path)
+            if os.path.isdir(os.path.join(subject_path, d)) and d != 'debug_cropped_images' and not d.startswith('.')
+        ]
+        if len(subdirectories) > 1 and self.logger:
+            self.logger.warning(f"[StudentImageIndex] Multiple image data subdirectories found in {subject_path}: {subdirectories}. Using the first one: {subdirectories[0]}")
+        image_folder = os.path.join(subject_path, subdirectories[0]) if subdirectories else None
+        archive_path = find_sheet_archive(subject_path) if self.archive_enabled else None
+        # 폴더를 훑기 전에 stamp를 잡아 두어, 만드는 도중에 바뀐 폴더는 다음 조회 때 다시 만들도록 함
+        stamp = self._stamp(subject_path, image_folder, archive_path)
+
+        images: Dict[str, StudentImage] = {}
+        if archive_path:
+            images.update(self._archive_images(subject_path, archive_path))
+        if image_folder:
+            manifest = StudentManifest.load(os.path.join(subject_path, self.manifest_filename), os.path.basename(image_folder))
+            with os.scandir(image_folder) as entries:
+                for entry in entries:
+                    student_id = manifest.student_id(entry.name) if manifest else student_id_from_filename(entry.name)
+                    if student_id is None or student_id in images or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    images[student_id] = StudentImage(entry.path, stat.st_size, stat.st_mtime)
+
+        if self.logger:
+            self.logger.info(f"[StudentImageIndex] 인덱스 생성: {subject_path} (학번 {len(images)}개, {time.time() - started_at:.3f}초)")
+        return _SubjectIndex(stamp, image_folder, archive_path, images)
+
+    def _archive_images(self, subject_path: str, archive_path: str) -> Dict[str, StudentImage]:
+        with open_archive_source(archive_path) as source:
+            if source is None:
+                return {}
+            member_sizes = [(member, source.size(member)) for member in source.names(self.image_extensions)]
+        # 답안 인식 전이면 manifest가 없으므로 ZIP 항목 파일명 그대로 사용
+        manifest = StudentManifest.load(os.path.join(subject_path, self.manifest_filename), os.path.basename(archive_path))
+        archive_mtime = os.path.getmtime(archive_path)
+        images: Dict[str, StudentImage] = {}
+        for member, size in member_sizes:
+            sheet_name = manifest.sheet_name(member) if manifest else os.path.basename(member)
+            student_id = manifest.student_id(member) if manifest else student_id_from_filename(sheet_name)
+            if student_id is None or student_id in images:
+                continue
+            path = os.path.join(subject_path, self.extract_dirname, os.path.basename(sheet_name))
+            images[student_id] = StudentImage(path, size, archive_mtime, member, archive_path)
+        return images
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 과목별 학번 매핑(manifest). 원본 파일명(또는 ZIP 항목 이름) -> 확정된 답안지 이름/학번을 과목 폴더의 JSON 파일로 기록합니다.
+# 답안 인식/검토자 이미지 조회/결과 파일명은 디스크의 파일명 대신 이 매핑을 읽으므로, 답안 인식 전에 파일을 하나씩 rename하지 않습니다.
+# student_list의 "<원본 파일명 키>_<새 파일명>" 명세는 원본 파일명(확장자 제외)과 정확히 같은 키를 먼저 찾고(dict 조회),
+# 없을 때만 기존처럼 파일명에 키가 포함된 파일을 찾습니다.
+
+MANIFEST_VERSION = 1
+KNOWN_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+
+def nfc(text: str) -> str:
+    return unicodedata.normalize('NFC', text)
+
+
+def student_id_from_filename(filename: str) -> Optional[str]:
+    """파일명의 학번 부분 (NFC, 확장자 제외 파일명의 마지막 '_' 뒤). '_'가 없으면 None"""
+    base_name, _ = os.path.splitext(nfc(filename))
+    if '_' not in base_name:
+        return None
+    return base_name.split('_')[-1]
+
+
+def _search_key(original_key: str) -> str:
+    for ext in KNOWN_IMAGE_EXTENSIONS:
+        if original_key.lower().endswith(ext):
+            original_key = original_key[:-len(ext)]
+            break
+    return nfc(original_key.strip())
+
+
+def match_student_files(
+    student_list: Iterable[Any],
+    originals: Iterable[str],
+    logger: Any = None,
+    log_prefix: str = "[StudentManifest]"
+) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """
+    student_list의 파일명 명세를 원본 파일명(또는 ZIP 항목 이름) 목록과 매칭합니다.
+    Returns:
+        (matches, failures): matches는 원본 -> 새 파일명(NFC), failures는 매칭하지 못한 명세의 결과
+    """
+    originals = list(originals)
+    base_to_originals: Dict[str, List[str]] = {} # 원본 파일명(확장자 제외, NFC) -> 원본
+    for original in originals:
+        base_name, _ = os.path.splitext(nfc(os.path.basename(original)))
+        base_to_originals.setdefault(base_name.strip(), []).append(original)
+
+    matches: Dict[str, str] = {}
+    failures: List[Dict[str, Any]] = []
+    for item in student_list:
+        if not isinstance(item, dict) or 'file_name' not in item:
+            failures.append({"original_spec": str(item), "status": "error", "message": "Invalid item format"})
+            continue
+        full_corrected_name_spec = nfc(item['file_name'])
+        parts = full_corrected_name_spec.split('_', 1)
+        if len(parts) < 2:
+            failures.append({"original_name_spec": full_corrected_name_spec, "status": "error", "message": "Spec does not contain '_' separator."})
+            continue
+        search_key = _search_key(parts[0])
+        new_name = nfc(parts[1])
+
+        found = base_to_originals.get(search_key)
+        if not found:
+            # 정확히 같은 파일명이 없을 때만 파일명에 키가 포함된 파일을 찾음
+            found = [original for base_name, group in base_to_originals.items() if search_key in base_name for original in group]
+        if len(found) != 1:
+            message = "Original file not found containing this key in its base name." if not found else f"Multiple files found: {found}. Ambiguous."
+            failures.append({"search_key": search_key, "new_name": new_name, "status": "error", "message": message})
+            if logger:
+                logger.warning(f"{log_prefix} '{search_key}' 매칭 실패: {message}")
+            continue
+        matches[found[0]] = new_name
+    return matches, failures
+
+
+class StudentManifest:
+    """
+    Args:
+        path: manifest 파일 경로 (과목 폴더)
+        source: 매핑 대상 (이미지 폴더 이름 또는 ZIP 파일명). 다른 대상의 manifest는 읽을 때 무시
+        entries: 원본 -> {"name": 새 파일명, "student_id": 학번}
+    """
+
+    def __init__(self, path: str, source: str, entries: Optional[Dict[str, Dict[str, Optional[str]]]] = None):
+        self.path = path
+        self.source = source
+        self.entries = entries or {}
+
+    @classmethod
+    def build(cls, path: str, source: str, originals: Iterable[str], student_list: Iterable[Any],
+              logger: Any = None, log_prefix: str = "[StudentManifest]") -> Tuple["StudentManifest", List[Dict[str, Any]]]:
+        """매칭 결과로 manifest를 만듭니다. (저장은 save) Returns: (manifest, failures)"""
+        matches, failures = match_student_files(student_list, originals, logger, log_prefix)
+        entries = {
+            original: {"name": new_name, "student_id": student_id_from_filename(new_name)}
+            for original, new_name in matches.items()
+        }
+        return cls(path, source, entries), failures
+
+    @classmethod
+    def load(cls, path: str, source: Optional[str] = None) -> Optional["StudentManifest"]:
+        """저장된 manifest. 없거나 깨졌거나 source가 다르면 None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get("version") != MANIFEST_VERSION or (source is not None and payload.get("source") != source):
+                return None
+            return cls(path, payload["source"], payload["files"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self) -> None:
+        payload = {"version": MANIFEST_VERSION, "source": self.source, "updated_at": time.time(), "files": self.entries}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def sheet_name(self, original: str) -> str:
+        """답안지 이름 (매핑된 새 파일명, 없으면 원본 파일명)"""
+        entry = self.entries.get(original)
+        return entry["name"] if entry else nfc(os.path.basename(original))
+
+    def student_id(self, original: str) -> Optional[str]:
+        entry = self.entries.get(original)
+        return entry["student_id"] if entry else student_id_from_filename(os.path.basename(original))
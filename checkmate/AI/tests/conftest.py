@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 테스트는 app.py와 같은 위치(checkmate/AI)에서 모듈을 import합니다.
+# 모델(ultralytics/transformers)이나 Kafka가 필요한 모듈(app.py, answer_recognition.config)은 import하지 않습니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from image_derivatives import DerivativeCache, parse_requested_width
+
+
+def jpeg_bytes(width, height, orientation=None):
+    image = Image.new("RGB", (width, height), (200, 30, 30))
+    buffer = io.BytesIO()
+    if orientation is None:
+        image.save(buffer, "JPEG")
+    else:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_snap_width(tmp_path):
+    cache = DerivativeCache(str(tmp_path), widths=(960, 480, 1600))
+    assert cache.snap_width(100) == 480
+    assert cache.snap_width(961) == 1600
+    assert cache.snap_width(4000) == 1600
+
+
+def test_generates_once_and_reuses(tmp_path):
+    cache = DerivativeCache(str(tmp_path), widths=(100,))
+    calls = []
+
+    def read_source():
+        calls.append(1)
+        return jpeg_bytes(400, 200)
+
+    path = cache.get(("sheet.jpg", 1), 100, "jpeg", read_source)
+    assert cache.get(("sheet.jpg", 1), 100, "jpeg", read_source) == path
+    assert len(calls) == 1
+    with Image.open(path) as image:
+        assert image.size == (100, 50)
+    stats = cache.stats()
+    assert (stats["generated"], stats["hits"], stats["files"]) == (1, 1, 1)
+
+
+def test_applies_exif_orientation(tmp_path):
+    cache = DerivativeCache(str(tmp_path), widths=(100,))
+    path = cache.get(("rotated.jpg",), 100, "jpeg", lambda: jpeg_bytes(400, 200, orientation=6))
+    with Image.open(path) as image:
+        assert image.size == (100, 200) # 90도 회전 후 폭 100으로 축소 (세로 200 -> 원본보다 크게 늘리지 않음)
+
+
+def test_evicts_least_recently_used_and_skips_pinned(tmp_path):
+    cache = DerivativeCache(str(tmp_path), widths=(64,), max_bytes=1)
+    source = lambda: jpeg_bytes(64, 64)
+    first = cache.get(("first",), 64, "jpeg", source, pin=True)
+    second = cache.get(("second",), 64, "jpeg", source)
+    # 상한을 넘었지만 first는 보내는 중(pin)이라 남고, second는 방금 만든 파일이라 남음
+    assert os.path.exists(first) and os.path.exists(second)
+
+    cache.release(first)
+    third = cache.get(("third",), 64, "jpeg", source)
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert os.path.exists(third)
+    assert cache.stats()["evicted"] == 2
+
+
+def test_lru_order_survives_restart(tmp_path):
+    cache = DerivativeCache(str(tmp_path), widths=(64,), max_bytes=0)
+    source = lambda: jpeg_bytes(64, 64)
+    old = cache.get(("old",), 64, "jpeg", source)
+    new = cache.get(("new",), 64, "jpeg", source)
+    os.utime(old, (1, 1))
+
+    # 시작할 때 mtime 순으로 LRU를 채우므로, 세 번째 파일로 상한을 넘으면 mtime이 오래된 old만 지움
+    restarted = DerivativeCache(str(tmp_path), widths=(64,), max_bytes=os.path.getsize(new) * 3 - 1)
+    assert restarted.stats()["files"] == 2
+    restarted.get(("third",), 64, "jpeg", source)
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+
+
+def test_parse_requested_width():
+    assert parse_requested_width(None) is None
+    assert parse_requested_width("0") is None
+    assert parse_requested_width("480") == 480
+    with pytest.raises(ValueError):
+        parse_requested_width("-1")
+    with pytest.raises(ValueError):
+        parse_requested_width("wide")
@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+from job_scheduler import JobQueueFull, JobScheduler
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_full_queue_raises_with_retry_after():
+    scheduler = JobScheduler(workers=1, max_queue=1, default_duration=30.0)
+    release = threading.Event()
+    running = scheduler.submit("answer", "subject-a", release.wait, job_id="running")
+    wait_until(lambda: scheduler.positions().get(running) == 0)
+    queued = scheduler.submit("answer", "subject-b", release.wait, job_id="queued")
+    assert scheduler.positions() == {"running": 0, "queued": 1}
+
+    with pytest.raises(JobQueueFull) as excinfo:
+        scheduler.submit("answer", "subject-c", release.wait)
+    # 실행 중인 작업이 방금 시작했으므로 예상 시간(30초)만큼 기다리라고 알려 줌
+    assert 1 <= excinfo.value.retry_after <= 30
+    with pytest.raises(JobQueueFull):
+        scheduler.ensure_capacity()
+
+    release.set()
+    wait_until(lambda: not scheduler.positions())
+    assert queued not in scheduler.positions()
+    scheduler.ensure_capacity()
+
+
+def test_failed_job_frees_its_slot():
+    scheduler = JobScheduler(workers=1, max_queue=0)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    job_id = scheduler.submit("answer", "subject-a", fail)
+    wait_until(lambda: job_id not in scheduler.positions())
+    scheduler.ensure_capacity()
@@ -0,0 +1,56 @@
+import os
+import socket
+
+from job_store import JobStore
+
+
+def make_store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def test_job_lifecycle(tmp_path):
+    store = make_store(tmp_path)
+    store.create("job-1", "answer", "math", "대기 중")
+    job = store.get("job-1")
+    assert (job["status"], job["phase"], job["owner"]) == ("pending", "queued", store.owner)
+
+    store.start_phase("job-1", "load", "답안 인식 중", total=10)
+    store.update_progress("job-1", 4, 10)
+    job = store.get("job-1")
+    assert (job["status"], job["phase"], job["processed"], job["total"]) == ("processing", "load", 4, 10)
+    assert "queued" in job["phase_timings"]
+
+    store.finish("job-1", "success", "완료")
+    job = store.get("job-1")
+    assert (job["status"], job["result"], job["phase"], job["eta_seconds"]) == ("DONE", "success", "finished", 0)
+    assert "load" in job["phase_timings"]
+    assert store.list_jobs(active_only=True) == []
+    assert store.latest_for_subject("math", "answer")["job_id"] == "job-1"
+
+
+def test_mark_interrupted_skips_jobs_of_live_processes(tmp_path):
+    store = make_store(tmp_path)
+    store.create("mine", "answer", "math")
+    host = socket.gethostname()
+    owners = {
+        "legacy": None,
+        "dead-pid": f"{host}:999999999:token",
+        "restarted": f"{host}:{os.getpid()}:previous-run",
+        "live-pid": f"{host}:{os.getppid()}:token",
+        "other-host": "other-host:1:token",
+    }
+    for job_id, owner in owners.items():
+        store.create(job_id, "answer", "math")
+        store._execute("UPDATE jobs SET owner = ? WHERE job_id = ?", (owner, job_id))
+
+    assert store.mark_interrupted(stale_after=3600) == 3
+    results = {job["job_id"]: job["result"] for job in store.list_jobs()}
+    assert results == {
+        "mine": None, "legacy": "interrupted", "dead-pid": "interrupted", "restarted": "interrupted",
+        "live-pid": None, "other-host": None
+    }
+
+    # 다른 호스트의 작업은 갱신이 오래 없을 때만 중단 처리
+    store._execute("UPDATE jobs SET updated_at = 0 WHERE job_id = 'other-host'")
+    assert store.mark_interrupted(stale_after=3600) == 1
+    assert store.get("other-host")["result"] == "interrupted"
@@ -0,0 +1,64 @@
+from answer_recognition.sheet_checkpoint import SheetCheckpointStore, answer_key_hash
+
+TAG = "test-pipeline"
+
+
+def sheet_result(answer):
+    return {"answer_json": {"answers": [answer]}, "failure_json": [], "detection": "yolo"}
+
+
+def test_answer_key_hash_ignores_key_order():
+    assert answer_key_hash({"a": 1, "b": [1, 2]}) == answer_key_hash({"b": [1, 2], "a": 1})
+    assert answer_key_hash({"a": 1}) != answer_key_hash({"a": 2})
+
+
+def test_resume_from_records(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    store = SheetCheckpointStore(path, "key", TAG)
+    store.record("hash-1", "math_20230001.jpg", sheet_result("1"))
+    store.close()
+
+    resumed = SheetCheckpointStore(path, "key", TAG)
+    assert resumed.load() == 1
+    assert resumed.lookup("hash-1", "math_20230001.jpg") == sheet_result("1")
+    assert resumed.lookup("hash-1", "math_20230002.jpg") is None # 파일명이 바뀌면 다시 인식
+    assert resumed.lookup("hash-2", "math_20230001.jpg") is None
+
+
+def test_stale_and_partial_records_are_skipped(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    old = SheetCheckpointStore(path, "old-key", TAG)
+    old.record("hash-1", "a.jpg", sheet_result("1"))
+    old.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"content_hash": "hash-2", "image_') # 기록 중 종료
+
+    store = SheetCheckpointStore(path, "key", TAG)
+    assert store.load() == 0
+    assert store.stale == 1
+    store.record("hash-2", "b.jpg", sheet_result("2")) # 깨진 줄 뒤에 이어 쓰지 않음
+    store.close()
+
+    reloaded = SheetCheckpointStore(path, "key", TAG)
+    assert reloaded.load() == 1
+    assert reloaded.lookup("hash-2", "b.jpg") == sheet_result("2")
+
+
+def test_compact_keeps_current_sheets_per_file_name(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    store = SheetCheckpointStore(path, "key", TAG)
+    # 내용이 같은 답안지 두 장 (파일명만 다름) + 더 이상 없는 답안지
+    store.record("same", "a.jpg", sheet_result("1"))
+    store.record("same", "b.jpg", sheet_result("2"))
+    store.record("gone", "c.jpg", sheet_result("3"))
+    store.record("same", "a.jpg", sheet_result("4")) # 다시 인식한 결과가 우선
+    assert store.compact([("a.jpg", "same"), ("b.jpg", "same")]) == 2
+    store.close()
+
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    reloaded = SheetCheckpointStore(path, "key", TAG)
+    assert reloaded.load() == 2
+    assert reloaded.lookup("same", "a.jpg") == sheet_result("4")
+    assert reloaded.lookup("same", "b.jpg") == sheet_result("2")
+    assert reloaded.lookup("gone", "c.jpg") is None
@@ -0,0 +1,51 @@
+import unicodedata
+
+from student_manifest import StudentManifest, match_student_files, student_id_from_filename
+
+
+def test_student_id_from_filename():
+    assert student_id_from_filename("신호및시스템_20230001.jpg") == "20230001"
+    assert student_id_from_filename("20230001.jpg") is None
+
+
+def test_match_student_files():
+    originals = ["scan/0001.jpg", "scan/0002.jpg", "scan/0010.jpg", unicodedata.normalize("NFD", "scan/김철수.jpg")]
+    student_list = [
+        {"file_name": "0001_math_20230001.jpg"},
+        {"file_name": "0002.jpg_math_20230002.jpg"}, # 키에 확장자가 붙어 있어도 매칭
+        {"file_name": "김철수_math_20230003.jpg"}, # macOS ZIP의 NFD 파일명도 NFC로 비교
+        {"file_name": "00_math_20230004.jpg"}, # 포함 검색 결과가 여러 개 -> 실패
+        {"file_name": "0099_math_20230005.jpg"}, # 없음
+        {"file_name": "nounderscore"},
+        "not a dict",
+    ]
+    matches, failures = match_student_files(student_list, originals)
+    assert matches == {
+        "scan/0001.jpg": "math_20230001.jpg",
+        "scan/0002.jpg": "math_20230002.jpg",
+        originals[3]: "math_20230003.jpg",
+    }
+    assert len(failures) == 4
+    assert all(failure["status"] == "error" for failure in failures)
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "student_manifest.json")
+    manifest, failures = StudentManifest.build(
+        path, "sheets.zip", ["scan/0001.jpg", "scan/0002.jpg"], [{"file_name": "0001_math_20230001.jpg"}]
+    )
+    assert failures == []
+    manifest.save()
+
+    loaded = StudentManifest.load(path, "sheets.zip")
+    assert loaded.entries == manifest.entries
+    assert loaded.sheet_name("scan/0001.jpg") == "math_20230001.jpg"
+    assert loaded.student_id("scan/0001.jpg") == "20230001"
+    # 매핑되지 않은 원본은 원래 파일명 그대로
+    assert loaded.sheet_name("scan/0002.jpg") == "0002.jpg"
+    assert loaded.student_id("scan/0002.jpg") is None
+    # 다른 ZIP의 manifest나 깨진 파일은 무시
+    assert StudentManifest.load(path, "other.zip") is None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+    assert StudentManifest.load(path) is None
@@ -0,0 +1,106 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from upload_ingest import IngestError, IngestLimits, StreamingZipExtractor, ingest_multipart
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def extract(tmp_path, data, limits=None, chunk_size=7):
+    extractor = StreamingZipExtractor(str(tmp_path / "extracted"), limits or IngestLimits())
+    try:
+        for start in range(0, len(data), chunk_size):
+            extractor.feed(data[start:start + chunk_size])
+        extractor.finish()
+    finally:
+        extractor.close()
+    return extractor
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_extracts_images_and_flattens_folders(tmp_path, compression):
+    data = make_zip([
+        ("sheets/math_20230001.jpg", b"a" * 100),
+        ("sheets/nested/math_20230002.png", b"b" * 50),
+        ("sheets/readme.txt", b"skip"),
+        ("__MACOSX/sheets/._math_20230001.jpg", b"skip"),
+    ], compression)
+    extractor = extract(tmp_path, data)
+    names = sorted(os.path.basename(path) for path in extractor.extracted_files)
+    assert names == ["math_20230001.jpg", "math_20230002.png"]
+    assert extractor.skipped_members == 2
+    with open(tmp_path / "extracted" / "math_20230001.jpg", "rb") as f:
+        assert f.read() == b"a" * 100
+    assert not [name for name in os.listdir(tmp_path / "extracted") if name.endswith(".part")]
+
+
+def test_rejects_duplicate_flattened_names(tmp_path):
+    data = make_zip([("a/1.jpg", b"first"), ("b/1.jpg", b"second")])
+    with pytest.raises(IngestError) as excinfo:
+        extract(tmp_path, data)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("limits", [
+    IngestLimits(max_members=2),
+    IngestLimits(max_member_bytes=64),
+    IngestLimits(max_extracted_bytes=150),
+])
+def test_limits_are_enforced(tmp_path, limits):
+    data = make_zip([(f"{idx}.jpg", b"x" * 100) for idx in range(3)])
+    with pytest.raises(IngestError) as excinfo:
+        extract(tmp_path, data, limits)
+    assert excinfo.value.status_code == 413
+
+
+def test_truncated_zip_is_rejected(tmp_path):
+    data = make_zip([("1.jpg", b"x" * 1000)], zipfile.ZIP_STORED)
+    with pytest.raises(IngestError):
+        extract(tmp_path, data[:500])
+    assert not os.listdir(tmp_path / "extracted")
+
+
+def multipart_body(boundary, fields, archive_name, archive_data):
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{archive_name}"\r\n'
+        f'Content-Type: application/zip\r\n\r\n'.encode() + archive_data + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts)
+
+
+def test_ingest_multipart(tmp_path):
+    body = multipart_body("BOUNDARY", {"subject": "math"}, "sheets.zip", make_zip([("math_20230001.jpg", b"x" * 10)]))
+    result = ingest_multipart(
+        io.BytesIO(body), "multipart/form-data; boundary=BOUNDARY", str(tmp_path), "file", chunk_size=16, keep_archive=True
+    )
+    assert result.fields == {"subject": "math"}
+    assert result.filenames == {"file": "sheets.zip"}
+    assert [os.path.basename(path) for path in result.extracted_files] == ["math_20230001.jpg"]
+    assert result.archive_path == os.path.join(str(tmp_path), "archive", "sheets.zip")
+    assert result.bytes_received == len(body)
+
+
+def test_ingest_multipart_limits(tmp_path):
+    body = multipart_body("BOUNDARY", {}, "sheets.zip", make_zip([("1.jpg", b"x" * 1000)], zipfile.ZIP_STORED))
+    with pytest.raises(IngestError) as excinfo:
+        ingest_multipart(io.BytesIO(body), "multipart/form-data; boundary=BOUNDARY", str(tmp_path), "file",
+                         IngestLimits(max_upload_bytes=100), chunk_size=64)
+    assert excinfo.value.status_code == 413
+
+    body = multipart_body("BOUNDARY", {}, "sheets.rar", b"not a zip")
+    with pytest.raises(IngestError) as excinfo:
+        ingest_multipart(io.BytesIO(body), "multipart/form-data; boundary=BOUNDARY", str(tmp_path), "file")
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+텍스트 분할 속도/일치율 테스트: contour 방식 vs components 방식
+
+사용법: python text_segment_benchmark.py <답안지 이미지 폴더> [최대 장수] [반복 횟수]
+답안지마다 YOLO로 답변 영역을 구하고 수평선으로 나눈 행마다 두 분할기를 실행합니다.
+  - 속도: 행당 평균 분할 시간
+  - 일치율: 텍스트 박스(x, y, w, h)가 IoU >= MATCH_IOU로 짝지어지는 비율(precision/recall),
+           박스 목록이 완전히 같은 행의 비율
+겹치거나 닿은 획, 안쪽에 들어간 획(RETR_EXTERNAL이 버리는 내부 컨투어)에서 두 방식의 결과가 달라질 수 있으니,
+TEXT_SEGMENTER를 components로 바꾸기 전에 불일치 행을 확인하세요.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from answer_recognition.preprocessing.yolo_detector import yolo_predict_and_extract_areas_batch
+from answer_recognition.preprocessing.image_utils import (
+    find_horizontal_lines,
+    crop_between_lines,
+    preprocess_line_image_for_text_contours,
+    merge_contours_and_crop_text_pil,
+    segment_text_in_line
+)
+
+MATCH_IOU = 0.8
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+
+
+def segment_by_contours(line_image):
+    return merge_contours_and_crop_text_pil(line_image, preprocess_line_image_for_text_contours(line_image))
+
+
+def time_segmenter(segmenter, image, repeat):
+    start_time = time.time()
+    for _ in range(repeat):
+        crops = segmenter(image)
+    return (time.time() - start_time) / repeat, [(c['x_in_line'], c['y_in_line'], c['original_w'], c['original_h']) for c in crops]
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def match_boxes(reference, candidate):
+    """IoU가 MATCH_IOU 이상인 박스끼리 한 번씩만 짝지어 일치한 개수를 반환"""
+    unmatched = list(candidate)
+    matched = 0
+    for box in reference:
+        best = max(unmatched, key=lambda other: iou(box, other), default=None)
+        if best is not None and iou(box, best) >= MATCH_IOU:
+            unmatched.remove(best)
+            matched += 1
+    return matched
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    image_paths = sorted(str(p) for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+    if not image_paths:
+        print(f"이미지가 없습니다: {sys.argv[1]}")
+        return
+
+    rows = []
+    for image_path, areas in zip(image_paths, yolo_predict_and_extract_areas_batch(image_paths)):
+        for area in areas:
+            if area is None or area['area_type'] != 'answer':
+                continue
+            area_image = area['image_obj']
+            for row_index, row in enumerate(crop_between_lines(area_image, find_horizontal_lines(area_image))):
+                rows.append((f"{Path(image_path).stem}/L{row_index}", row['image_obj']))
+    print(f"답안지 {len(image_paths)}장, 행 {len(rows)}개, 반복 {repeat}회")
+    if not rows:
+        return
+
+    contour_time = components_time = 0.0
+    reference_count = candidate_count = matched_count = same_rows = 0
+    for name, image in rows:
+        elapsed, reference = time_segmenter(segment_by_contours, image, repeat)
+        contour_time += elapsed
+        elapsed, candidate = time_segmenter(segment_text_in_line, image, repeat)
+        components_time += elapsed
+
+        matched = match_boxes(reference, candidate)
+        reference_count += len(reference)
+        candidate_count += len(candidate)
+        matched_count += matched
+        if reference == candidate:
+            same_rows += 1
+        else:
+            print(f"  불일치 {name}: contour {len(reference)}개, components {len(candidate)}개, 일치 {matched}개")
+
+    print("\n=== 속도 (행당 평균) ===")
+    print(f"contour:    {contour_time / len(rows) * 1000:.2f}ms")
+    print(f"components: {components_time / len(rows) * 1000:.2f}ms")
+    print(f"components 속도 개선: {contour_time / components_time:.2f}배" if components_time else "")
+
+    print("\n=== 일치율 (contour 기준) ===")
+    print(f"recall:    {matched_count / reference_count:.4f}" if reference_count else "recall:    -")
+    print(f"precision: {matched_count / candidate_count:.4f}" if candidate_count else "precision: -")
+    print(f"박스 동일 행: {same_rows}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
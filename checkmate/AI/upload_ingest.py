@@ -0,0 +1,430 @@
+import os
+import struct
+import unicodedata
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+
+# 업로드 스트림(multipart/form-data)을 chunk 단위로 읽으면서 답안지 ZIP을 바로 풀어 놓는 수신기.
+# ZIP 전체를 디스크에 저장한 뒤 다시 압축 해제하지 않고, 각 항목(local file header + 데이터)이 도착하는 대로
+# 이미지 파일로 씁니다. 크기/항목 수 제한은 읽는 도중에 확인하여, 초과하면 업로드가 끝나기 전에 IngestError로 중단합니다.
+# 지원: stored(크기가 헤더에 있는 경우), deflate(데이터 디스크립터 포함), zip64 크기 필드. 암호화/기타 압축 방식은 거절합니다.
+
+_LOCAL_FILE_HEADER = b"PK\x03\x04"
+_DATA_DESCRIPTOR = b"PK\x07\x08"
+_ARCHIVE_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07") # central directory 이후는 읽지 않음
+_LOCAL_HEADER_FORMAT = "<4sHHHHHIIIHH"
+_LOCAL_HEADER_SIZE = struct.calcsize(_LOCAL_HEADER_FORMAT) # 30
+_ZIP64_EXTRA_ID = 0x0001
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+_METHOD_STORED = 0
+_METHOD_DEFLATED = 8
+_INFLATE_OUTPUT_CHUNK = 1 << 20 # 압축 폭탄 대비: 한 번에 풀어내는 최대 크기
+
+
+class IngestError(Exception):
+    """업로드 거절. status_code: 응답 코드 (400 형식 오류, 413 제한 초과)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+@dataclass
+class IngestLimits:
+    max_upload_bytes: int = 2 * 1024 ** 3        # 요청 본문 전체
+    max_members: int = 3000                      # ZIP 항목 수 (디렉터리 포함)
+    max_member_bytes: int = 128 * 1024 ** 2      # 항목 하나의 압축 해제 크기
+    max_extracted_bytes: int = 8 * 1024 ** 3     # 압축 해제 크기 합계
+    max_field_bytes: int = 64 * 1024             # 일반 form 필드 값
+    image_extensions: tuple = ('.jpg', '.jpeg', '.png')
+
+
+@dataclass
+class IngestResult:
+    fields: Dict[str, str] = field(default_factory=dict)
+    files: Dict[str, str] = field(default_factory=dict)          # form 필드명 -> 저장한 파일 경로 (ZIP 제외)
+    filenames: Dict[str, str] = field(default_factory=dict)      # form 필드명 -> 업로드 파일명 (ZIP 포함)
+    extracted_files: List[str] = field(default_factory=list)     # ZIP에서 푼 이미지 경로 (도착 순서)
+    skipped_members: int = 0                                     # 이미지가 아니어서 건너뛴 ZIP 항목 수
+    archive_path: Optional[str] = None                           # keep_archive일 때 저장한 ZIP 경로
+    bytes_received: int = 0
+
+
+def _decode_member_name(raw: bytes, flags: int) -> str:
+    if flags & _FLAG_UTF8:
+        name = raw.decode('utf-8', errors='replace')
+    else:
+        # 플래그가 없어도 UTF-8인 경우가 많고, 한글 Windows 압축 프로그램은 cp949를 사용
+        for encoding in ('utf-8', 'cp949'):
+            try:
+                name = raw.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            name = raw.decode('cp437')
+    return unicodedata.normalize('NFC', name)
+
+
+class StreamingZipExtractor:
+    """
+    feed()로 받은 ZIP 바이트를 순서대로 해석해 이미지 항목을 dest_dir에 씁니다.
+    답안 인식 단계가 폴더 바로 아래의 이미지만 읽으므로 ZIP 안의 폴더 구조는 평탄화하고(파일명만 사용),
+    숨김 파일/__MACOSX 항목과 이미지가 아닌 항목은 건너뜁니다.
+    답안지는 파일명으로 학번과 매핑되므로, 평탄화한 파일명이 겹치는 항목(a/1.jpg, b/1.jpg)이 있으면 IngestError(400)로 거절합니다.
+
+    Args:
+        dest_dir: 이미지를 풀어 놓을 폴더
+        limits: 크기/항목 수 제한
+        on_member: 이미지 하나를 다 쓴 직후 그 경로로 호출
+    """
+
+    def __init__(self, dest_dir: str, limits: IngestLimits, on_member: Optional[Callable[[str], None]] = None):
+        self.dest_dir = dest_dir
+        self.limits = limits
+        self.on_member = on_member
+        self.extracted_files: List[str] = []
+        self.skipped_members = 0
+        self.member_count = 0
+        self.extracted_bytes = 0
+        self._member_names: Dict[str, str] = {} # 풀어 놓을 파일명 -> ZIP 항목 이름 (파일명 중복 확인)
+        self._buffer = bytearray()
+        self._state = "header"
+        self._member: Optional[Dict[str, Any]] = None
+        os.makedirs(dest_dir, exist_ok=True)
+
+    # --- 입력 ---
+    def feed(self, data: bytes) -> None:
+        if self._state == "end":
+            return # central directory 이후는 무시
+        self._buffer += data
+        while self._step():
+            pass
+
+    def finish(self) -> None:
+        """스트림 끝. 항목이 중간에 끊겼으면 IngestError."""
+        if self._state not in ("header", "end") or (self._state == "header" and self._buffer):
+            self._abort_member()
+            raise IngestError("ZIP 파일이 중간에 끊겼습니다.")
+        if self.member_count == 0:
+            raise IngestError("ZIP 파일에 항목이 없습니다.")
+
+    def close(self) -> None:
+        self._abort_member()
+
+    # --- 상태 기계 ---
+    def _step(self) -> bool:
+        """처리할 수 있는 만큼 진행하고, 데이터가 더 필요하면 False"""
+        if self._state == "header":
+            return self._read_header()
+        if self._state == "data":
+            return self._read_data()
+        if self._state == "descriptor":
+            return self._read_descriptor()
+        return False
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        signature = bytes(self._buffer[:4])
+        if signature in _ARCHIVE_END_SIGNATURES:
+            self._state = "end"
+            self._buffer.clear()
+            return False
+        if signature == _DATA_DESCRIPTOR and self.member_count == 0:
+            del self._buffer[:4] # 분할 압축 표시 (단일 파일에서는 무시)
+            return True
+        if signature != _LOCAL_FILE_HEADER:
+            raise IngestError("올바른 ZIP 파일이 아닙니다.")
+        if len(self._buffer) < _LOCAL_HEADER_SIZE:
+            return False
+        (_, _, flags, method, _, _, crc, compressed_size, size,
+         name_length, extra_length) = struct.unpack_from(_LOCAL_HEADER_FORMAT, self._buffer)
+        header_end = _LOCAL_HEADER_SIZE + name_length + extra_length
+        if len(self._buffer) < header_end:
+            return False
+        name = _decode_member_name(bytes(self._buffer[_LOCAL_HEADER_SIZE:_LOCAL_HEADER_SIZE + name_length]), flags)
+        extra = bytes(self._buffer[_LOCAL_HEADER_SIZE + name_length:header_end])
+        del self._buffer[:header_end]
+
+        self.member_count += 1
+        if self.member_count > self.limits.max_members:
+            raise IngestError(f"ZIP 항목 수가 제한({self.limits.max_members}개)을 넘었습니다.", 413)
+        if flags & _FLAG_ENCRYPTED:
+            raise IngestError(f"암호화된 ZIP 항목은 지원하지 않습니다: {name}")
+        if method not in (_METHOD_STORED, _METHOD_DEFLATED):
+            raise IngestError(f"지원하지 않는 압축 방식({method})입니다: {name}")
+        has_descriptor = bool(flags & _FLAG_DATA_DESCRIPTOR)
+        if has_descriptor and method == _METHOD_STORED:
+            raise IngestError(f"크기가 없는 비압축 항목은 스트리밍으로 풀 수 없습니다: {name}")
+
+        zip64 = False
+        if compressed_size == 0xFFFFFFFF or size == 0xFFFFFFFF:
+            sizes = self._zip64_sizes(extra, size, compressed_size)
+            if sizes is None:
+                raise IngestError(f"zip64 크기 정보가 없습니다: {name}")
+            size, compressed_size = sizes
+            zip64 = True
+        elif self._zip64_sizes(extra, size, compressed_size) is not None:
+            zip64 = True # 데이터 디스크립터의 크기 필드가 8바이트
+        if not has_descriptor and size > self.limits.max_member_bytes:
+            raise IngestError(f"ZIP 항목이 너무 큽니다({size} bytes): {name}", 413)
+
+        self._member = {
+            "name": name,
+            "method": method,
+            "crc": crc,
+            "has_descriptor": has_descriptor,
+            "zip64": zip64,
+            "remaining": None if has_descriptor else compressed_size, # 남은 압축 데이터 (디스크립터 방식은 deflate 끝으로 판단)
+            "size": 0,
+            "computed_crc": 0,
+            "decompressor": zlib.decompressobj(-15) if method == _METHOD_DEFLATED else None,
+            "file": None,
+            "path": None
+        }
+        self._open_member_output()
+        self._state = "data"
+        return True
+
+    @staticmethod
+    def _zip64_sizes(extra: bytes, size: int, compressed_size: int) -> Optional[tuple]:
+        # zip64 extra field: 0xFFFFFFFF인 필드만 (size, compressed_size) 순서로 8바이트씩 들어 있음
+        offset = 0
+        while offset + 4 <= len(extra):
+            header_id, data_size = struct.unpack_from("<HH", extra, offset)
+            body = extra[offset + 4:offset + 4 + data_size]
+            if header_id == _ZIP64_EXTRA_ID:
+                values = [struct.unpack_from("<Q", body, i)[0] for i in range(0, len(body) - 7, 8)]
+                if size == 0xFFFFFFFF and values:
+                    size = values.pop(0)
+                if compressed_size == 0xFFFFFFFF and values:
+                    compressed_size = values.pop(0)
+                return size, compressed_size
+            offset += 4 + data_size
+        return None
+
+    def _read_data(self) -> bool:
+        member = self._member
+        if not self._buffer and member["remaining"] != 0: # remaining 0: 빈 항목(폴더 등)
+            return False
+        if member["remaining"] is not None:
+            take = min(len(self._buffer), member["remaining"])
+            chunk = bytes(self._buffer[:take])
+            del self._buffer[:take]
+            member["remaining"] -= take
+        else:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+
+        decompressor = member["decompressor"]
+        if decompressor is None:
+            self._write_member(chunk)
+        else:
+            output = decompressor.decompress(chunk, _INFLATE_OUTPUT_CHUNK)
+            self._write_member(output)
+            while decompressor.unconsumed_tail:
+                output = decompressor.decompress(decompressor.unconsumed_tail, _INFLATE_OUTPUT_CHUNK)
+                self._write_member(output)
+            if decompressor.eof and member["remaining"] is None:
+                # 디스크립터 방식: deflate 스트림이 끝난 뒤의 바이트는 다음 항목/디스크립터
+                self._buffer[:0] = decompressor.unused_data
+            elif member["remaining"] == 0 and not decompressor.eof:
+                self._write_member(decompressor.flush())
+
+        if member["remaining"] == 0 or (member["remaining"] is None and decompressor is not None and decompressor.eof):
+            if member["has_descriptor"]:
+                self._state = "descriptor"
+            else:
+                self._complete_member(member["crc"])
+            return True
+        return bool(self._buffer)
+
+    def _read_descriptor(self) -> bool:
+        size_bytes = 8 if self._member["zip64"] else 4
+        length = 4 + size_bytes * 2
+        if len(self._buffer) < 4:
+            return False
+        has_signature = bytes(self._buffer[:4]) == _DATA_DESCRIPTOR
+        if len(self._buffer) < length + (4 if has_signature else 0):
+            return False
+        offset = 4 if has_signature else 0
+        crc = struct.unpack_from("<I", self._buffer, offset)[0]
+        del self._buffer[:offset + length]
+        self._complete_member(crc)
+        return True
+
+    # --- 항목 출력 ---
+    def _open_member_output(self) -> None:
+        member = self._member
+        basename = os.path.basename(member["name"].replace('\\', '/'))
+        is_image = os.path.splitext(basename)[1].lower() in self.limits.image_extensions
+        if (not basename or basename.startswith('.') or '__MACOSX' in member["name"] or not is_image):
+            self.skipped_members += 1
+            return
+        if basename in self._member_names:
+            raise IngestError(f"ZIP 안에 파일명이 같은 답안지가 있습니다: {self._member_names[basename]}, {member['name']}")
+        self._member_names[basename] = member["name"]
+        member["path"] = os.path.join(self.dest_dir, basename)
+        member["file"] = open(f"{member['path']}.part", 'wb')
+
+    def _write_member(self, data: bytes) -> None:
+        if not data:
+            return
+        member = self._member
+        member["size"] += len(data)
+        self.extracted_bytes += len(data)
+        if member["size"] > self.limits.max_member_bytes:
+            raise IngestError(f"ZIP 항목이 너무 큽니다: {member['name']}", 413)
+        if self.extracted_bytes > self.limits.max_extracted_bytes:
+            raise IngestError("압축 해제 크기 합계가 제한을 넘었습니다.", 413)
+        member["computed_crc"] = zlib.crc32(data, member["computed_crc"])
+        if member["file"] is not None:
+            member["file"].write(data)
+
+    def _complete_member(self, expected_crc: int) -> None:
+        member = self._member
+        if member["computed_crc"] != expected_crc:
+            self._abort_member()
+            raise IngestError(f"ZIP 항목의 CRC가 맞지 않습니다: {member['name']}")
+        if member["file"] is not None:
+            member["file"].close()
+            os.replace(f"{member['path']}.part", member["path"])
+            self.extracted_files.append(member["path"])
+            if self.on_member:
+                self.on_member(member["path"])
+        self._member = None
+        self._state = "header"
+
+    def _abort_member(self) -> None:
+        member = self._member
+        if member and member["file"] is not None:
+            member["file"].close()
+            try:
+                os.remove(f"{member['path']}.part")
+            except OSError:
+                pass
+            member["file"] = None
+
+
+def ingest_multipart(
+    stream: BinaryIO,
+    content_type: str,
+    staging_dir: str,
+    archive_field: str,
+    limits: Optional[IngestLimits] = None,
+    allowed_archive_extensions: tuple = ('.zip',),
+    on_member: Optional[Callable[[str], None]] = None,
+    chunk_size: int = 1 << 20,
+    keep_archive: bool = False
+) -> IngestResult:
+    """
+    multipart 요청 본문을 읽어 staging_dir에 저장합니다.
+      - archive_field의 ZIP: staging_dir/extracted/에 이미지로 바로 풀어 놓음
+        (keep_archive면 받은 ZIP도 그대로 staging_dir/archive/<파일명>에 저장. 답안지를 ZIP에서 바로 읽는 아카이브 모드용)
+      - 다른 파일 필드: staging_dir/files/<필드명>/<파일명>에 저장
+      - 일반 필드: result.fields
+    제한을 넘거나 형식이 잘못되면 IngestError를 던집니다. (staging_dir 정리는 호출한 쪽에서)
+    """
+    limits = limits or IngestLimits()
+    mimetype, options = parse_options_header(content_type or "")
+    boundary = options.get("boundary")
+    if mimetype != "multipart/form-data" or not boundary:
+        raise IngestError("multipart/form-data 요청이 아닙니다.")
+
+    result = IngestResult()
+    decoder = MultipartDecoder(boundary.encode('latin-1')) # 필드 크기는 handle_data에서 확인 (파일 데이터 버퍼에는 제한 없음)
+    extractor: Optional[StreamingZipExtractor] = None
+    current: Optional[Dict[str, Any]] = None # 지금 받는 part
+
+    def start_part(event) -> Dict[str, Any]:
+        nonlocal extractor
+        if isinstance(event, File):
+            filename = unicodedata.normalize('NFC', os.path.basename((event.filename or "").replace('\\', '/')))
+            result.filenames[event.name] = filename
+            if event.name == archive_field:
+                if not filename or os.path.splitext(filename)[1].lower() not in allowed_archive_extensions:
+                    raise IngestError(f"Invalid {archive_field} type")
+                if extractor is not None:
+                    raise IngestError(f"{archive_field}는 하나만 보낼 수 있습니다.")
+                extractor = StreamingZipExtractor(os.path.join(staging_dir, "extracted"), limits, on_member)
+                if keep_archive:
+                    archive_dir = os.path.join(staging_dir, "archive")
+                    os.makedirs(archive_dir, exist_ok=True)
+                    path = os.path.join(archive_dir, filename)
+                    return {"kind": "archive", "path": path, "file": open(path, 'wb')}
+                return {"kind": "archive", "file": None}
+            file_dir = os.path.join(staging_dir, "files", event.name)
+            os.makedirs(file_dir, exist_ok=True)
+            path = os.path.join(file_dir, filename or "upload")
+            return {"kind": "file", "name": event.name, "path": path, "file": open(path, 'wb')}
+        return {"kind": "field", "name": event.name, "value": bytearray()}
+
+    def handle_data(part: Dict[str, Any], data: bytes) -> None:
+        if part["kind"] == "archive":
+            if part["file"] is not None:
+                part["file"].write(data)
+            extractor.feed(data)
+        elif part["kind"] == "file":
+            part["file"].write(data)
+        else:
+            part["value"] += data
+            if len(part["value"]) > limits.max_field_bytes:
+                raise IngestError(f"form 필드가 너무 큽니다: {part['name']}", 413)
+
+    def end_part(part: Dict[str, Any]) -> None:
+        if part["kind"] == "archive":
+            extractor.finish()
+            if part["file"] is not None:
+                part["file"].close()
+                result.archive_path = part["path"]
+        elif part["kind"] == "file":
+            part["file"].close()
+            result.files[part["name"]] = part["path"]
+        else:
+            result.fields[part["name"]] = part["value"].decode('utf-8', errors='replace')
+
+    try:
+        finished = False
+        while not finished:
+            data = stream.read(chunk_size)
+            if data:
+                result.bytes_received += len(data)
+                if result.bytes_received > limits.max_upload_bytes:
+                    raise IngestError("업로드 크기가 제한을 넘었습니다.", 413)
+            decoder.receive_data(data or None) # None: 스트림 끝
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, (Field, File)):
+                    current = start_part(event)
+                elif isinstance(event, Data) and current is not None:
+                    handle_data(current, event.data)
+                    if not event.more_data:
+                        end_part(current)
+                        current = None
+                event = decoder.next_event()
+            finished = isinstance(event, Epilogue) or not data
+        if current is not None:
+            raise IngestError("업로드가 중간에 끊겼습니다.")
+    except ValueError as e:
+        # MultipartDecoder의 형식 오류
+        raise IngestError(f"잘못된 multipart 요청입니다: {e}")
+    except zlib.error as e:
+        raise IngestError(f"손상된 ZIP 파일입니다: {e}")
+    finally:
+        if current is not None and current.get("file") is not None:
+            current["file"].close()
+        if extractor is not None:
+            extractor.close()
+
+    if extractor is not None:
+        result.extracted_files = extractor.extracted_files
+        result.skipped_members = extractor.skipped_members
+    return result